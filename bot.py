@@ -1,5 +1,6 @@
 import logging
 import asyncio
+import signal
 import discord
 from dotenv import load_dotenv
 import os
@@ -21,12 +22,17 @@ load_dotenv()
 
 from utils.keep_alive import keep_alive
 from utils.structured_logging import structured_logger as logger
+from repositories.async_db import run_db, shutdown_db_executor
 from commands import questions_commands, quiz_commands, stats_commands, topics_commands, level_commands
-from repositories.server_repository import register_server, deactivate_server, update_server_last_interaction, update_server_metadata
+from repositories.server_repository import register_server, deactivate_server, update_server_metadata
 from repositories.user_repository import register_single_user, register_guild_users
+from utils.charts import chart_renderer
+from utils.generation_jobs import generation_job_queue
+from utils.http_client import http_client
+from utils.llm_cache import llm_response_cache
+from utils.pdf_extractor import pdf_extractor
 from utils.utils import is_professor, log_command_event, interaction_has_admin_permission
-
-DOCS_PATH = "docs"
+from utils.write_behind import last_interaction_tracker, leaderboard_snapshotter, question_stats_buffer
 
 
 def get_permission_label(interaction: discord.Interaction) -> str:
@@ -84,6 +90,21 @@ class QuizBot(discord.Client):
         self.tree = app_commands.CommandTree(self)
 
     async def setup_hook(self):
+        await chart_renderer.start()
+        await pdf_extractor.start()
+        await http_client.start()
+        last_interaction_tracker.start()
+        question_stats_buffer.start()
+        leaderboard_snapshotter.start()
+        await generation_job_queue.start(self)
+
+        # Cloud Run stops containers with SIGTERM; close cleanly so buffered writes are flushed
+        try:
+            asyncio.get_running_loop().add_signal_handler(
+                signal.SIGTERM, lambda: asyncio.create_task(self.close()))
+        except NotImplementedError:
+            pass
+
         GUILD_ID = int(os.getenv("DISCORD_GUILD_ID", "0"))
         if GUILD_ID:
             guild = discord.Object(id=GUILD_ID)
@@ -103,6 +124,18 @@ class QuizBot(discord.Client):
             await self.tree.sync()
             print("🌍 Slash commands synced globally.")
 
+    async def close(self):
+        await generation_job_queue.stop()
+        await last_interaction_tracker.stop()
+        await question_stats_buffer.stop()
+        await leaderboard_snapshotter.stop()
+        await super().close()
+        await http_client.close()
+        chart_renderer.close()
+        pdf_extractor.close()
+        llm_response_cache.close()
+        shutdown_db_executor(wait=True)
+
 
 bot = QuizBot()
 questions_commands.register(bot.tree)
@@ -115,11 +148,9 @@ level_commands.register(bot.tree)
 @bot.event
 async def on_ready():
     configured_guild_id = int(os.getenv("DISCORD_GUILD_ID", "0"))
-    connected_guild_ids = []
+    connected_guild_ids = [guild.id for guild in bot.guilds]
 
-    for guild in bot.guilds:
-        connected_guild_ids.append(guild.id)
-        register_server(guild)
+    await asyncio.gather(*(run_db(register_server, guild) for guild in bot.guilds))
 
     print(f"✅ Bot connected as {bot.user}")
     if bot.guilds:
@@ -155,8 +186,8 @@ async def on_guild_join(guild: discord.Guild):
         guild_name=guild.name
     )
     try:
-        register_server(guild)
-        register_guild_users(guild)
+        await run_db(register_server, guild)
+        await run_db(register_guild_users, guild)
         log_command_event(
             "info", None,
             f"📌 Server and users registered in Firestore: {guild.id}",
@@ -197,8 +228,8 @@ async def on_member_join(member: discord.Member):
     )
 
     try:
-        register_single_user(member.guild, member)
-        update_server_metadata(member.guild)
+        await run_db(register_single_user, member.guild, member)
+        await run_db(update_server_metadata, member.guild)
     except Exception as e:
         log_command_event(
             "error", None,
@@ -221,7 +252,7 @@ async def on_member_join(member: discord.Member):
 @bot.event
 async def on_member_remove(member: discord.Member):
     try:
-        update_server_metadata(member.guild)
+        await run_db(update_server_metadata, member.guild)
     except Exception as e:
         log_command_event(
             "warning", None,
@@ -236,14 +267,14 @@ async def on_member_remove(member: discord.Member):
 async def on_guild_remove(guild: discord.Guild):
     print(f"🔌 Bot removed from server: {guild.name} ({guild.id})")
     try:
-        deactivate_server(guild.id)
+        await run_db(deactivate_server, guild.id)
     except Exception as e:
         print(f"❌ Error updating server status {guild.id}: {e}")
 
 
 @bot.event
 async def on_app_command_completion(interaction: discord.Interaction, command: discord.app_commands.Command):
-    update_server_last_interaction(interaction.guild.id)
+    last_interaction_tracker.touch(interaction.guild_id)
 
     if interaction.extras.get("command_failed"):
         print(await format_command_log(interaction, command.name, "⚠️"))
@@ -265,7 +296,7 @@ async def on_app_command_completion(interaction: discord.Interaction, command: d
 
 @bot.event
 async def on_app_command_error(interaction: discord.Interaction, error: app_commands.AppCommandError):
-    update_server_last_interaction(interaction.guild.id)
+    last_interaction_tracker.touch(interaction.guild_id)
 
     print(f"❌ Error in command {interaction.command.name}: {error}")
 
@@ -292,8 +323,7 @@ async def global_command_check(interaction: discord.Interaction) -> bool:
         operation="command_execution"
     )
 
-    update_server_last_interaction(interaction.guild.id)
-    await asyncio.sleep(0)
+    last_interaction_tracker.touch(interaction.guild_id)
     return True
 
 
@@ -314,6 +344,8 @@ async def help_command(interaction: discord.Interaction):
                 "👉 `/upload_pdf <topic> <file>` — Upload a PDF (no questions generated).\n"
                 "👉 `/upload_topic <topic> <file>` — Upload a PDF and automatically generate True/False questions.\n\n"
                 "👉 `/generate_questions <topic> <qty> <type>` — Generate multiple questions for a topic.\n"
+                "👉 `/generation_status [job_id]` — Follow background question generation.\n"
+                "👉 `/model_health` — See which AI models are answering and how fast.\n"
                 "👉 `/upload_questions_json <topic> <type> <file>` — Upload questions in bulk from a JSON file.\n"
                 "👉 `/add_question` — Add a question manually.\n"
                 "👉 `/list_questions <topic>` — List all questions in a topic.\n"
@@ -322,7 +354,7 @@ async def help_command(interaction: discord.Interaction):
                 "👉 `/user_stats` — See quiz stats per student.\n"
                 "👉 `/time_stats` — View quiz history over time.\n\n"
                 "👉 `/my_rank` — Show your XP and level.\n"
-                "👉 `/rank` — Show the top 5 XP leaderboard.\n"
+                "👉 `/rank [top]` — Show the XP leaderboard (top 5, 10, 25, 50 or 100).\n"
                 "👉 `/user_rank <name>` — Show another user's rank.\n\n"
                 "💬 To answer a quiz, click the button for each answer you think is correct."
                 "⏱️ You have 60 seconds to answer each quiz.\n"
@@ -334,7 +366,7 @@ async def help_command(interaction: discord.Interaction):
                 "👉 `/quiz <topic>` — Take a 5-question quiz.\n"
                 "👉 `/topics` — List all available quiz topics.\n"
                 "👉 `/my_rank` — Show your XP and level.\n"
-                "👉 `/rank` — Show the top 5 XP leaderboard.\n"
+                "👉 `/rank [top]` — Show the XP leaderboard (top 5, 10, 25, 50 or 100).\n"
                 "💬 To answer a quiz, click the button for each answer you think is correct."
                 "⏱️ You have 60 seconds to answer each quiz.\n"
                 "🧠 Happy practicing!"
@@ -370,5 +402,12 @@ async def help_command(interaction: discord.Interaction):
         except Exception:
             pass
 
-keep_alive()
-bot.run(os.getenv("DISCORD_TOKEN"))
+
+
+def main():
+    keep_alive()
+    bot.run(os.getenv("DISCORD_TOKEN"))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,4 @@
+import asyncio
 import logging
 import random
 from discord import app_commands, Interaction, ButtonStyle
@@ -5,68 +6,98 @@ import discord
 from discord.ui import View, Button
 from firebase_admin import firestore
 
-from repositories.level_repository import get_leaderboard, get_user_xp, get_user_xp_by_name
-from repositories.question_repository import update_question_stats
-from repositories.server_repository import update_server_last_interaction
-from repositories.stats_repository import save_statistic
-from repositories.topic_repository import get_questions_by_topic
+from repositories.async_db import run_db
+from repositories.level_repository import get_leaderboard, get_user_rank, get_user_xp, get_user_xp_by_name
 from utils.enum import QuestionType
 from utils.structured_logging import structured_logger as logger
-from utils.utils import autocomplete_topics, is_professor, professor_verification, register_user_statistics, update_last_interaction
+from utils.utils import autocomplete_topics, is_professor, professor_verification, resolve_member_names, safe_defer, update_last_interaction
+
+LEADERBOARD_SIZES = (5, 10, 25, 50, 100)
 
 
 def register(tree: app_commands.CommandTree):
 
     @tree.command(name="rank", description="Show the top XP leaderboard in the server")
-    async def global_rank(interaction: discord.Interaction):
+    @app_commands.describe(top="How many users to show")
+    @app_commands.choices(top=[
+        app_commands.Choice(name=f"Top {size}", value=size) for size in LEADERBOARD_SIZES
+    ])
+    async def global_rank(interaction: discord.Interaction, top: int = 5):
+        if not await safe_defer(interaction, thinking=True, ephemeral=False):
+            return
+
         try:
             update_last_interaction(interaction.guild.id)
 
-            leaderboard = get_leaderboard(str(interaction.guild.id), limit=5)
-            leaderboard = get_leaderboard(str(interaction.guild.id), limit=5)
+            leaderboard = await run_db(get_leaderboard, str(interaction.guild.id), limit=top)
             if not leaderboard or len(leaderboard) == 0:
-                await interaction.response.send_message(
-                "📊 No leaderboard data available yet!\n"
-                "Complete some quizzes to appear on the leaderboard.",
-                ephemeral=True
-            )
+                await interaction.followup.send(
+                    "📊 No leaderboard data available yet!\n"
+                    "Complete some quizzes to appear on the leaderboard."
+                )
                 return
-            msg = "🏆 **Leaderboard**\n"
+
+            names = await resolve_member_names(
+                interaction.guild, [user_id for user_id, _, _ in leaderboard])
+
+            blocks = []
+            current_block = "🏆 **Leaderboard**\n"
             for idx, (user_id, xp, level) in enumerate(leaderboard, start=1):
-                user = await interaction.guild.fetch_member(user_id)
-                msg += f"{idx}. {user.display_name} — {xp} XP (Level {level})\n"
+                line = f"{idx}. {names[user_id]} — {xp} XP (Level {level})\n"
+                if len(current_block) + len(line) > 2000:
+                    blocks.append(current_block)
+                    current_block = ""
+                current_block += line
 
-            await interaction.response.send_message(msg)
+            if current_block:
+                blocks.append(current_block)
 
+            for block in blocks:
+                await interaction.followup.send(block)
 
         except Exception as e:
-            await interaction.response.send_message(
-                "❌ An error occurred while fetching the leaderboard.",
-                ephemeral=True
-            )
+            logger.error(f"❌ Error in /rank: {e}",
+                         command="rank",
+                         guild_id=str(interaction.guild.id) if interaction.guild else None,
+                         error_type=type(e).__name__,
+                         operation="leaderboard_error")
+            try:
+                await interaction.followup.send(
+                    "❌ An error occurred while fetching the leaderboard."
+                )
+            except Exception:
+                pass
 
     @tree.command(name="my_rank", description="Show your XP and level")
     async def personal_rank(interaction: discord.Interaction):
+        # Loading the guild's leaderboard may take a users scan; acknowledge first
+        if not await safe_defer(interaction, thinking=True, ephemeral=True):
+            return
+
         try:
             update_last_interaction(interaction.guild.id)
 
-            xp, level = get_user_xp(
-                str(interaction.user.id), str(interaction.guild.id))
+            (xp, level), position = await asyncio.gather(
+                run_db(get_user_xp, str(interaction.user.id), str(interaction.guild.id)),
+                run_db(get_user_rank, str(interaction.user.id), str(interaction.guild.id))
+            )
 
             xp_for_next = 100 * level
             xp_current_level = xp - (100 * (level - 1))
             percent = int((xp_current_level / 100) * 10)
             bar = "🔵" * percent + "⚪" * (10 - percent)
+            rank_line = f"Rank #{position[0]} of {position[1]}" if position else "Not ranked yet"
 
-            await interaction.response.send_message(
+            await interaction.followup.send(
                 f"**{interaction.user.display_name}**\n"
                 f"Level {level} ({xp_current_level}/{100} XP)\n"
-                f"{bar}",
+                f"{bar}\n"
+                f"🏆 {rank_line}",
                 ephemeral=True
             )
 
         except Exception as e:
-            await interaction.response.send_message(
+            await interaction.followup.send(
                 "❌ An error occurred while fetching your rank.",
                 ephemeral=True
             )
@@ -81,8 +112,8 @@ def register(tree: app_commands.CommandTree):
             if not await professor_verification(interaction):
                 return
 
-            xp, level = get_user_xp_by_name(
-                user_name, str(interaction.guild.id))
+            xp, level = await run_db(
+                get_user_xp_by_name, user_name, str(interaction.guild.id))
 
             xp_for_next = 100 * level
             xp_current_level = xp - (100 * (level - 1))
@@ -1,10 +1,15 @@
 import logging
 from discord import app_commands, Interaction
 
+from repositories.async_db import run_db
 from repositories.question_repository import (list_questions_by_topic, add_question, delete_question, delete_all_questions_by_topic)
+from repositories.generation_job_repository import get_active_generation_jobs, get_generation_job
 from repositories.topic_repository import get_topic_by_name
 from utils.enum import QuestionType
-from utils.llm_utils import generate_questions_from_pdf
+from utils.generation_jobs import JOB_STATUS_LABELS, generation_job_queue
+from utils.llm_scheduler import RequestPriority, llm_scheduler
+from utils.llm_utils import OPENROUTER_MODELS
+from utils.model_health import model_health
 from utils.structured_logging import structured_logger as logger
 from utils.utils import professor_verification, update_last_interaction, autocomplete_question_type, is_professor, autocomplete_topics, autocomplete_all_topics, autocomplete_TF, safe_defer
 
@@ -43,7 +48,7 @@ def register(tree: app_commands.CommandTree):
                                operation="validation_error")
                 return
 
-            new_id = add_question(interaction.guild.id,
+            new_id = await run_db(add_question, interaction.guild.id,
                                   topic, question, answer.upper())
             await interaction.followup.send(
                 f"✅ Question added to `{topic}` with ID: `{new_id}`.",
@@ -69,7 +74,7 @@ def register(tree: app_commands.CommandTree):
         try:
             update_last_interaction(interaction.guild.id)
 
-            questions = list_questions_by_topic(interaction.guild.id, topic)
+            questions = await run_db(list_questions_by_topic, interaction.guild.id, topic)
 
             if not questions:
                 await interaction.followup.send(f"📭 No questions found for `{topic}`.", ephemeral=True)
@@ -119,7 +124,7 @@ def register(tree: app_commands.CommandTree):
         try:
             update_last_interaction(interaction.guild.id)
 
-            delete_question(interaction.guild.id, topic, id)
+            await run_db(delete_question, interaction.guild.id, topic, id)
             await interaction.followup.send(f"🗑️ Deleted question with ID `{id}` from `{topic}`", ephemeral=True)
 
         except Exception as e:
@@ -148,7 +153,7 @@ def register(tree: app_commands.CommandTree):
                 )
                 return
 
-            deleted_count = delete_all_questions_by_topic(interaction.guild.id, topic)
+            deleted_count = await run_db(delete_all_questions_by_topic, interaction.guild.id, topic)
 
             if deleted_count == 0:
                 await interaction.followup.send(
@@ -172,7 +177,7 @@ def register(tree: app_commands.CommandTree):
     @app_commands.default_permissions(administrator=True)
     @app_commands.describe(topic="Topic name", qty="Quantity of new questions", type="Question type")
     @app_commands.autocomplete(topic=autocomplete_topics, type=autocomplete_question_type)
-    async def generate_questions_command(interaction: Interaction, topic: str, qty: int, type: str):
+    async def generate_questions_command(interaction: Interaction, topic: str, qty: app_commands.Range[int, 1, 100], type: str):
         if not await professor_verification(interaction):
             return
         if not await safe_defer(interaction, thinking=True, ephemeral=True):
@@ -182,7 +187,7 @@ def register(tree: app_commands.CommandTree):
             update_last_interaction(interaction.guild.id)
 
             guild_id = interaction.guild.id
-            topic_data = get_topic_by_name(guild_id, topic)
+            topic_data = await run_db(get_topic_by_name, guild_id, topic)
 
             topic_name = topic_data["title"]
             topic_id = topic_data["topic_id"]
@@ -198,19 +203,93 @@ def register(tree: app_commands.CommandTree):
 
             question_type = str_to_enum[type]
 
-            generated = await generate_questions_from_pdf(
-                topic_name, topic_id, guild_id, topic_storage_url, 50, question_type)
-            if generated:
-                await interaction.followup.send(f"📭 Questions generated from `{topic_name}`", ephemeral=True)
-            else:
-                interaction.extras["command_failed"] = True
-                await interaction.followup.send(
-                    f"⚠️ Could not generate questions from `{topic_name}` right now (OpenRouter failed or requires credits).",
-                    ephemeral=True
-                )
+            # Regenerating an existing topic yields to uploads waiting for their first questions
+            job_id = await generation_job_queue.submit(
+                guild_id, interaction.channel_id, interaction.user.id, topic_name, topic_id,
+                topic_storage_url, qty, question_type, priority=RequestPriority.BULK)
+            await interaction.followup.send(
+                f"⏳ Generating {qty} questions from `{topic_name}` in the background (job `{job_id}`).\n"
+                f"I will post here when they are ready; use `/generation_status {job_id}` to follow it.",
+                ephemeral=True
+            )
 
         except Exception as e:
             try:
                 await interaction.followup.send(f"❌ Failed to generate questions: {e}", ephemeral=True)
             except Exception:
                 pass
+
+    @tree.command(name="generation_status", description="Show the progress of question generation jobs (Professors only)")
+    @app_commands.default_permissions(administrator=True)
+    @app_commands.describe(job_id="Job id (leave empty to list this server's active jobs)")
+    async def generation_status_command(interaction: Interaction, job_id: str = None):
+        if not await professor_verification(interaction):
+            return
+        if not await safe_defer(interaction, thinking=True, ephemeral=True):
+            return
+
+        try:
+            update_last_interaction(interaction.guild.id)
+
+            if job_id:
+                job = await run_db(get_generation_job, job_id.strip())
+                if job is None or job.get("guild_id") != str(interaction.guild.id):
+                    await interaction.followup.send(f"❌ Job `{job_id}` not found.", ephemeral=True)
+                    return
+                jobs = [job]
+            else:
+                jobs = await run_db(get_active_generation_jobs, interaction.guild.id)
+                if not jobs:
+                    await interaction.followup.send("📭 No generation jobs are running.", ephemeral=True)
+                    return
+
+            lines = []
+            for job in jobs[:10]:
+                stage = JOB_STATUS_LABELS.get(job.get("stage"), job.get("stage"))
+                progress = job.get("progress") or {}
+                if job.get("stage") == "generating" and progress.get("chunks_total"):
+                    stage += f" ({progress['chunks_done']}/{progress['chunks_total']} parts)"
+                line = f"`{job['job_id']}` — **{job['topic_name']}** ({job['qty']} questions): {stage}"
+                if job.get("error"):
+                    line += f"\n   ↳ {job['error']}"
+                lines.append(line)
+
+            await interaction.followup.send("\n".join(lines), ephemeral=True)
+
+        except Exception as e:
+            try:
+                await interaction.followup.send(f"❌ Failed to get generation status: {e}", ephemeral=True)
+            except Exception:
+                pass
+
+    @tree.command(name="model_health", description="Show how the question generation models are performing (Professors only)")
+    @app_commands.default_permissions(administrator=True)
+    async def model_health_command(interaction: Interaction):
+        if not await professor_verification(interaction):
+            return
+
+        try:
+            update_last_interaction(interaction.guild.id)
+
+            snapshot = model_health.snapshot(OPENROUTER_MODELS)
+            queues = llm_scheduler.stats()
+            lines = ["🩺 **Model health** (best first)"]
+            for position, model in enumerate(model_health.ranked(OPENROUTER_MODELS), start=1):
+                health = snapshot[model]
+                latency = f"{health['mean_latency']}s" if health["mean_latency"] is not None else "n/a"
+                line = (f"{position}. `{model}` — success {int(health['success_rate'] * 100)}% "
+                        f"over {health['requests']} request(s), latency {latency}")
+                if health["cooldown_remaining"]:
+                    line += f", ⏸️ paused {health['cooldown_remaining']}s ({health['last_error']})"
+                queue = queues.get(model)
+                if queue and (queue["queued"] or queue["in_flight"]):
+                    line += f", {queue['in_flight']} running / {queue['queued']} queued"
+                lines.append(line)
+
+            await interaction.response.send_message("\n".join(lines), ephemeral=True)
+
+        except Exception as e:
+            try:
+                await interaction.response.send_message(f"❌ Failed to get model health: {e}", ephemeral=True)
+            except Exception:
+                pass
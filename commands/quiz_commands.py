@@ -1,18 +1,17 @@
 import logging
-import random
 import re
 from discord import app_commands, Interaction, ButtonStyle
 import discord
 from discord.ui import View, Button
 
-from repositories.level_repository import add_xp, update_streak
-from repositories.question_repository import update_question_stats
-from repositories.server_repository import update_server_last_interaction
-from repositories.stats_repository import save_statistic
-from repositories.topic_repository import get_questions_by_topic
+from repositories.async_db import run_db
+from repositories.quiz_repository import quiz_result_committer
+from repositories.topic_repository import sample_questions_by_topic
+from utils.charts import chart_cache
 from utils.enum import QuestionType
 from utils.structured_logging import structured_logger as logger
-from utils.utils import autocomplete_quiz_topics, register_user_statistics, safe_defer
+from utils.utils import autocomplete_quiz_topics, safe_defer, update_last_interaction
+from utils.write_behind import question_stats_buffer
 
 
 class QuizButton(Button):
@@ -91,12 +90,12 @@ def register(tree: app_commands.CommandTree):
 
         try:
             if interaction.guild:
-                update_server_last_interaction(interaction.guild.id)
+                update_last_interaction(interaction.guild.id)
 
-            questions_data = get_questions_by_topic(
-                interaction.guild.id, topic_name)
+            questions = await run_db(
+                sample_questions_by_topic, interaction.guild.id, topic_name, 5)
 
-            if not questions_data:
+            if not questions:
                 await interaction.followup.send(
                     f"❌ There are no questions registered for the topic `{topic_name}`.",
                     ephemeral=True
@@ -111,16 +110,13 @@ def register(tree: app_commands.CommandTree):
                                operation="no_questions_found")
                 return
 
-            questions = random.sample(
-                questions_data, min(5, len(questions_data)))
-
             await interaction.followup.send("📋 Starting the quiz...", ephemeral=True)
 
             user_answers = []
 
             for idx, q in enumerate(questions):
-                data = q.to_dict()
-                question_id = q.id
+                data = q
+                question_id = q["id"]
                 q_type = data.get('question_type', 'True/False')
                 text = f"**{idx + 1}. {data.get('question', '')}**"
 
@@ -159,23 +155,12 @@ def register(tree: app_commands.CommandTree):
                     is_correct = choice.upper() == correct.upper()
                     user_answers.append((choice.upper(), correct.upper()))
 
-                    try:
-                        update_question_stats(
-                            guild_id=interaction.guild.id,
-                            topic_id=q.reference.parent.parent.id,
-                            question_id=question_id,
-                            correct=is_correct
-                        )
-                    except Exception as err:
-                        logger.warning(f"Error updating stats for question {question_id}: {err}",
-                                       command="quiz",
-                                       user_id=str(interaction.user.id),
-                                       username=interaction.user.display_name,
-                                       guild_id=str(
-                                           interaction.guild.id) if interaction.guild else None,
-                                       question_id=question_id,
-                                       error_type=type(err).__name__,
-                                       operation="stats_update_error")
+                    question_stats_buffer.record(
+                        guild_id=interaction.guild.id,
+                        topic_id=q["topic_id"],
+                        question_id=question_id,
+                        correct=is_correct
+                    )
 
                     return is_correct
 
@@ -218,24 +203,20 @@ def register(tree: app_commands.CommandTree):
 
             question_types = set()
             for q in questions:
-                q_type = q.to_dict().get('question_type', 'True/False')
+                q_type = q.get('question_type', 'True/False')
                 question_types.add(q_type)
 
             type_list = list(question_types)
 
-            register_user_statistics(
-                interaction.user, topic_name, correct_count, len(user_answers), type_list)
-            save_statistic(interaction.guild.id, interaction.user,
-                           topic_name, correct_count, len(user_answers))
-
             xp_gain = correct_count - (len(user_answers) - correct_count)
-            final_xp = add_xp(str(interaction.user.id),
-                              str(interaction.guild.id), xp_gain)
+            final_xp, streak = await run_db(
+                quiz_result_committer.commit,
+                interaction.guild.id, interaction.user, topic_name,
+                correct_count, len(user_answers), type_list, xp_gain)
+            chart_cache.bump_stats_version(interaction.guild.id)
             await interaction.followup.send(
                 f"✨ You gained {xp_gain} XP! Your total is now {final_xp} XP. Continue answering questions to earn more!", ephemeral=True)
 
-            streak = update_streak(str(interaction.user.id), str(
-                interaction.guild.id), correct_count == len(user_answers))
             if streak >= 3:
                 await interaction.followup.send(f"🔥 You're on a streak! ({streak} in a row)", ephemeral=True)
 
@@ -1,13 +1,13 @@
 import logging
-import matplotlib.pyplot as plt
-import matplotlib.patches as mpatches
 import io
+from datetime import datetime, timedelta, timezone
 from discord import app_commands, Interaction, File
 import discord
 
 from repositories import stats_repository, quiz_repository
-from repositories.server_repository import update_server_last_interaction
-from utils.utils import is_professor, professor_verification, safe_defer
+from repositories.async_db import run_db
+from utils.charts import chart_cache, chart_renderer, render_time_stats_chart, render_user_stats_chart
+from utils.utils import is_professor, professor_verification, safe_defer, update_last_interaction
 from utils.structured_logging import structured_logger as logger
 
 
@@ -18,7 +18,7 @@ def register(tree: app_commands.CommandTree):
     async def stats(interaction: discord.Interaction):
 
         try:
-            update_server_last_interaction(interaction.guild.id)
+            update_last_interaction(interaction.guild.id)
 
             if not await professor_verification(interaction):
                 return
@@ -26,7 +26,7 @@ def register(tree: app_commands.CommandTree):
             if not await safe_defer(interaction, thinking=True, ephemeral=True):
                 return
 
-            data = stats_repository.get_statistics_by_server(interaction.guild.id)
+            data = await run_db(stats_repository.get_statistics_by_server, interaction.guild.id)
 
             if not data:
                 logger.info("No statistics available for guild",
@@ -38,16 +38,22 @@ def register(tree: app_commands.CommandTree):
                 await interaction.followup.send("📂 No statistics recorded yet.", ephemeral=True)
                 return
 
-            user_count = len(data)
-            total_attempts = sum(len(info['attempts']) for info in data.values())
+            blocks = []
+            current_block = f"📊 **Bot usage statistics** (top {len(data)} users by attempts):\n"
+            for info in data.values():
+                entry = f"\n👤 {info['name']}: {info['summary'].get('attempts', 0)} attempt(s)"
+                for attempt in info['summary'].get('recent', [])[-3:]:
+                    entry += f"\n  • {attempt.get('topic_id', 'Unknown')}: {attempt.get('success', 0)}/{attempt.get('success', 0) + attempt.get('failures', 0)}"
+                if len(current_block) + len(entry) > 2000:
+                    blocks.append(current_block)
+                    current_block = ""
+                current_block += entry
 
-            summary = "📊 **Bot usage statistics:**\n"
-            for uid, info in data.items():
-                summary += f"\n👤 {info['name']}: {len(info['attempts'])} attempt(s)"
-                for attempt in info['attempts'][-3:]:
-                    summary += f"\n  • {attempt.get('topic_id', 'Unknown')}: {attempt.get('success', 0)}/{attempt.get('success', 0) + attempt.get('failures', 0)}"
+            if current_block:
+                blocks.append(current_block)
 
-            await interaction.followup.send(summary, ephemeral=True)
+            for block in blocks:
+                await interaction.followup.send(block, ephemeral=True)
 
         except Exception as e:
             logging.error(f"Error retrieving statistics: {e}")
@@ -61,7 +67,7 @@ def register(tree: app_commands.CommandTree):
     @app_commands.default_permissions(administrator=True)
     async def user_stats(interaction: discord.Interaction):
         try:
-            update_server_last_interaction(interaction.guild.id)
+            update_last_interaction(interaction.guild.id)
 
             if not await professor_verification(interaction):
                 return
@@ -70,79 +76,48 @@ def register(tree: app_commands.CommandTree):
             if not await safe_defer(interaction, thinking=True, ephemeral=True):
                 return
 
-            data = stats_repository.get_statistics_by_server(
-                interaction.guild.id)
-
-            if not data:
-                logger.info("No statistics available for guild",
-                            command="user_stats",
-                            user_id=str(interaction.user.id),
-                            username=interaction.user.name,
-                            guild_id=str(interaction.guild.id),
-                            operation="no_stats_found")
-                await interaction.followup.send("📂 No statistics recorded yet.", ephemeral=True)
-                return
-
-            names = []
-            attempts_by_user = {}
-
-            for uid, info in data.items():
-                name = info['name']
-                attempts = info['attempts']
-                scores = []
-
-                for attempt in attempts:
-                    success = attempt.get("success", 0)
-                    failures = attempt.get("failures", 0)
-                    total = success + failures
-
-                    if total == 0:
-                        continue
-
-                    avg = success / total
-                    scores.append(avg)
-
-                if scores:
-                    names.append(name)
-                    attempts_by_user[name] = scores
-
-            user_count = len(names)
-            total_attempts = sum(len(scores)
-                                 for scores in attempts_by_user.values())
-
-            fig, ax = plt.subplots(figsize=(12, 6))
-            bottom_map = {name: 0 for name in names}
-
-            for name in names:
-                scores = attempts_by_user[name]
-                for avg in scores:
-                    color = 'green' if avg >= 0.5 else 'red'
-                    ax.bar(name, 1, bottom=bottom_map[name], color=color)
-                    bottom_map[name] += 1
-
-            max_attempts = max(bottom_map.values(), default=0)
-            upper_limit = ((max_attempts + 4) // 5 + 1) * 5
-
-            ax.set_title('Quiz attempts per user')
-            ax.set_ylabel('Number of attempts')
-            ax.set_yticks(range(0, upper_limit + 1, 5))
-            ax.set_xlabel('Users')
-            plt.xticks(rotation=45, ha='right')
-
-            # Legend
-            green_patch = mpatches.Patch(color='green', label='≥ 50% correct')
-            red_patch = mpatches.Patch(color='red', label='< 50% correct')
-            ax.legend(handles=[green_patch, red_patch])
-
-            buf = io.BytesIO()
-            plt.tight_layout()
-            plt.savefig(buf, format='png')
-            buf.seek(0)
-            plt.close(fig)
+            cache_key = chart_cache.key(interaction.guild.id, "user_stats")
+            png = chart_cache.get(cache_key)
+
+            if png is None:
+                data = await run_db(
+                    stats_repository.get_statistics_by_server, interaction.guild.id)
+
+                if not data:
+                    logger.info("No statistics available for guild",
+                                command="user_stats",
+                                user_id=str(interaction.user.id),
+                                username=interaction.user.name,
+                                guild_id=str(interaction.guild.id),
+                                operation="no_stats_found")
+                    await interaction.followup.send("📂 No statistics recorded yet.", ephemeral=True)
+                    return
+
+                names = []
+                passed_by_user = {}
+                failed_by_user = {}
+
+                for uid, info in data.items():
+                    name = info['name']
+                    passed = info['summary'].get("passed", 0)
+                    failed = info['summary'].get("failed", 0)
+
+                    if passed + failed:
+                        names.append(name)
+                        passed_by_user[name] = passed
+                        failed_by_user[name] = failed
+
+                png = await chart_renderer.render(
+                    render_user_stats_chart,
+                    names,
+                    [passed_by_user[name] for name in names],
+                    [failed_by_user[name] for name in names]
+                )
+                chart_cache.put(cache_key, png)
 
             await interaction.followup.send(
-                content="📊 Quiz attempts per user (each bar segment = one attempt):",
-                file=File(fp=buf, filename="user_stats_stacked.png"),
+                content="📊 Quiz attempts per user (green = passed, red = failed):",
+                file=File(fp=io.BytesIO(png), filename="user_stats_stacked.png"),
                 ephemeral=True
             )
 
@@ -156,9 +131,10 @@ def register(tree: app_commands.CommandTree):
 
     @tree.command(name="time_stats", description="Shows a summary of the quizzes taken over time (professors only)")
     @app_commands.default_permissions(administrator=True)
-    async def time_stats(interaction: discord.Interaction):
+    @app_commands.describe(days="Only include the last N days (default: all time)")
+    async def time_stats(interaction: discord.Interaction, days: app_commands.Range[int, 1, 3650] = None):
         try:
-            update_server_last_interaction(interaction.guild.id)
+            update_last_interaction(interaction.guild.id)
 
             if not await professor_verification(interaction):
                 return
@@ -166,45 +142,36 @@ def register(tree: app_commands.CommandTree):
             if not await safe_defer(interaction, thinking=True, ephemeral=True):
                 return
 
-            temporal_data = quiz_repository.get_quizzes_by_period(
-                interaction.guild.id)
-
-            if not temporal_data:
-                logger.info("No temporal statistics available for guild",
-                            command="time_stats",
-                            user_id=str(interaction.user.id),
-                            username=interaction.user.name,
-                            guild_id=str(interaction.guild.id),
-                            operation="no_temporal_stats_found")
-                await interaction.followup.send("📂 No statistics recorded yet.", ephemeral=True)
-                return
+            start_date = None
+            if days:
+                start_date = datetime.now(timezone.utc).date() - timedelta(days=days - 1)
 
-            dates = list(temporal_data.keys())
-            values = list(temporal_data.values())
+            cache_key = chart_cache.key(interaction.guild.id, "time_stats", start_date)
+            png = chart_cache.get(cache_key)
 
-            max_value = max(values, default=0)
-            upper_limit = ((max_value + 4) // 5 + 1) * 5
+            if png is None:
+                temporal_data = await run_db(
+                    quiz_repository.get_quizzes_by_period, interaction.guild.id, start_date)
 
-            fig, ax = plt.subplots()
-            ax.plot(dates, values, marker='o')
-            ax.set_title('Quizzes over time')
-            ax.set_xlabel('Date')
-            ax.set_ylabel('Count')
-            ax.set_yticks(range(0, upper_limit + 1, 5))
-            plt.xticks(rotation=45)
+                if not temporal_data:
+                    logger.info("No temporal statistics available for guild",
+                                command="time_stats",
+                                user_id=str(interaction.user.id),
+                                username=interaction.user.name,
+                                guild_id=str(interaction.guild.id),
+                                operation="no_temporal_stats_found")
+                    await interaction.followup.send("📂 No statistics recorded yet.", ephemeral=True)
+                    return
 
-            buf = io.BytesIO()
-            plt.tight_layout()
-            plt.savefig(buf, format='png')
-            buf.seek(0)
-            plt.close(fig)
+                dates = list(temporal_data.keys())
+                values = list(temporal_data.values())
 
-            total_periods = len(dates)
-            total_quizzes = sum(values)
+                png = await chart_renderer.render(render_time_stats_chart, dates, values)
+                chart_cache.put(cache_key, png)
 
             await interaction.followup.send(
                 "📈 Statistics over time:",
-                file=discord.File(fp=buf, filename="time_stats.png"),
+                file=discord.File(fp=io.BytesIO(png), filename="time_stats.png"),
                 ephemeral=True
             )
 
@@ -4,13 +4,14 @@ import logging
 import os
 import json
 
+from repositories.async_db import run_db
 from repositories.topic_repository import create_topic_without_questions, create_topic_with_questions, get_topics_by_server, save_topic_pdf
 from utils.structured_logging import structured_logger as logger
 from utils.enum import QuestionType
 from utils.utils import professor_verification, update_last_interaction, is_professor, safe_defer, autocomplete_question_type
-from utils.llm_utils import generate_questions_from_pdf
+from utils.generation_jobs import generation_job_queue
 
-DOCS_PATH = "docs"
+MAX_PDF_UPLOAD_BYTES = int(os.getenv("MAX_PDF_UPLOAD_BYTES", str(25 * 1024 * 1024)))
 
 
 def _normalize_uploaded_questions(raw_data, question_type: QuestionType):
@@ -88,33 +89,33 @@ def _normalize_uploaded_questions(raw_data, question_type: QuestionType):
 
 # Function to save PDF to storage
 async def save_pdf(interaction: Interaction, file: discord.Attachment, topic_name: str):
+    """Upload the attachment to the bucket; returns (pdf_url, pdf_bytes) or (None, None)."""
     try:
         if not await professor_verification(interaction):
-            return None
+            return None, None
 
         if not file.filename.endswith(".pdf"):
             await interaction.followup.send("❌ Only PDF files are allowed.", ephemeral=True)
-            return
+            return None, None
 
-        os.makedirs(DOCS_PATH, exist_ok=True)
-        pdf_path = os.path.join(DOCS_PATH, f"{topic_name}.pdf")
-        await file.save(pdf_path)
+        if file.size > MAX_PDF_UPLOAD_BYTES:
+            await interaction.followup.send(
+                f"❌ The PDF is too large (max {MAX_PDF_UPLOAD_BYTES // (1024 * 1024)} MB).", ephemeral=True)
+            return None, None
 
-        pdf_url = save_topic_pdf(pdf_path, interaction.guild.id)
+        pdf_bytes = await file.read()
+        pdf_url = await run_db(save_topic_pdf, pdf_bytes, interaction.guild.id)
         print(pdf_url)
 
         if not pdf_url:
             await interaction.followup.send("❌ Storage Error: Failed to upload PDF.", ephemeral=True)
-            return None # To ensure the calling function knows it failed
-
-        if os.path.exists(pdf_path):
-            os.remove(pdf_path)
+            return None, None # To ensure the calling function knows it failed
 
-        return pdf_url
+        return pdf_url, pdf_bytes
 
     except Exception as e:
         logging.error(f"Error saving PDF: {e}")
-        return None
+        return None, None
 
 
 def register(tree: app_commands.CommandTree):
@@ -134,7 +135,7 @@ def register(tree: app_commands.CommandTree):
             except Exception as e:
                 logging.warning(f"Failed to update interaction: {e}")
 
-            topics = get_topics_by_server(interaction.guild.id, include_empty=False)
+            topics = await run_db(get_topics_by_server, interaction.guild.id, include_empty=False)
 
             if not topics:
                 await interaction.followup.send("📭 There are no topics with questions available yet.")
@@ -171,14 +172,14 @@ def register(tree: app_commands.CommandTree):
             except Exception as e:
                 logging.warning(f"Failed to update interaction: {e}")
 
-            pdf_url = await save_pdf(interaction, file, topic_name)
+            pdf_url, _ = await save_pdf(interaction, file, topic_name)
 
             if pdf_url is None:
                 return # Stop execution here if upload failed
 
             try:
                 guild_id = interaction.guild.id
-                create_topic_without_questions(guild_id, topic_name, pdf_url)
+                await run_db(create_topic_without_questions, guild_id, topic_name, pdf_url)
                 await interaction.followup.send("🧠 Topic created successfully, but without questions.", ephemeral=True)
 
             except Exception as e:
@@ -219,22 +220,20 @@ def register(tree: app_commands.CommandTree):
             except Exception as e:
                 logging.warning(f"Failed to update interaction: {e}")
 
-            pdf_url = await save_pdf(interaction, file, topic_name)
+            pdf_url, pdf_bytes = await save_pdf(interaction, file, topic_name)
 
             if pdf_url is None:
                 return # Stop execution here if upload failed
 
             guild_id = interaction.guild.id
-            generated = await generate_questions_from_pdf(
-                topic_name, None, guild_id, pdf_url, 50, QuestionType.TRUE_FALSE)
-            if generated:
-                await interaction.followup.send("🧠 Questions successfully generated from the PDF.", ephemeral=True)
-            else:
-                interaction.extras["command_failed"] = True
-                await interaction.followup.send(
-                    "⚠️ I could not generate questions from this PDF right now (OpenRouter failed or rate-limited).",
-                    ephemeral=True
-                )
+            job_id = await generation_job_queue.submit(
+                guild_id, interaction.channel_id, interaction.user.id, topic_name, None,
+                pdf_url, 50, QuestionType.TRUE_FALSE, pdf_bytes=pdf_bytes)
+            await interaction.followup.send(
+                f"📥 PDF uploaded. Generating questions in the background (job `{job_id}`).\n"
+                f"I will post here when they are ready; use `/generation_status {job_id}` to follow it.",
+                ephemeral=True
+            )
 
         except Exception as e:
             try:
@@ -299,7 +298,8 @@ def register(tree: app_commands.CommandTree):
                 )
                 return
 
-            topic_id = create_topic_with_questions(
+            topic_id = await run_db(
+                create_topic_with_questions,
                 guild_id=interaction.guild.id,
                 topic_title=topic_name,
                 topic_id=None,
@@ -0,0 +1,5 @@
+# Container entry point. Worker processes (see utils/worker_pool.py) re-run this
+# script as __mp_main__, so it must not import the bot outside the guard.
+if __name__ == "__main__":
+    import bot
+    bot.main()
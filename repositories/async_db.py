@@ -0,0 +1,24 @@
+import asyncio
+import functools
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+# The firebase_admin Firestore client is synchronous. Every repository call made
+# from a command handler goes through this bounded pool so a slow round trip only
+# ties up a worker thread instead of the Discord event loop.
+FIRESTORE_MAX_WORKERS = int(os.getenv("FIRESTORE_MAX_WORKERS", "16"))
+
+_executor = ThreadPoolExecutor(
+    max_workers=FIRESTORE_MAX_WORKERS,
+    thread_name_prefix="firestore"
+)
+
+
+async def run_db(func, *args, **kwargs):
+    """Run a blocking repository function on the Firestore executor and await its result."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, functools.partial(func, *args, **kwargs))
+
+
+def shutdown_db_executor(wait: bool = True):
+    _executor.shutdown(wait=wait)
@@ -0,0 +1,139 @@
+from datetime import datetime, timedelta, timezone
+from firebase_admin import firestore
+from firebase_init import db, SERVER_TIMESTAMP
+from utils.structured_logging import structured_logger as logger
+
+# Jobs live in a top-level collection so pending ones can be found across guilds at startup
+JOB_STATUS_QUEUED = "queued"
+JOB_STATUS_RUNNING = "running"
+JOB_STATUS_DONE = "done"
+JOB_STATUS_FAILED = "failed"
+ACTIVE_JOB_STATUSES = [JOB_STATUS_QUEUED, JOB_STATUS_RUNNING]
+
+
+def _jobs_collection():
+    return db.collection("generation_jobs")
+
+
+def create_generation_job(guild_id, channel_id, user_id, topic_name, topic_id,
+                          document_url, qty, qtype, priority):
+    """Persist a new question generation job and return its id."""
+    job_ref = _jobs_collection().document()
+    job_ref.set({
+        "job_id": job_ref.id,
+        "guild_id": str(guild_id),
+        "channel_id": str(channel_id) if channel_id else None,
+        "user_id": str(user_id),
+        "topic_name": topic_name,
+        "topic_id": topic_id,
+        "document_url": document_url,
+        "qty": qty,
+        "question_type": qtype.value,
+        "priority": int(priority),
+        "status": JOB_STATUS_QUEUED,
+        "stage": JOB_STATUS_QUEUED,
+        "attempts": 0,
+        "created_at": SERVER_TIMESTAMP,
+        "updated_at": SERVER_TIMESTAMP
+    })
+    logger.info(f"🗂️ Generation job {job_ref.id} queued for topic '{topic_name}'",
+                guild_id=str(guild_id),
+                operation="generation_job_created",
+                job_id=job_ref.id)
+    return job_ref.id
+
+
+def update_generation_job(job_id, **fields):
+    try:
+        _jobs_collection().document(job_id).update({**fields, "updated_at": SERVER_TIMESTAMP})
+    except Exception as e:
+        logger.error(f"❌ Error updating generation job {job_id}: {e}",
+                     operation="generation_job_update",
+                     job_id=job_id,
+                     error_type=type(e).__name__)
+
+
+def get_generation_job(job_id):
+    try:
+        doc = _jobs_collection().document(job_id).get()
+        return doc.to_dict() if doc.exists else None
+    except Exception as e:
+        logger.error(f"❌ Error getting generation job {job_id}: {e}",
+                     operation="generation_job_get",
+                     job_id=job_id,
+                     error_type=type(e).__name__)
+        return None
+
+
+def get_active_generation_jobs(guild_id=None):
+    """Return queued and running jobs, oldest first, optionally for a single guild."""
+    try:
+        query = _jobs_collection().where("status", "in", ACTIVE_JOB_STATUSES)
+        if guild_id is not None:
+            query = query.where("guild_id", "==", str(guild_id))
+
+        jobs = [doc.to_dict() for doc in query.stream()]
+        jobs.sort(key=lambda job: (job.get("priority", 0), str(job.get("created_at"))))
+        return jobs
+    except Exception as e:
+        logger.error(f"❌ Error listing active generation jobs: {e}",
+                     operation="generation_job_list",
+                     error_type=type(e).__name__)
+        return []
+
+
+@firestore.transactional
+def _claim_job(transaction, job_ref, owner, lease_seconds):
+    job = job_ref.get(transaction=transaction).to_dict()
+    if job is None or job.get("status") not in ACTIVE_JOB_STATUSES:
+        return None, None
+
+    now = datetime.now(timezone.utc)
+    lease_until = job.get("lease_until")
+    if job.get("owner") not in (None, owner) and lease_until is not None and lease_until > now:
+        return None, (lease_until - now).total_seconds()
+
+    attempts = job.get("attempts", 0) + 1
+    transaction.update(job_ref, {
+        "owner": owner,
+        "lease_until": now + timedelta(seconds=lease_seconds),
+        "status": JOB_STATUS_RUNNING,
+        "stage": JOB_STATUS_RUNNING,
+        "attempts": attempts,
+        "updated_at": SERVER_TIMESTAMP
+    })
+    return attempts, None
+
+
+def claim_generation_job(job_id, owner, lease_seconds):
+    """Take a job for `owner` unless another instance holds an unexpired lease on it.
+
+    Returns (attempts, None) once claimed, (None, seconds_until_lease_expiry)
+    if another instance is running it, or (None, None) if it is no longer active.
+    """
+    job_ref = _jobs_collection().document(job_id)
+    return _claim_job(db.transaction(), job_ref, owner, lease_seconds)
+
+
+@firestore.transactional
+def _renew_lease(transaction, job_ref, owner, lease_seconds):
+    job = job_ref.get(transaction=transaction).to_dict()
+    if job is None or job.get("owner") != owner:
+        return False
+    transaction.update(job_ref, {
+        "lease_until": datetime.now(timezone.utc) + timedelta(seconds=lease_seconds)
+    })
+    return True
+
+
+def renew_generation_job_lease(job_id, owner, lease_seconds):
+    """Extend owner's lease on a job; returns False if another instance has taken it over."""
+    try:
+        return _renew_lease(db.transaction(), _jobs_collection().document(job_id), owner, lease_seconds)
+    except Exception as e:
+        # Keep working; the lease is retried before it runs out
+        logger.warning(f"⚠️ Could not renew lease on generation job {job_id}: {e}",
+                       operation="generation_job_lease",
+                       job_id=job_id,
+                       error_type=type(e).__name__)
+        return True
@@ -1,42 +1,14 @@
 import logging
-from firebase_init import db, Increment
-from firebase_admin import firestore
+import os
+from datetime import datetime, timedelta, timezone
+from firebase_init import db, Increment, SERVER_TIMESTAMP
+from utils.leaderboard import leaderboard_store
 from utils.structured_logging import structured_logger as logger
 
-
-def add_xp(user_id: str, guild_id: str, xp_change: int):
-    try:
-        user_ref = db.collection("servers").document(
-            guild_id).collection("users").document(user_id)
-        user_data = user_ref.get().to_dict() or {}
-
-        current_xp = user_data.get("xp", 0)
-        new_xp = max(0, current_xp + xp_change)
-
-        user_ref.set({
-            "xp": new_xp,
-            "level": calculate_level(new_xp)
-        }, merge=True)
-
-        logger.info(
-            f"✅ XP updated for user {user_id} in guild {guild_id}",
-            operation="add_xp",
-            user_id=user_id,
-            guild_id=guild_id,
-            xp_change=xp_change,
-            new_xp=new_xp
-        )
-
-        return new_xp
-    except Exception as e:
-        logger.error(
-            f"❌ Error in add_xp: {e}",
-            operation="add_xp",
-            user_id=user_id,
-            guild_id=guild_id,
-            xp_change=xp_change
-        )
-        return 0
+# How often a loaded leaderboard picks up XP written by other instances (or lost with a crash)
+LEADERBOARD_RECONCILE_SECONDS = float(os.getenv("LEADERBOARD_RECONCILE_SECONDS", "60"))
+# Overlap for clock differences between this instance and Firestore's server timestamps
+LEADERBOARD_CLOCK_SKEW = timedelta(seconds=30)
 
 
 def get_user_xp(user_id: str, guild_id: str):
@@ -110,18 +82,68 @@ def get_user_xp_by_name(user_name: str, guild_id: str):
         return 0, 1
 
 
+def _leaderboard_snapshot_ref(guild_id: str):
+    return db.collection("servers").document(str(guild_id)) \
+             .collection("meta").document("leaderboard")
+
+
+def _users_collection(guild_id: str):
+    return db.collection("servers").document(str(guild_id)).collection("users")
+
+
+def _xp_entries(query) -> dict:
+    entries = {}
+    for user in query.select(["xp"]).stream():
+        xp = user.to_dict().get("xp")
+        if xp is not None:
+            entries[user.id] = xp
+    return entries
+
+
+def _load_leaderboard(guild_id: str):
+    """Install a guild's leaderboard from its snapshot, or from one XP scan if there is no usable one."""
+    leaderboard_store.begin_load(guild_id)
+    try:
+        snapshot = _leaderboard_snapshot_ref(guild_id).get()
+        snapshot_data = snapshot.to_dict() if snapshot.exists else {}
+        if snapshot_data.get("synced_at") is not None:
+            # Reconciled right after, so XP written after the snapshot is picked up
+            leaderboard_store.install(guild_id, snapshot_data.get("entries", {}), snapshot_data["synced_at"])
+            return
+
+        synced_at = datetime.now(timezone.utc)
+        entries = _xp_entries(_users_collection(guild_id))
+        leaderboard_store.install(guild_id, entries, synced_at)
+        leaderboard_store.mark_dirty([str(guild_id)])
+    except Exception:
+        leaderboard_store.cancel_load(guild_id)
+        raise
+
+
+def _ensure_leaderboard(guild_id: str):
+    """Load a guild's leaderboard into memory, and catch up on XP committed since its last sync.
+
+    QuizResultCommitter stamps xp_updated_at on every XP write, so catching up
+    reads only the users whose XP changed since then.
+    """
+    if leaderboard_store.synced_at(guild_id) is None:
+        _load_leaderboard(guild_id)
+
+    synced_at = leaderboard_store.synced_at(guild_id)
+    started_at = datetime.now(timezone.utc)
+    if started_at - synced_at < timedelta(seconds=LEADERBOARD_RECONCILE_SECONDS):
+        return
+
+    changed = _xp_entries(_users_collection(guild_id)
+                          .where("xp_updated_at", ">", synced_at - LEADERBOARD_CLOCK_SKEW))
+    leaderboard_store.reconcile(guild_id, changed, started_at)
+
+
 def get_leaderboard(guild_id: str, limit: int = 10):
     try:
-        users = (
-            db.collection("servers")
-            .document(guild_id)
-            .collection("users")
-            .order_by("xp", direction=firestore.Query.DESCENDING)
-            .limit(limit)
-            .stream()
-        )
-        leaderboard = [(u.id, u.to_dict().get("xp", 0),
-                        u.to_dict().get("level", 1)) for u in users]
+        _ensure_leaderboard(guild_id)
+        leaderboard = [(user_id, xp, calculate_level(xp))
+                       for user_id, xp in leaderboard_store.top(guild_id, limit)]
 
         logger.info(
             f"🏆 Leaderboard retrieved for guild {guild_id}",
@@ -142,42 +164,46 @@ def get_leaderboard(guild_id: str, limit: int = 10):
         return []
 
 
-def calculate_level(xp: int) -> int:
-    return xp // 100 + 1
-    # OR exponential curve:
-    # level = int((xp / 50) ** 0.5) + 1
-
-
-def update_streak(user_id, guild_id, is_correct):
+def get_user_rank(user_id: str, guild_id: str):
+    """Return (rank, total_ranked_users), or None if the user has no XP yet."""
     try:
-        user_ref = db.collection("servers").document(
-            guild_id).collection("users").document(user_id)
-        user_data = user_ref.get().to_dict() or {}
-        streak = user_data.get("streak", 0)
-
-        if is_correct:
-            streak += 1
-        else:
-            streak = 0
-
-        user_ref.set({"streak": streak}, merge=True)
-
-        logger.info(
-            f"🔥 Streak updated for user {user_id} in guild {guild_id}",
-            operation="update_streak",
-            user_id=user_id,
-            guild_id=guild_id,
-            is_correct=is_correct,
-            new_streak=streak
-        )
-
-        return streak
+        _ensure_leaderboard(guild_id)
+        return leaderboard_store.rank(guild_id, user_id)
     except Exception as e:
         logger.error(
-            f"❌ Error in update_streak: {e}",
-            operation="update_streak",
+            f"❌ Error in get_user_rank: {e}",
+            operation="get_user_rank",
             user_id=user_id,
-            guild_id=guild_id,
-            is_correct=is_correct
+            guild_id=guild_id
         )
-        return 0
+        return None
+
+
+def snapshot_leaderboards():
+    """Persist every leaderboard changed since the last snapshot so restarts start warm."""
+    changed = leaderboard_store.drain_dirty()
+    failed = []
+
+    for guild_id, (entries, synced_at) in changed.items():
+        try:
+            _leaderboard_snapshot_ref(guild_id).set({
+                "entries": entries,
+                "synced_at": synced_at,
+                "updated_at": SERVER_TIMESTAMP
+            })
+        except Exception as e:
+            logger.error(
+                f"❌ Error saving leaderboard snapshot: {e}",
+                operation="leaderboard_snapshot",
+                guild_id=guild_id
+            )
+            failed.append(guild_id)
+
+    leaderboard_store.mark_dirty(failed)
+    return len(changed) - len(failed)
+
+
+def calculate_level(xp: int) -> int:
+    return xp // 100 + 1
+    # OR exponential curve:
+    # level = int((xp / 50) ** 0.5) + 1
@@ -1,34 +1,28 @@
 import logging
+from google.api_core.exceptions import NotFound
 from firebase_init import db, Increment
+from repositories.topic_repository import get_topic_ref
+from utils.question_pool import question_pool_cache
+from utils.topic_cache import topic_catalog_cache
 
 
 def _get_topic_ref_by_name(guild_id: int, topic: str):
-    topic_ref = db.collection("servers") \
-                  .document(str(guild_id)) \
-                  .collection("topics") \
-                  .where("title", "==", topic) \
-                  .limit(1) \
-                  .get()
-
-    if not topic_ref:
+    topic_ref = get_topic_ref(guild_id, topic)
+
+    if topic_ref is None:
         raise ValueError(f"Topic '{topic}' not found")
 
-    return topic_ref[0].reference
+    return topic_ref
 
 
 def list_questions_by_topic(guild_id: int, topic: str):
     try:
-        topic_ref = db.collection("servers") \
-                      .document(str(guild_id)) \
-                      .collection("topics") \
-                      .where("title", "==", topic) \
-                      .limit(1) \
-                      .get()
-
-        if not topic_ref:
+        topic_ref = get_topic_ref(guild_id, topic)
+
+        if topic_ref is None:
             return []
 
-        questions_ref = topic_ref[0].reference.collection("questions").get()
+        questions_ref = topic_ref.collection("questions").get()
         questions = [{**doc.to_dict(), "id": doc.id} for doc in questions_ref]
         questions.sort(key=lambda q: q.get("question", ""))
 
@@ -52,6 +46,8 @@ def add_question(guild_id: int, topic: str, question: str, answer: str):
         topic_doc_ref.update({
             "num_quizzes_generated": Increment(1)
         })
+        topic_catalog_cache.invalidate(guild_id)
+        question_pool_cache.invalidate(guild_id, topic_doc_ref.id)
         return new_ref.id
 
     except Exception as e:
@@ -72,6 +68,8 @@ def delete_question(guild_id: int, topic: str, question_id: str):
         topic_doc_ref.update({
             "num_quizzes_generated": Increment(-1)
         })
+        topic_catalog_cache.invalidate(guild_id)
+        question_pool_cache.invalidate(guild_id, topic_doc_ref.id)
 
     except Exception as e:
         logging.error(
@@ -104,6 +102,8 @@ def delete_all_questions_by_topic(guild_id: int, topic: str):
         topic_doc_ref.update({
             "num_quizzes_generated": 0
         })
+        topic_catalog_cache.invalidate(guild_id)
+        question_pool_cache.invalidate(guild_id, topic_doc_ref.id)
 
         return deleted_count
 
@@ -113,25 +113,55 @@ def delete_all_questions_by_topic(guild_id: int, topic: str):
         raise
 
 
-def update_question_stats(guild_id: int, topic_id: str, question_id: str, correct: bool):
-    try:
-        topic_ref = db.collection("servers") \
-            .document(str(guild_id)) \
-            .collection("topics") \
-            .document(topic_id) \
-            .collection("questions") \
-            .document(question_id)
-
-        if correct:
-            topic_ref.update({
-                "success": Increment(1)
-            })
-        else:
-            topic_ref.update({
-                "failures": Increment(1)
-            })
+def apply_question_stats_deltas(deltas: dict):
+    """Apply buffered success/failure counts keyed by (guild_id, topic_id, question_id).
 
-    except Exception as e:
-        logging.error(
-            f"Error updating stats for question {question_id} in topic {topic_id} in server {guild_id}: {e}")
-        raise
+    Deltas are written as batched Increments. If a batch is rejected (e.g. a
+    question was deleted in the meantime) its updates are retried one by one,
+    dropping missing questions. Returns the deltas that could not be written.
+    """
+    items = [(key, counts) for key, counts in deltas.items() if counts[0] or counts[1]]
+    failed = {}
+
+    for start in range(0, len(items), 500):
+        chunk = items[start:start + 500]
+        batch = db.batch()
+        for key, counts in chunk:
+            batch.update(_question_ref(*key), _stats_increments(counts))
+
+        try:
+            batch.commit()
+            continue
+        except Exception as e:
+            logging.warning(f"Question stats batch rejected, retrying individually: {e}")
+
+        for key, counts in chunk:
+            try:
+                _question_ref(*key).update(_stats_increments(counts))
+            except NotFound:
+                logging.info(f"Dropping stats for deleted question {key[2]} in topic {key[1]}")
+            except Exception as e:
+                logging.error(
+                    f"Error updating stats for question {key[2]} in topic {key[1]} in server {key[0]}: {e}")
+                failed[key] = counts
+
+    return failed
+
+
+def _question_ref(guild_id, topic_id, question_id):
+    return db.collection("servers") \
+        .document(str(guild_id)) \
+        .collection("topics") \
+        .document(str(topic_id)) \
+        .collection("questions") \
+        .document(str(question_id))
+
+
+def _stats_increments(counts):
+    success, failures = counts
+    increments = {}
+    if success:
+        increments["success"] = Increment(success)
+    if failures:
+        increments["failures"] = Increment(failures)
+    return increments
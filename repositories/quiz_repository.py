@@ -1,32 +1,165 @@
-from firebase_init import db
-from datetime import datetime
+from firebase_init import db, SERVER_TIMESTAMP
+from firebase_admin import firestore
+from datetime import date, datetime
 from collections import defaultdict
+from typing import List
 import logging
 
+from repositories.level_repository import calculate_level
+from repositories.stats_repository import apply_attempt_to_summary
+from repositories.user_repository import attempts_collection, build_attempt
+from utils.leaderboard import leaderboard_store
+from utils.structured_logging import structured_logger as logger
 
-def get_quizzes_by_period(guild_id: int):
-    try:
-        users_ref = db.collection("servers") \
-                      .document(str(guild_id)) \
-                      .collection("users")
 
-        users_docs = users_ref.stream()
+def daily_stats_collection(guild_id):
+    """One rollup document per UTC day: servers/{guild}/daily_stats/{YYYY-MM-DD}."""
+    return db.collection("servers").document(str(guild_id)).collection("daily_stats")
 
-        quizzes_per_day = defaultdict(int)
 
-        for doc in users_docs:
-            data = doc.to_dict()
-            history = data.get("history", [])
+def get_quizzes_by_period(guild_id: int, start_date: date = None, end_date: date = None):
+    try:
+        query = daily_stats_collection(guild_id)
+
+        if start_date:
+            query = query.where("date", ">=", start_date.isoformat())
+        if end_date:
+            query = query.where("date", "<=", end_date.isoformat())
 
-            for entry in history:
-                quiz_date = entry.get("date")
-                if isinstance(quiz_date, datetime):
-                    date_str = quiz_date.date().isoformat()
-                    quizzes_per_day[date_str] += 1
+        quizzes_per_day = {}
+        for doc in query.order_by("date").stream():
+            data = doc.to_dict()
+            quizzes_per_day[data.get("date", doc.id)] = data.get("quizzes", 0)
 
-        ordered_quizzes = dict(sorted(quizzes_per_day.items()))
-        return ordered_quizzes
+        return quizzes_per_day
 
     except Exception as e:
         logging.error(f"❌ Error while getting quizzes by period: {e}")
         return {}
+
+
+def backfill_daily_rollups(guild_id) -> int:
+    """Rebuild daily_stats for a server from its attempts collection.
+
+    Rollups are overwritten, not incremented, so the job can be re-run safely.
+    Run it while the bot is idle; a quiz finishing mid-run may be counted twice
+    or not at all for that day. Returns the number of days written.
+    """
+    quizzes_per_day = defaultdict(int)
+
+    for doc in attempts_collection(guild_id).select(["date"]).stream():
+        quiz_date = doc.to_dict().get("date")
+        if isinstance(quiz_date, datetime):
+            quizzes_per_day[quiz_date.date().isoformat()] += 1
+
+    batch = db.batch()
+    pending = 0
+    for day, count in quizzes_per_day.items():
+        batch.set(daily_stats_collection(guild_id).document(day), {
+            "date": day,
+            "quizzes": count
+        })
+        pending += 1
+
+        if pending == 500:
+            batch.commit()
+            batch = db.batch()
+            pending = 0
+
+    if pending:
+        batch.commit()
+
+    logger.info(f"📅 Rebuilt {len(quizzes_per_day)} daily rollup(s) for server {guild_id}",
+                guild_id=str(guild_id),
+                day_count=len(quizzes_per_day),
+                operation="daily_rollup_backfill")
+    return len(quizzes_per_day)
+
+
+class QuizResultCommitter:
+    """Writes everything a finished quiz changes in a single Firestore transaction.
+
+    XP, level, streak and quiz summary on the user document, the attempt
+    document, the day's rollup counter and the new stats row are applied
+    together. Reading the user inside the transaction
+    means two quizzes finishing at once can no longer overwrite each other's
+    XP or streak; Firestore retries the loser against fresh data.
+    """
+
+    def __init__(self, client=db):
+        self.client = client
+
+    def commit(self, guild_id, user, topic: str, correct: int, total: int, types: List[str], xp_change: int):
+        """Returns (new_xp, streak), or (0, 0) if the transaction failed."""
+        server_ref = self.client.collection("servers").document(str(guild_id))
+        user_ref = server_ref.collection("users").document(str(user.id))
+        stats_ref = server_ref.collection("stats").document()
+        attempt_ref = attempts_collection(guild_id).document()
+        attempt = build_attempt(user.id, user.name, topic, correct, total, types)
+        daily_ref = daily_stats_collection(guild_id).document(attempt["date"].date().isoformat())
+
+        try:
+            new_xp, streak = _apply_quiz_result(
+                self.client.transaction(), user_ref, stats_ref, attempt_ref, attempt, daily_ref,
+                user, topic, correct, total, xp_change)
+            leaderboard_store.record_xp(guild_id, user.id, new_xp)
+
+            logger.info(f"🏁 Quiz result committed for user {user.name} ({user.id})",
+                        user_id=str(user.id),
+                        guild_id=str(guild_id),
+                        username=user.name,
+                        topic_id=topic,
+                        score=correct,
+                        total_questions=total,
+                        xp_change=xp_change,
+                        new_xp=new_xp,
+                        new_streak=streak,
+                        operation="quiz_result_commit")
+            return new_xp, streak
+        except Exception as e:
+            logger.error(f"❌ Error committing quiz result for user {user.name} ({user.id}): {e}",
+                         user_id=str(user.id),
+                         guild_id=str(guild_id),
+                         username=user.name,
+                         topic_id=topic,
+                         operation="quiz_result_commit",
+                         error_type=type(e).__name__)
+            return 0, 0
+
+
+@firestore.transactional
+def _apply_quiz_result(transaction, user_ref, stats_ref, attempt_ref, attempt, daily_ref,
+                       user, topic, correct, total, xp_change):
+    user_data = user_ref.get(transaction=transaction).to_dict() or {}
+
+    new_xp = max(0, user_data.get("xp", 0) + xp_change)
+    streak = user_data.get("streak", 0) + 1 if correct == total else 0
+
+    transaction.set(user_ref, {
+        "name": user.name,
+        "xp": new_xp,
+        "xp_updated_at": SERVER_TIMESTAMP,
+        "level": calculate_level(new_xp),
+        "streak": streak,
+        "summary": apply_attempt_to_summary(user_data.get("summary", {}), attempt)
+    }, merge=True)
+
+    transaction.set(attempt_ref, attempt)
+    transaction.set(daily_ref, {
+        "date": daily_ref.id,
+        "quizzes": firestore.Increment(1)
+    }, merge=True)
+
+    transaction.set(stats_ref, {
+        "user_id": str(user.id),
+        "name": user.name,
+        "topic": topic,
+        "correct": correct,
+        "total": total,
+        "timestamp": SERVER_TIMESTAMP
+    })
+
+    return new_xp, streak
+
+
+quiz_result_committer = QuizResultCommitter()
@@ -69,21 +69,32 @@ def update_server_metadata(guild):
                      error_type=type(e).__name__)
 
 
-def update_server_last_interaction(guild_id: int):
+def update_servers_last_interaction(last_interactions: dict):
+    """Write one merged last_interaction per guild, batched 500 writes at a time."""
     try:
-        db.collection("servers").document(str(guild_id)).set({
-            "server_id": str(guild_id),
-            "status": "Active",
-            "last_interaction": SERVER_TIMESTAMP
-        }, merge=True)
-        logger.info(f"🕒 Last interaction updated for server {guild_id}",
-                    guild_id=str(guild_id),
-                    operation="server_interaction_update")
+        batch = db.batch()
+        pending = 0
+
+        for guild_id, interaction_time in last_interactions.items():
+            batch.set(db.collection("servers").document(str(guild_id)), {
+                "server_id": str(guild_id),
+                "status": "Active",
+                "last_interaction": interaction_time
+            }, merge=True)
+            pending += 1
+
+            if pending == 500:
+                batch.commit()
+                batch = db.batch()
+                pending = 0
+
+        if pending:
+            batch.commit()
     except Exception as e:
-        logger.error(f"❌ Error while updating last interaction: {e}",
-                     guild_id=str(guild_id),
-                     operation="server_interaction_update",
+        logger.error(f"❌ Error while flushing last interactions: {e}",
+                     operation="server_interaction_flush",
                      error_type=type(e).__name__)
+        raise
 
 
 def deactivate_server(guild_id: int):
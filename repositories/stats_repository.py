@@ -1,47 +1,68 @@
-from firebase_init import db, SERVER_TIMESTAMP
+from firebase_init import db
+from firebase_admin import firestore
+from repositories.user_repository import attempts_collection
 import logging
+import os
 
 
-def save_statistic(guild_id, user, topic, correct, total):
-    try:
-        db.collection("servers").document(str(guild_id)).collection("stats").add({
-            "user_id": str(user.id),
-            "name": user.name,
-            "topic": topic,
-            "correct": correct,
-            "total": total,
-            "timestamp": SERVER_TIMESTAMP
-        })
-        logging.info(
-            f"✅ Statistic saved for user {user.id} in server {guild_id}")
-    except Exception as e:
-        logging.error(
-            f"❌ Error saving statistic for user {user.id} in server {guild_id}: {e}")
+SUMMARY_RECENT_ATTEMPTS = 5
+PASS_THRESHOLD = 0.5
+# /stats and /user_stats show the most active users only
+STATS_MAX_USERS = int(os.getenv("STATS_MAX_USERS", "50"))
+
+
+def apply_attempt_to_summary(summary: dict, attempt: dict) -> dict:
+    """Return the user's summary updated with one more attempt.
 
+    The summary keeps running totals plus the last SUMMARY_RECENT_ATTEMPTS
+    attempts, so /stats and /user_stats never need the full attempt list.
+    """
+    success = attempt.get("success", 0)
+    answered = success + attempt.get("failures", 0)
+    passed = answered > 0 and success / answered >= PASS_THRESHOLD
+
+    recent = list(summary.get("recent", []))
+    recent.append({
+        "date": attempt.get("date"),
+        "topic_id": attempt.get("topic_id"),
+        "success": success,
+        "failures": attempt.get("failures", 0)
+    })
+
+    return {
+        "attempts": summary.get("attempts", 0) + 1,
+        "total_correct": summary.get("total_correct", 0) + success,
+        "total_answered": summary.get("total_answered", 0) + answered,
+        "passed": summary.get("passed", 0) + (1 if passed else 0),
+        "failed": summary.get("failed", 0) + (0 if passed or answered == 0 else 1),
+        "recent": recent[-SUMMARY_RECENT_ATTEMPTS:]
+    }
 
-def get_statistics_by_server(guild_id: int):
+
+def get_statistics_by_server(guild_id: int, limit: int = STATS_MAX_USERS):
     """
-    Fetch all users from the server and return a dict with
-    the statistics from the 'history' field of each user.
+    Fetch the `limit` users of the server with the most quiz attempts and
+    return a dict keyed by user id with the user's name and quiz summary,
+    most active first.
     """
     try:
         users_docs = db.collection("servers") \
                        .document(str(guild_id)) \
                        .collection("users") \
+                       .where("summary.attempts", ">", 0) \
+                       .order_by("summary.attempts", direction=firestore.Query.DESCENDING) \
+                       .limit(limit) \
+                       .select(["name", "summary"]) \
                        .stream()
 
         data = {}
 
         for user_doc in users_docs:
             user_data = user_doc.to_dict()
-            user_name = user_data.get("name", "No name")
-            history = user_data.get("history", [])
-
-            if not history:
-                continue
-
-            uid = user_doc.id
-            data[uid] = {"name": user_name, "attempts": history}
+            data[user_doc.id] = {
+                "name": user_data.get("name", "No name"),
+                "summary": user_data["summary"]
+            }
 
         return data
 
@@ -49,3 +70,36 @@ def get_statistics_by_server(guild_id: int):
         logging.error(
             f"❌ Error fetching statistics for server {guild_id}: {e}")
         return {}
+
+
+def backfill_user_summaries(guild_id) -> int:
+    """Rebuild every user's summary from the attempts collection. Returns the number of users written."""
+    summaries = {}
+    names = {}
+
+    for attempt_doc in attempts_collection(guild_id).order_by("date").stream():
+        attempt = attempt_doc.to_dict()
+        uid = attempt.get("user_id")
+        if not uid:
+            continue
+
+        summaries[uid] = apply_attempt_to_summary(summaries.get(uid, {}), attempt)
+        names[uid] = attempt.get("user_name", "No name")
+
+    users_ref = db.collection("servers").document(str(guild_id)).collection("users")
+    batch = db.batch()
+    pending = 0
+    for uid, summary in summaries.items():
+        batch.set(users_ref.document(uid), {"summary": summary}, merge=True)
+        pending += 1
+
+        if pending == 500:
+            batch.commit()
+            batch = db.batch()
+            pending = 0
+
+    if pending:
+        batch.commit()
+
+    logging.info(f"✅ Rebuilt summaries for {len(summaries)} user(s) in server {guild_id}")
+    return len(summaries)
@@ -1,5 +1,116 @@
+import io
 import logging
-from firebase_init import db, bucket, SERVER_TIMESTAMP
+import os
+from urllib.parse import unquote, urlparse
+from firebase_admin import firestore
+from firebase_init import db, bucket, Increment, SERVER_TIMESTAMP
+from utils.question_pool import compact_question, question_pool_cache, sample_questions
+from utils.topic_cache import topic_catalog_cache, topic_title_index
+
+TOPIC_INDEX_PERSIST = os.getenv("TOPIC_INDEX_PERSIST", "true").lower() == "true"
+# Must be a multiple of 256 KiB (a Cloud Storage requirement for resumable uploads)
+PDF_UPLOAD_CHUNK_BYTES = int(os.getenv("PDF_UPLOAD_CHUNK_BYTES", str(8 * 1024 * 1024)))
+
+
+def _topics_collection(guild_id):
+    return db.collection("servers").document(str(guild_id)).collection("topics")
+
+
+def _topic_index_ref(guild_id):
+    return db.collection("servers").document(str(guild_id)) \
+             .collection("meta").document("topic_index")
+
+
+def _persist_topic_titles(guild_id, titles: dict):
+    """Merge title -> topic_id entries into the stored index.
+
+    Only the given entries are written, so titles another instance added
+    since this one loaded the index are kept.
+    """
+    if not TOPIC_INDEX_PERSIST:
+        return
+
+    try:
+        _topic_index_ref(guild_id).set({
+            "topics": titles,
+            "updated_at": SERVER_TIMESTAMP
+        }, merge=True)
+    except Exception as e:
+        logging.warning(f"Could not persist topic index for server {guild_id}: {e}")
+
+
+def _forget_topic_title(guild_id, title):
+    topic_title_index.discard(guild_id, title)
+    if not TOPIC_INDEX_PERSIST:
+        return
+
+    try:
+        _topic_index_ref(guild_id).update({
+            firestore.FieldPath("topics", title).to_api_repr(): firestore.DELETE_FIELD,
+            "updated_at": SERVER_TIMESTAMP
+        })
+    except Exception as e:
+        logging.warning(f"Could not remove '{title}' from the topic index of server {guild_id}: {e}")
+
+
+def _load_topic_index(guild_id):
+    """Load the title index from the cached catalog, the persisted meta doc, or one topics scan."""
+    catalog = topic_catalog_cache.get(guild_id)
+    if catalog is not None:
+        index = {}
+        for entry in catalog:
+            index.setdefault(entry["title"], entry["topic_id"])
+        topic_title_index.load(guild_id, index)
+        return
+
+    if TOPIC_INDEX_PERSIST:
+        snapshot = _topic_index_ref(guild_id).get()
+        if snapshot.exists:
+            topic_title_index.load(guild_id, snapshot.to_dict().get("topics", {}))
+            return
+
+    index = {}
+    for doc in _topics_collection(guild_id).select(["title"]).stream():
+        title = doc.to_dict().get("title")
+        if title:
+            index.setdefault(title, doc.id)
+    topic_title_index.load(guild_id, index)
+    _persist_topic_titles(guild_id, index)
+
+
+def register_topic_title(guild_id, topic_title, topic_id):
+    if topic_title_index.add(guild_id, topic_title, topic_id):
+        _persist_topic_titles(guild_id, {topic_title: topic_id})
+
+
+def resolve_topic_id(guild_id, topic_title):
+    """Map a topic title to its document id from the in-memory index.
+
+    Falls back to a title query only for titles the index has never seen,
+    e.g. topics created outside the bot, and remembers the answer.
+    """
+    if not topic_title_index.is_loaded(guild_id):
+        _load_topic_index(guild_id)
+
+    topic_id = topic_title_index.lookup(guild_id, topic_title)
+    if topic_id is not None:
+        return topic_id
+
+    documents = _topics_collection(guild_id).where(
+        "title", "==", topic_title).limit(1).get()
+    if not documents:
+        return None
+
+    topic_id = documents[0].id
+    register_topic_title(guild_id, topic_title, topic_id)
+    return topic_id
+
+
+def get_topic_ref(guild_id, topic_title):
+    topic_id = resolve_topic_id(guild_id, topic_title)
+    if topic_id is None:
+        return None
+    return _topics_collection(guild_id).document(topic_id)
 
 
 def list_topics(guild_id):
@@ -13,6 +124,68 @@ def list_topics(guild_id):
         return []
 
 
+def _generated_question_payload(question_id, question, qtype):
+    answer_value = question.get("answer")
+    if answer_value in (None, ""):
+        answer_value = question.get("correct_answer")
+    return {
+        "question_id": question_id,
+        "question": question.get("question"),
+        "alternatives": question.get("alternatives", ""),
+        "correct_answer": answer_value,
+        "question_type": qtype.value,
+        "success": 0,
+        "failures": 0
+    }
+
+
+def add_generated_question(guild_id, topic_id, question, qtype):
+    """Save one generated question as soon as it is available (streaming generation).
+
+    The question and the topic's question count go in one batch, so an
+    interrupted generation never leaves questions the count does not include.
+    """
+    topic_ref = _topics_collection(guild_id).document(str(topic_id))
+    doc_ref = topic_ref.collection("questions").document()
+    batch = db.batch()
+    batch.set(doc_ref, _generated_question_payload(doc_ref.id, question, qtype))
+    batch.update(topic_ref, {"num_quizzes_generated": Increment(1)})
+    batch.commit()
+    topic_catalog_cache.invalidate(guild_id)
+    question_pool_cache.invalidate(guild_id, topic_id)
+    return doc_ref.id
+
+
+def get_topic_question_texts(guild_id, topic_id):
+    """Return the text of every question stored in a topic."""
+    questions = _topics_collection(guild_id).document(str(topic_id)) \
+        .collection("questions").select(["question"]).stream()
+    return [doc.to_dict().get("question") or "" for doc in questions]
+
+
+def delete_topic_if_empty(guild_id, topic_id):
+    """Delete a topic that never received a question, e.g. after its generation job failed."""
+    try:
+        topic_ref = _topics_collection(guild_id).document(str(topic_id))
+        if topic_ref.collection("questions").limit(1).get():
+            return False
+
+        topic_doc = topic_ref.get()
+        if not topic_doc.exists:
+            return False
+
+        topic_ref.delete()
+        title = topic_doc.to_dict().get("title")
+        if title and topic_title_index.lookup(guild_id, title) == str(topic_id):
+            _forget_topic_title(guild_id, title)
+        topic_catalog_cache.invalidate(guild_id)
+        logging.info(f"Empty topic {topic_id} deleted in server {guild_id}")
+        return True
+    except Exception as e:
+        logging.error(f"Error deleting empty topic {topic_id} in server {guild_id}: {e}")
+        return False
+
+
 def create_topic_with_questions(guild_id, topic_title, topic_id, new_questions, document_url, qty, qtype):
     try:
         use_topic_id = None
@@ -32,6 +205,7 @@ def create_topic_with_questions(guild_id, topic_title, topic_id, new_questions,
                 "topic_id": new_topic_id
             }
             topic_ref.set(topic_data)
+            register_topic_title(guild_id, topic_title, new_topic_id)
         else:
             topic_ref = db.collection("servers").document(
                 str(guild_id)).collection("topics").document(str(topic_id))
@@ -40,20 +214,13 @@ def create_topic_with_questions(guild_id, topic_title, topic_id, new_questions,
         batch = db.batch()
         for idx, question in enumerate(new_questions):
             doc_ref = topic_ref.collection("questions").document()
-            question_id = doc_ref.id
-            answer_value = question.get("answer")
-            if answer_value in (None, ""):
-                answer_value = question.get("correct_answer")
-            batch.set(doc_ref, {
-                "question_id": question_id,
-                "question": question.get("question"),
-                "alternatives": question.get("alternatives", ""),
-                "correct_answer": answer_value,
-                "question_type": qtype.value,
-                "success": 0,
-                "failures": 0
-            })
+            batch.set(doc_ref, _generated_question_payload(doc_ref.id, question, qtype))
+        if topic_id is not None:
+            # A new topic is created with its count; an existing one is raised with its questions
+            batch.update(topic_ref, {"num_quizzes_generated": Increment(len(new_questions))})
         batch.commit()
+        topic_catalog_cache.invalidate(guild_id)
+        question_pool_cache.invalidate(guild_id, use_topic_id)
         logging.info(
             f"Topic '{topic_title}' with questions created/updated in server {guild_id} (ID: {use_topic_id})")
         return use_topic_id
@@ -78,6 +245,8 @@ def create_topic_without_questions(guild_id, topic_title, document_url):
             "topic_id": topic_id
         }
         topic_ref.set(topic_data)
+        register_topic_title(guild_id, topic_title, topic_id)
+        topic_catalog_cache.invalidate(guild_id)
         logging.info(
             f"Topic '{topic_title}' created without questions in server {guild_id} (ID: {topic_id})")
         return topic_id
@@ -103,58 +272,97 @@ def get_topics_by_server(guild_id: int, include_empty: bool = True):
         return []
 
 
-def get_questions_by_topic(guild_id: int, topic_title: str):
+def get_topic_catalog(guild_id: int):
+    """Return [{title, topic_id, num_questions}] for the guild, served from memory when cached."""
+    catalog = topic_catalog_cache.get(guild_id)
+    if catalog is not None:
+        return catalog
+
+    generation = topic_catalog_cache.generation(guild_id)
     try:
-        topic_collection = db.collection("servers") \
-            .document(str(guild_id)) \
-            .collection("topics")
+        documents = db.collection("servers") \
+                      .document(str(guild_id)) \
+                      .collection("topics") \
+                      .get()
+    except Exception as e:
+        logging.error(f"Error loading topic catalog for server {guild_id}: {e}")
+        return []
+
+    catalog = []
+    for doc in documents:
+        data = doc.to_dict()
+        catalog.append({
+            "title": data.get("title", "Untitled"),
+            "topic_id": doc.id,
+            "num_questions": data.get("num_quizzes_generated", 0)
+        })
+
+    topic_catalog_cache.set(guild_id, catalog, generation)
+    return catalog
 
-        documents = topic_collection.where(
-            "title", "==", topic_title).limit(1).get()
 
-        if not documents:
+def get_question_pool(guild_id: int, topic_title: str):
+    """Return compact question records for a topic, reading Firestore only on a cache miss."""
+    try:
+        topic_ref = get_topic_ref(guild_id, topic_title)
+
+        if topic_ref is None:
             return []
 
-        topic_doc = documents[0]
-        return topic_doc.reference.collection("questions").get()
+        records = question_pool_cache.get(guild_id, topic_ref.id)
+        if records is not None:
+            return records
+
+        generation = question_pool_cache.generation(guild_id, topic_ref.id)
+        records = [
+            compact_question(doc.id, topic_ref.id, doc.to_dict())
+            for doc in topic_ref.collection("questions").get()
+        ]
+        question_pool_cache.set(guild_id, topic_ref.id, records, generation)
+        return records
 
     except Exception as e:
         logging.error(
-            f"Error getting questions for topic '{topic_title}': {e}")
+            f"Error getting question pool for topic '{topic_title}': {e}")
         return []
 
 
+def sample_questions_by_topic(guild_id: int, topic_title: str, k: int):
+    return sample_questions(get_question_pool(guild_id, topic_title), k)
+
+
 def get_topic_by_name(guild_id: int, topic_name: str):
     try:
-        topic_collection = db.collection("servers") \
-            .document(str(guild_id)) \
-            .collection("topics")
+        topic_ref = get_topic_ref(guild_id, topic_name)
 
-        document = topic_collection.where(
-            "title", "==", topic_name).limit(1).get()
+        if topic_ref is None:
+            return None
 
-        if not document:
+        topic_doc = topic_ref.get()
+        if not topic_doc.exists:
+            _forget_topic_title(guild_id, topic_name)
             return None
 
-        topic_doc = document[0]
         return topic_doc.to_dict()
     except Exception as e:
         logging.error(f"Error getting topic '{topic_name}': {e}")
         return None
 
 
-def save_topic_pdf(pdf_path, guild_id):
+def save_topic_pdf(pdf_bytes, guild_id):
     try:
         topic_ref = db.collection("servers").document(
             str(guild_id)).collection("topics").document()
         topic_id = topic_ref.id
 
         storage_filename = f"{topic_id}.pdf"
-        blob = bucket.blob(f"{guild_id}/topics/{storage_filename}")
+        blob = bucket.blob(f"{guild_id}/topics/{storage_filename}",
+                           chunk_size=PDF_UPLOAD_CHUNK_BYTES)
 
-        with open(pdf_path, "rb") as f:
-            blob.upload_from_file(f, content_type="application/pdf")
-            blob.make_public()
+        # Uploaded straight from memory; files above chunk_size go up as a resumable upload
+        blob.upload_from_file(io.BytesIO(pdf_bytes), size=len(pdf_bytes),
+                              content_type="application/pdf")
+        blob.make_public()
 
         document_url = blob.public_url
         logging.info(
@@ -163,3 +371,38 @@ def save_topic_pdf(pdf_path, guild_id):
     except Exception as e:
         logging.error(f"Error saving topic PDF for server {guild_id}: {e}")
         return None
+
+
+def _text_blob_name_for_pdf_url(document_url):
+    """Return the name of the blob holding a topic PDF's extracted text (<name>.txt next to it)."""
+    path = unquote(urlparse(document_url).path).lstrip("/")
+    prefix = f"{bucket.name}/"
+    if not path.startswith(prefix) or not path.endswith(".pdf"):
+        return None
+    return path[len(prefix):-len(".pdf")] + ".txt"
+
+
+def load_topic_pdf_text(document_url):
+    """Return (content_hash, text) stored next to a topic PDF, or (None, None)."""
+    try:
+        blob_name = _text_blob_name_for_pdf_url(document_url)
+        blob = bucket.get_blob(blob_name) if blob_name else None
+        if blob is None:
+            return None, None
+
+        return (blob.metadata or {}).get("sha256"), blob.download_as_text(encoding="utf-8")
+    except Exception as e:
+        logging.warning(f"Could not load cached PDF text for {document_url}: {e}")
+        return None, None
+
+
+def save_topic_pdf_text(document_url, content_hash, text):
+    try:
+        blob_name = _text_blob_name_for_pdf_url(document_url)
+        if blob_name is None:
+            return
+        blob = bucket.blob(blob_name)
+        blob.metadata = {"sha256": content_hash}
+        blob.upload_from_string(text, content_type="text/plain; charset=utf-8")
+    except Exception as e:
+        logging.warning(f"Could not save cached PDF text for {document_url}: {e}")
@@ -73,38 +73,67 @@ def register_single_user(guild, member):
         return None
 
 
-def register_user_history(user_id: int, guild_id: int, user_name: str, topic_id: str, correct: int, total: int, types: List[str]):
-    try:
-        user_doc_ref = db.collection("servers") \
-                         .document(str(guild_id)) \
-                         .collection("users") \
-                         .document(str(user_id))
-
-        now_utc = datetime.now(tz=pytz.UTC)
-
-        user_doc_ref.update({
-            "history": firestore.ArrayUnion([{
-                "date": now_utc,
-                "failures": total - correct,
-                "success": correct,
-                "type": types,
-                "topic_id": topic_id
-            }])
-        })
+def attempts_collection(guild_id):
+    """Quiz attempts live in servers/{guild}/attempts, one small document each."""
+    return db.collection("servers").document(str(guild_id)).collection("attempts")
 
-        logger.info(f"📌 History entry added for user {user_name} ({user_id})",
-                    user_id=str(user_id),
-                    guild_id=str(guild_id),
-                    username=user_name,
-                    topic_id=topic_id,
-                    score=correct,
-                    total_questions=total,
-                    operation="quiz_history_update")
-    except Exception as e:
-        logger.error(f"❌ Error adding history entry for user {user_name} ({user_id}): {e}",
-                     user_id=str(user_id),
-                     guild_id=str(guild_id),
-                     username=user_name,
-                     topic_id=topic_id,
-                     operation="quiz_history_update",
-                     error_type=type(e).__name__)
+
+def build_attempt(user_id, user_name: str, topic_id: str, correct: int, total: int, types: List[str], date=None):
+    return {
+        "user_id": str(user_id),
+        "user_name": user_name,
+        "date": date or datetime.now(tz=pytz.UTC),
+        "failures": total - correct,
+        "success": correct,
+        "type": types,
+        "topic_id": topic_id
+    }
+
+
+def migrate_user_history(guild_id) -> int:
+    """Move legacy `history` arrays from user documents into the attempts collection.
+
+    Attempt ids are derived from the user id and array position, so re-running
+    after a partial failure does not duplicate attempts. The array is removed in
+    the same batch as its last attempts. Returns the number of attempts migrated.
+    """
+    migrated = 0
+    users_ref = db.collection("servers").document(str(guild_id)).collection("users")
+
+    for user_doc in users_ref.stream():
+        user_data = user_doc.to_dict() or {}
+        history = user_data.get("history")
+        if history is None:
+            continue
+
+        user_name = user_data.get("name", "No name")
+        batch = db.batch()
+        pending = 0
+
+        for index, entry in enumerate(history):
+            attempt = {
+                "user_id": user_doc.id,
+                "user_name": user_name,
+                "date": entry.get("date"),
+                "failures": entry.get("failures", 0),
+                "success": entry.get("success", 0),
+                "type": entry.get("type", []),
+                "topic_id": entry.get("topic_id")
+            }
+            batch.set(attempts_collection(guild_id).document(f"{user_doc.id}-{index}"), attempt)
+            pending += 1
+
+            if pending == 499:
+                batch.commit()
+                batch = db.batch()
+                pending = 0
+
+        batch.update(user_doc.reference, {"history": firestore.DELETE_FIELD})
+        batch.commit()
+        migrated += len(history)
+
+    logger.info(f"📦 Migrated {migrated} history entries for server {guild_id}",
+                guild_id=str(guild_id),
+                migrated_count=migrated,
+                operation="history_migration")
+    return migrated
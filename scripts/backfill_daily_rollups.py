@@ -0,0 +1,21 @@
+"""Rebuild servers/{guild}/daily_stats rollups from the attempts collection.
+
+Run after scripts.migrate_user_history, from the repository root:
+    python -m scripts.backfill_daily_rollups            # every server
+    python -m scripts.backfill_daily_rollups <guild_id>  # a single server
+"""
+import sys
+
+from repositories.quiz_repository import backfill_daily_rollups
+from scripts.guild_cli import run_for_guilds
+
+
+def main(guild_ids):
+    _, servers = run_for_guilds(
+        guild_ids, backfill_daily_rollups,
+        lambda guild_id, days: f"📅 {guild_id}: {days} day(s) rebuilt")
+    print(f"✅ Backfill finished for {servers} server(s)")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
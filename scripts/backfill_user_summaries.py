@@ -0,0 +1,21 @@
+"""Rebuild the per-user quiz `summary` field from the attempts collection.
+
+Run after scripts.migrate_user_history, from the repository root:
+    python -m scripts.backfill_user_summaries            # every server
+    python -m scripts.backfill_user_summaries <guild_id>  # a single server
+"""
+import sys
+
+from repositories.stats_repository import backfill_user_summaries
+from scripts.guild_cli import run_for_guilds
+
+
+def main(guild_ids):
+    _, servers = run_for_guilds(
+        guild_ids, backfill_user_summaries,
+        lambda guild_id, users: f"👤 {guild_id}: {users} user summary(ies) rebuilt")
+    print(f"✅ Backfill finished for {servers} server(s)")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
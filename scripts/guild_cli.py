@@ -0,0 +1,23 @@
+"""Shared per-server loop for the maintenance scripts in this folder.
+
+Each script passes the guild ids from its command line (none means every
+server), the repository function to run for one guild, and how to report
+that guild's count.
+"""
+from firebase_init import db
+
+
+def all_guild_ids():
+    return [doc.id for doc in db.collection("servers").select([]).stream()]
+
+
+def run_for_guilds(guild_ids, job, describe):
+    """Run job(guild_id) for each server and print describe(guild_id, count); returns (total, server count)."""
+    guild_ids = list(guild_ids) or all_guild_ids()
+
+    total = 0
+    for guild_id in guild_ids:
+        count = job(guild_id)
+        print(describe(guild_id, count))
+        total += count
+    return total, len(guild_ids)
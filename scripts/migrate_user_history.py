@@ -0,0 +1,21 @@
+"""Move legacy user `history` arrays into servers/{guild}/attempts.
+
+Run from the repository root:
+    python -m scripts.migrate_user_history            # every server
+    python -m scripts.migrate_user_history <guild_id>  # a single server
+"""
+import sys
+
+from repositories.user_repository import migrate_user_history
+from scripts.guild_cli import run_for_guilds
+
+
+def main(guild_ids):
+    total, servers = run_for_guilds(
+        guild_ids, migrate_user_history,
+        lambda guild_id, migrated: f"📦 {guild_id}: {migrated} attempt(s) migrated")
+    print(f"✅ Migration finished: {total} attempt(s) across {servers} server(s)")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
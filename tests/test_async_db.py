@@ -0,0 +1,85 @@
+import asyncio
+import statistics
+import threading
+import time
+
+from repositories.async_db import FIRESTORE_MAX_WORKERS, run_db
+
+SESSIONS = 200
+ROUND_TRIP_SECONDS = 0.002
+
+
+class FakeFirestore:
+    """In-memory stand-in for the synchronous client: every call blocks for one round trip."""
+
+    def __init__(self, round_trip=ROUND_TRIP_SECONDS):
+        self.round_trip = round_trip
+        self.documents = {}
+        self._lock = threading.Lock()
+
+    def get(self, path):
+        time.sleep(self.round_trip)
+        with self._lock:
+            return self.documents.get(path)
+
+    def increment(self, path, field):
+        time.sleep(self.round_trip)
+        with self._lock:
+            document = self.documents.setdefault(path, {})
+            document[field] = document.get(field, 0) + 1
+
+
+async def quiz_session(db, call, guild, user, latencies):
+    """One /quiz: load the questions, record five answers, then commit the result."""
+    interactions = [(db.get, f"guilds/{guild}/topics/t")]
+    interactions += [(db.increment, f"guilds/{guild}/questions/q{i}", "success") for i in range(5)]
+    interactions.append((db.increment, f"guilds/{guild}/users/{user}", "xp"))
+
+    for func, *args in interactions:
+        started = time.perf_counter()
+        await call(func, *args)
+        latencies.append(time.perf_counter() - started)
+
+
+async def direct_call(func, *args):
+    return func(*args)
+
+
+async def heartbeat(lags, stop):
+    """Measure how late the event loop wakes a task that asks to run every millisecond."""
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(0.001)
+        lags.append(time.perf_counter() - started - 0.001)
+
+
+async def run_sessions(call):
+    db = FakeFirestore()
+    latencies, lags = [], []
+    stop = asyncio.Event()
+    beat = asyncio.ensure_future(heartbeat(lags, stop))
+    await asyncio.sleep(0)
+    await asyncio.gather(*(quiz_session(db, call, i % 20, i, latencies) for i in range(SESSIONS)))
+    stop.set()
+    await beat
+    assert db.documents["guilds/0/users/0"] == {"xp": 1}
+    return latencies, lags
+
+
+def p99(samples):
+    return statistics.quantiles(samples, n=100)[98]
+
+
+def test_p99_latency_with_200_concurrent_quiz_sessions():
+    latencies, lags = asyncio.run(run_sessions(run_db))
+    _, blocking_lags = asyncio.run(run_sessions(direct_call))
+
+    calls = SESSIONS * 7
+    assert len(latencies) == calls
+    # All sessions queue on the executor: a call waits at most for one full round of the queue
+    queue_bound = calls / FIRESTORE_MAX_WORKERS * ROUND_TRIP_SECONDS
+    assert p99(latencies) < queue_bound * 3
+
+    # The loop keeps serving other interactions, while calling the client inline stalls it
+    assert p99(lags) < 0.1
+    assert max(blocking_lags) > 10 * p99(lags)
@@ -0,0 +1,89 @@
+import asyncio
+import random
+import time
+
+import pytest
+
+pytest.importorskip("matplotlib")
+
+from utils.charts import ChartCache, ChartRenderer, render_user_stats_chart  # noqa: E402
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+
+def user_stats_series(users, attempts, seed=11):
+    rng = random.Random(seed)
+    names = [f"user{i}" for i in range(users)]
+    passed = [0] * users
+    failed = [0] * users
+    for _ in range(attempts):
+        user = rng.randrange(users)
+        if rng.random() < 0.6:
+            passed[user] += 1
+        else:
+            failed[user] += 1
+    return names, passed, failed
+
+
+async def loop_lags(stop):
+    """How late the event loop wakes a task that asks to run every 5 ms."""
+    lags = []
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(0.005)
+        lags.append(time.perf_counter() - started - 0.005)
+    return lags
+
+
+async def render_while_measuring(render):
+    stop = asyncio.Event()
+    lags = asyncio.ensure_future(loop_lags(stop))
+    await asyncio.sleep(0.02)
+    started = time.perf_counter()
+    png = await render()
+    elapsed = time.perf_counter() - started
+    stop.set()
+    return png, elapsed, max(await lags)
+
+
+@pytest.mark.parametrize("attempts", [100, 1000, 10000])
+def test_event_loop_stays_responsive_while_rendering(attempts, record_property):
+    series = user_stats_series(users=max(10, attempts // 50), attempts=attempts)
+
+    async def scenario():
+        renderer = ChartRenderer(max_workers=1)
+        await renderer.start()
+        try:
+            pooled = await render_while_measuring(lambda: renderer.render(render_user_stats_chart, *series))
+        finally:
+            renderer.close()
+
+        async def inline():
+            return render_user_stats_chart(*series)
+
+        return pooled, await render_while_measuring(inline)
+
+    (png, render_time, pooled_lag), (_, _, inline_lag) = asyncio.run(scenario())
+
+    record_property("render_seconds", round(render_time, 3))
+    record_property("loop_lag_seconds", round(pooled_lag, 4))
+    assert png.startswith(PNG_SIGNATURE)
+    # Rendering in the pool leaves the loop free; rendering inline blocks it for the whole chart
+    assert pooled_lag < 0.05
+    assert inline_lag > render_time / 2 > pooled_lag
+
+
+def test_chart_cache_drops_charts_of_an_older_stats_version():
+    cache = ChartCache(max_entries=2)
+    stale_key = cache.key(1, "user_stats")
+    cache.put(stale_key, b"old")
+    cache.bump_stats_version(1)
+    assert cache.get(stale_key) is None
+
+    cache.put(stale_key, b"rendered before the bump")
+    assert cache.get(cache.key(1, "user_stats")) is None
+
+    for guild_id in (1, 2, 3):
+        cache.put(cache.key(guild_id, "user_stats"), b"png")
+    assert cache.get(cache.key(1, "user_stats")) is None
+    assert cache.stats()["entries"] == 2
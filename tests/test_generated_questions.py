@@ -0,0 +1,72 @@
+import asyncio
+
+from utils.generated_questions import StreamedQuestionSink, merge_questions, questions_from_output
+
+
+def question(i):
+    return {"question": f"Question number {i}?", "answer": "yes"}
+
+
+def test_output_wrapped_in_an_object_or_in_prose():
+    assert questions_from_output('{"questions": [{"question": "Q?", "answer": "A"}]}') == [
+        {"question": "Q?", "answer": "A"}]
+    assert questions_from_output('Sure!\n[{"question": "Q?", "answer": "A"}, {"question": "', ) == [
+        {"question": "Q?", "answer": "A"}]
+    assert questions_from_output('[{"question": "", "answer": "A"}]') is None
+
+
+def test_merge_drops_repeats_across_chunks():
+    merged = merge_questions([[question(1), question(2)], [{"question": "question NUMBER 1", "answer": "x"}]], 5)
+    assert merged == [question(1), question(2)]
+
+
+def test_concurrent_adds_never_store_more_than_qty():
+    stored = []
+
+    async def slow_save(q):
+        await asyncio.sleep(0.01)
+        stored.append(q)
+
+    async def scenario():
+        sink = StreamedQuestionSink(slow_save, qty=5)
+        await asyncio.gather(*(sink.add(question(i)) for i in range(40)))
+        return sink
+
+    sink = asyncio.run(scenario())
+    assert len(stored) == len(sink.saved) == 5
+
+
+def test_failed_write_gives_its_slot_back():
+    attempts = []
+
+    async def flaky_save(q):
+        attempts.append(q)
+        await asyncio.sleep(0)
+        if attempts.count(q) == 1 and q == question(0):
+            raise RuntimeError("deadline exceeded")
+
+    async def scenario():
+        sink = StreamedQuestionSink(flaky_save, qty=2)
+        await asyncio.gather(*(sink.add(question(i)) for i in range(2)))
+        await sink.add(question(0))
+        await sink.add(question(3))
+        return sink
+
+    sink = asyncio.run(scenario())
+    # The question whose write failed can be offered again and takes the freed slot
+    assert sink.saved == [question(1), question(0)]
+
+
+def test_existing_and_invalid_questions_are_skipped():
+    async def save(q):
+        pass
+
+    async def scenario():
+        sink = StreamedQuestionSink(save, qty=5, existing_texts=["Question number 1?"])
+        for q in (question(1), {"question": "no answer"}, question(2), question(2)):
+            await sink.add(q)
+        return sink
+
+    sink = asyncio.run(scenario())
+    assert sink.saved == [question(2)]
+    assert sink.rejected == 1
@@ -0,0 +1,92 @@
+import asyncio
+
+import pytest
+
+aiohttp = pytest.importorskip("aiohttp")
+from aiohttp import web  # noqa: E402
+
+from utils.http_client import HttpClientManager  # noqa: E402
+
+
+class StandInServer:
+    """Local HTTP server that remembers which client connection served each request."""
+
+    def __init__(self):
+        self.peers = set()
+        self.requests = 0
+        self._runner = None
+        self.url = None
+
+    async def handle(self, request):
+        self.requests += 1
+        self.peers.add(request.transport.get_extra_info("peername"))
+        await asyncio.sleep(0.001)
+        return web.json_response({"choices": [{"message": {"content": "[]"}}]})
+
+    async def __aenter__(self):
+        app = web.Application()
+        app.router.add_post("/chat/completions", self.handle)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        await site.start()
+        port = self._runner.addresses[0][1]
+        self.url = f"http://127.0.0.1:{port}/chat/completions"
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self._runner.cleanup()
+
+
+async def post(session, url):
+    async with session.post(url, json={"model": "test"}) as response:
+        assert response.status == 200
+        return await response.json()
+
+
+def test_shared_session_reuses_pooled_connections():
+    async def scenario():
+        async with StandInServer() as server:
+            client = HttpClientManager(limit_per_host=4)
+            try:
+                session = await client.session()
+                for _ in range(20):
+                    await post(session, server.url)
+                await asyncio.gather(*(post(session, server.url) for _ in range(40)))
+                assert await client.session() is session
+            finally:
+                await client.close()
+            return client.stats(), server
+
+    stats, server = asyncio.run(scenario())
+
+    assert server.requests == 60
+    assert stats["connections_created"] == len(server.peers) <= 4
+    assert stats["connections_created"] + stats["connections_reused"] == 60
+
+
+def test_session_per_request_handshakes_every_time():
+    """The previous behaviour, for comparison: a new ClientSession per call."""
+    async def scenario():
+        async with StandInServer() as server:
+            for _ in range(20):
+                async with aiohttp.ClientSession() as session:
+                    await post(session, server.url)
+            return server
+
+    server = asyncio.run(scenario())
+    assert len(server.peers) == 20
+
+
+def test_closed_session_is_recreated():
+    async def scenario():
+        client = HttpClientManager()
+        first = await client.session()
+        await client.close()
+        second = await client.session()
+        await client.close()
+        return first, second
+
+    first, second = asyncio.run(scenario())
+    assert first is not second
+    assert first.closed and second.closed
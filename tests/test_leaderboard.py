@@ -0,0 +1,98 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from utils.leaderboard import GuildLeaderboard, LeaderboardStore
+
+SYNCED = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+def test_guild_leaderboard_orders_by_xp_then_user():
+    board = GuildLeaderboard({"b": 10, "a": 10, "c": 30})
+    assert board.top(10) == [("c", 30), ("a", 10), ("b", 10)]
+    assert board.top(1) == [("c", 30)]
+
+
+def test_guild_leaderboard_ties_share_a_rank():
+    board = GuildLeaderboard({"a": 10, "b": 10, "c": 30, "d": 5})
+    assert board.rank("c") == (1, 4)
+    assert board.rank("a") == board.rank("b") == (2, 4)
+    assert board.rank("d") == (4, 4)
+    assert board.rank("nobody") is None
+
+
+def test_guild_leaderboard_update_moves_user():
+    board = GuildLeaderboard({"a": 10, "b": 20})
+    board.update("a", 25)
+    board.update("c", 1)
+    assert board.top(3) == [("a", 25), ("b", 20), ("c", 1)]
+    assert len(board) == 3
+    assert board.xp("a") == 25
+    assert board.entries() == {"a": 25, "b": 20, "c": 1}
+
+
+def test_store_drops_xp_for_guilds_not_loaded():
+    store = LeaderboardStore()
+    store.record_xp(1, "a", 10)
+    store.install(1, {"b": 5}, SYNCED)
+    assert store.top(1, 5) == [("b", 5)]
+    assert store.drain_dirty() == {}
+
+
+def test_store_applies_xp_recorded_while_loading():
+    store = LeaderboardStore()
+    store.begin_load(1)
+    store.record_xp(1, "a", 50)
+    store.install(1, {"a": 10, "b": 20}, SYNCED)
+
+    assert store.top(1, 5) == [("a", 50), ("b", 20)]
+    assert store.drain_dirty() == {"1": ({"a": 50, "b": 20}, SYNCED)}
+    assert store.drain_dirty() == {}
+
+
+def test_store_cancel_load_stops_buffering():
+    store = LeaderboardStore()
+    store.begin_load(1)
+    store.cancel_load(1)
+    store.record_xp(1, "a", 50)
+    store.install(1, {"a": 10}, SYNCED)
+    assert store.rank(1, "a") == (1, 1)
+    assert store.top(1, 1) == [("a", 10)]
+
+
+def test_store_install_keeps_existing_board():
+    store = LeaderboardStore()
+    store.install(1, {"a": 10}, SYNCED)
+    store.install(1, {"a": 99}, SYNCED + timedelta(minutes=1))
+    assert store.top(1, 1) == [("a", 10)]
+    assert store.synced_at(1) == SYNCED
+
+
+def test_store_reconcile_applies_remote_xp_and_advances_sync_time():
+    store = LeaderboardStore()
+    store.install(1, {"a": 10, "b": 20}, SYNCED)
+
+    later = SYNCED + timedelta(minutes=5)
+    store.reconcile(1, {"a": 30, "b": 20}, later)
+    assert store.top(1, 2) == [("a", 30), ("b", 20)]
+    assert store.synced_at(1) == later
+    assert store.drain_dirty() == {"1": ({"a": 30, "b": 20}, later)}
+
+    # An older read never moves the sync time back, and unchanged XP does not dirty the board
+    store.reconcile(1, {"b": 20}, SYNCED)
+    assert store.synced_at(1) == later
+    assert store.drain_dirty() == {}
+
+
+def test_store_mark_dirty_requeues_a_failed_snapshot():
+    store = LeaderboardStore()
+    store.install(1, {"a": 10}, SYNCED)
+    store.record_xp(1, "a", 15)
+    drained = store.drain_dirty()
+    store.mark_dirty(drained)
+    assert store.drain_dirty() == drained
+
+
+def test_store_requires_a_loaded_board_for_reads():
+    with pytest.raises(KeyError):
+        LeaderboardStore().top(1, 5)
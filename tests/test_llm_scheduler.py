@@ -0,0 +1,164 @@
+import asyncio
+import types
+from email.utils import format_datetime
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+import utils.llm_scheduler as llm_scheduler_module
+from utils.llm_scheduler import LlmScheduler, RequestPriority, parse_retry_after
+
+MODEL = "test/model"
+
+
+class FakeClockLoop(asyncio.SelectorEventLoop):
+    """Event loop whose clock only moves when the test advances it."""
+
+    def __init__(self):
+        super().__init__()
+        self.now = 0.0
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def loop(monkeypatch):
+    loop = FakeClockLoop()
+    monkeypatch.setattr(llm_scheduler_module, "time", types.SimpleNamespace(monotonic=loop.time))
+    yield loop
+    loop.close()
+
+
+async def advance(loop, seconds):
+    loop.now += seconds
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+class FakeServer:
+    """Stands in for OpenRouter: records concurrency and answers 429 for the first `rate_limited` calls."""
+
+    def __init__(self, loop, rate_limited=0, retry_after=30.0):
+        self.loop = loop
+        self.rate_limited = rate_limited
+        self.retry_after = retry_after
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.served_at = []
+
+    async def request(self, scheduler, name, priority=RequestPriority.INTERACTIVE):
+        while True:
+            async with scheduler.slot(MODEL, priority):
+                self.in_flight += 1
+                self.max_in_flight = max(self.max_in_flight, self.in_flight)
+                await asyncio.sleep(0)
+                self.in_flight -= 1
+
+                if self.rate_limited:
+                    self.rate_limited -= 1
+                    scheduler.throttle(MODEL, self.retry_after)
+                    continue
+                self.served_at.append((name, self.loop.time()))
+                return name
+
+
+def test_burst_is_spread_over_the_token_bucket(loop):
+    async def scenario():
+        scheduler = LlmScheduler(rpm=3, concurrency=10, model_limits={})
+        server = FakeServer(loop)
+        tasks = [asyncio.ensure_future(server.request(scheduler, i)) for i in range(5)]
+
+        await advance(loop, 0)
+        assert [at for _, at in server.served_at] == [0, 0, 0]
+
+        await advance(loop, 20)
+        assert len(server.served_at) == 4
+        await advance(loop, 20)
+        assert len(server.served_at) == 5
+        await asyncio.gather(*tasks)
+
+    loop.run_until_complete(scenario())
+
+
+def test_concurrency_limit_holds_during_burst(loop):
+    async def scenario():
+        scheduler = LlmScheduler(rpm=600, concurrency=2, model_limits={})
+        server = FakeServer(loop)
+        await asyncio.gather(*(server.request(scheduler, i) for i in range(20)))
+        assert server.max_in_flight == 2
+        assert len(server.served_at) == 20
+
+    loop.run_until_complete(scenario())
+
+
+def test_interactive_requests_overtake_queued_bulk(loop):
+    async def scenario():
+        scheduler = LlmScheduler(rpm=600, concurrency=1, model_limits={})
+        server = FakeServer(loop)
+
+        await scheduler.acquire(MODEL)  # hold the only slot while the queue fills
+        bulk = [asyncio.ensure_future(server.request(scheduler, f"bulk{i}", RequestPriority.BULK))
+                for i in range(3)]
+        await advance(loop, 0)
+        interactive = asyncio.ensure_future(server.request(scheduler, "interactive"))
+        await advance(loop, 0)
+
+        scheduler.release(MODEL)
+        await asyncio.gather(interactive, *bulk)
+        assert [name for name, _ in server.served_at] == ["interactive", "bulk0", "bulk1", "bulk2"]
+
+    loop.run_until_complete(scenario())
+
+
+def test_rate_limit_pauses_every_request_to_the_model(loop):
+    async def scenario():
+        scheduler = LlmScheduler(rpm=600, concurrency=4, model_limits={})
+        server = FakeServer(loop, rate_limited=1, retry_after=30)
+        tasks = [asyncio.ensure_future(server.request(scheduler, i)) for i in range(4)]
+
+        await advance(loop, 0)
+        # One request was rate limited; the ones granted alongside it already went through
+        assert len(server.served_at) == 3
+        assert scheduler.throttled == 1
+
+        late = asyncio.ensure_future(server.request(scheduler, "late"))
+        await advance(loop, 29)
+        assert len(server.served_at) == 3
+        await advance(loop, 1)
+        await asyncio.gather(late, *tasks)
+        assert all(at >= 30 for name, at in server.served_at if name in (0, "late"))
+
+    loop.run_until_complete(scenario())
+
+
+def test_cancelled_waiter_does_not_leak_a_slot(loop):
+    async def scenario():
+        scheduler = LlmScheduler(rpm=600, concurrency=1, model_limits={})
+        await scheduler.acquire(MODEL)
+        waiter = asyncio.ensure_future(scheduler.acquire(MODEL))
+        await advance(loop, 0)
+        waiter.cancel()
+        await advance(loop, 0)
+
+        scheduler.release(MODEL)
+        await asyncio.wait_for(scheduler.acquire(MODEL), timeout=1)
+        assert scheduler.stats()[MODEL]["in_flight"] == 1
+
+    loop.run_until_complete(scenario())
+
+
+def test_model_limits_override_defaults():
+    scheduler = LlmScheduler(rpm=20, concurrency=4, model_limits={MODEL: (60.0, 8)})
+    assert scheduler._budget(MODEL).concurrency == 8
+    assert scheduler._budget("other/model").concurrency == 4
+
+
+def test_parse_retry_after():
+    assert parse_retry_after(None) is None
+    assert parse_retry_after("12") == 12.0
+    assert parse_retry_after("-3") == 0.0
+    assert parse_retry_after("soon") is None
+
+    retry_at = datetime.now(timezone.utc) + timedelta(seconds=90)
+    assert 80 <= parse_retry_after(format_datetime(retry_at, usegmt=True)) <= 90
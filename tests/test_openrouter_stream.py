@@ -0,0 +1,156 @@
+import asyncio
+import json
+import time
+
+import pytest
+
+aiohttp = pytest.importorskip("aiohttp")
+from aiohttp import web  # noqa: E402
+
+from utils.generated_questions import StreamedQuestionSink, questions_from_output  # noqa: E402
+from utils.openrouter_stream import read_streamed_content  # noqa: E402
+
+QUESTIONS = 20
+TOKEN_CHARS = 4
+SECONDS_PER_TOKEN = 0.001
+
+
+def recorded_completion():
+    """Content of a recorded completion: a short preamble, then a JSON array of questions."""
+    questions = [
+        {"question": f"Which organelle is described in paragraph {i}?", "answer": "Mitochondria",
+         "explanation": "It produces most of the cell's chemical energy."}
+        for i in range(QUESTIONS)
+    ]
+    return "Here are the questions:\n" + json.dumps(questions, indent=2)
+
+
+def sse_events(content):
+    """Replay content as OpenRouter sends it: small deltas, keep-alives, then [DONE]."""
+    yield b": OPENROUTER PROCESSING\n\n"
+    for i in range(0, len(content), TOKEN_CHARS):
+        event = {"choices": [{"delta": {"content": content[i:i + TOKEN_CHARS]}}]}
+        yield f"data: {json.dumps(event)}\n\n".encode()
+    yield b"data: [DONE]\n\n"
+
+
+class ReplayServer:
+    """Local stand-in for OpenRouter that generates the recorded completion at a fixed token rate."""
+
+    def __init__(self, content):
+        self.content = content
+        self._runner = None
+        self.url = None
+
+    async def handle(self, request):
+        payload = await request.json()
+        if not payload.get("stream"):
+            # Without streaming nothing is sent until the whole completion is generated
+            await asyncio.sleep(SECONDS_PER_TOKEN * len(self.content) / TOKEN_CHARS)
+            return web.json_response({"choices": [{"message": {"content": self.content}}]})
+
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await response.prepare(request)
+        for event in sse_events(self.content):
+            await response.write(event)
+            await asyncio.sleep(SECONDS_PER_TOKEN)
+        await response.write_eof()
+        return response
+
+    async def __aenter__(self):
+        app = web.Application()
+        app.router.add_post("/chat/completions", self.handle)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, "127.0.0.1", 0).start()
+        self.url = f"http://127.0.0.1:{self._runner.addresses[0][1]}/chat/completions"
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self._runner.cleanup()
+
+
+class TimedStore:
+    """Stands in for the Firestore write; remembers when the first question was stored."""
+
+    def __init__(self, started):
+        self.started = started
+        self.first_stored = None
+
+    async def save(self, question):
+        await asyncio.sleep(0.001)
+        if self.first_stored is None:
+            self.first_stored = time.perf_counter() - self.started
+
+
+async def streamed_generation(session, url):
+    store = TimedStore(time.perf_counter())
+    sink = StreamedQuestionSink(store.save, QUESTIONS)
+    async with session.post(url, json={"model": "test", "stream": True}) as response:
+        await read_streamed_content(response, sink.add)
+    return store.first_stored, time.perf_counter() - store.started, sink.saved
+
+
+async def batch_generation(session, url):
+    store = TimedStore(time.perf_counter())
+    sink = StreamedQuestionSink(store.save, QUESTIONS)
+    async with session.post(url, json={"model": "test"}) as response:
+        data = await response.json()
+    for question in questions_from_output(data["choices"][0]["message"]["content"]):
+        await sink.add(question)
+    return store.first_stored, time.perf_counter() - store.started, sink.saved
+
+
+def test_time_to_first_stored_question_streamed_vs_batch(record_property):
+    async def scenario():
+        async with ReplayServer(recorded_completion()) as server, aiohttp.ClientSession() as session:
+            return await streamed_generation(session, server.url), await batch_generation(session, server.url)
+
+    (stream_first, stream_total, streamed), (batch_first, batch_total, batched) = asyncio.run(scenario())
+
+    record_property("streamed_first_question_seconds", round(stream_first, 3))
+    record_property("batch_first_question_seconds", round(batch_first, 3))
+    record_property("streamed_total_seconds", round(stream_total, 3))
+    record_property("batch_total_seconds", round(batch_total, 3))
+    assert streamed == batched and len(streamed) == QUESTIONS
+    # The first question closes after about 1/QUESTIONS of the completion instead of at its end
+    assert stream_first < batch_first / 4
+    # Without streaming nothing is stored until the whole completion has arrived
+    assert batch_first > 0.9 * batch_total
+
+
+class FakeResponse:
+    def __init__(self, lines):
+        self.content = self._lines(lines)
+
+    async def _lines(self, lines):
+        for line in lines:
+            yield line
+
+
+def read(lines):
+    questions = []
+
+    async def on_question(question):
+        questions.append(question)
+
+    content = asyncio.run(read_streamed_content(FakeResponse(lines), on_question))
+    return content, questions
+
+
+def test_keep_alives_and_empty_deltas_are_skipped():
+    lines = [b": OPENROUTER PROCESSING\n", b"\n", b'data: {"choices": [{"delta": {"role": "assistant"}}]}\n',
+             b'data: {"choices": [{"delta": {"content": "[{\\"question\\": \\"Q?\\", "}}]}\n',
+             b'data: {"choices": [{"delta": {"content": "\\"answer\\": \\"A\\"}]"}}]}\n',
+             b"data: [DONE]\n", b'data: {"choices": [{"delta": {"content": "after done"}}]}\n']
+
+    content, questions = read(lines)
+
+    assert content == '[{"question": "Q?", "answer": "A"}]'
+    assert questions == [{"question": "Q?", "answer": "A"}]
+
+
+@pytest.mark.parametrize("line", [b"data: {not json\n", b'data: {"error": {"message": "overloaded"}}\n'])
+def test_broken_streams_raise_a_payload_error(line):
+    with pytest.raises(aiohttp.ClientPayloadError):
+        read([b'data: {"choices": [{"delta": {"content": "[{"}}]}\n', line])
@@ -0,0 +1,99 @@
+import asyncio
+import os
+import signal
+import time
+
+import pytest
+
+fitz = pytest.importorskip("fitz")
+
+from utils.pdf_extractor import PdfExtractionTimeout, PdfExtractor  # noqa: E402
+
+LINE = "Photosynthesis converts light energy into chemical energy stored in glucose. "
+
+
+def synthetic_pdf(pages, lines_per_page=40):
+    """A text-only PDF with `pages` full pages, like a long course handout."""
+    doc = fitz.open()
+    for number in range(pages):
+        page = doc.new_page()
+        text = f"Page {number + 1}\n" + "\n".join(LINE for _ in range(lines_per_page))
+        page.insert_textbox(fitz.Rect(36, 36, 576, 806), text, fontsize=8)
+    pdf_bytes = doc.tobytes()
+    doc.close()
+    return pdf_bytes
+
+
+@pytest.fixture(scope="module")
+def pdfs():
+    return {pages: synthetic_pdf(pages) for pages in (1, 200, 600)}
+
+
+def run(coroutine_fn, extractor):
+    async def scenario():
+        await extractor.start()
+        try:
+            return await coroutine_fn()
+        finally:
+            extractor.close()
+
+    return asyncio.run(scenario())
+
+
+def test_extraction_time_on_multi_hundred_page_pdfs(pdfs, record_property):
+    extractor = PdfExtractor(max_workers=2)
+
+    async def timed(pdf_bytes, max_chars):
+        started = time.perf_counter()
+        text = await extractor.extract(pdf_bytes, max_chars)
+        return time.perf_counter() - started, text
+
+    async def scenario():
+        return {
+            "200_pages": await timed(pdfs[200], 10_000_000),
+            "600_pages": await timed(pdfs[600], 10_000_000),
+            "600_pages_capped": await timed(pdfs[600], 200_000),
+        }
+
+    results = run(scenario, extractor)
+    for name, (seconds, text) in results.items():
+        record_property(f"{name}_seconds", round(seconds, 3))
+
+    (_, small_text), (large_time, large_text) = results["200_pages"], results["600_pages"]
+    capped_time, capped_text = results["600_pages_capped"]
+    assert "Page 600" in large_text and len(large_text) > 2.5 * len(small_text)
+    assert len(capped_text) == 200_000
+    # Extraction stops at max_chars instead of reading the remaining pages
+    assert capped_time < large_time / 2
+
+
+def test_dead_worker_does_not_fail_other_extractions(pdfs):
+    extractor = PdfExtractor(max_workers=2)
+
+    async def scenario():
+        pool = extractor._pool
+        extractions = [asyncio.ensure_future(extractor.extract(pdfs[600], 10_000_000)) for _ in range(4)]
+        await asyncio.sleep(0.3)
+        os.kill(next(iter(pool._processes)), signal.SIGKILL)
+        texts = await asyncio.gather(*extractions)
+        return pool, texts
+
+    pool, texts = run(scenario, extractor)
+    assert all("Page 600" in text for text in texts)
+    assert pool._broken
+
+
+def test_timeout_leaves_the_pool_and_queued_extractions_alone(pdfs):
+    extractor = PdfExtractor(max_workers=1, time_limit=0.05)
+
+    async def scenario():
+        pool = extractor._pool
+        slow = asyncio.ensure_future(extractor.extract(pdfs[600], 10_000_000))
+        queued = [asyncio.ensure_future(extractor.extract(pdfs[1], 10_000)) for _ in range(3)]
+        with pytest.raises(PdfExtractionTimeout):
+            await slow
+        return pool, extractor._pool, await asyncio.gather(*queued)
+
+    pool, pool_after, texts = run(scenario, extractor)
+    assert pool_after is pool
+    assert all(text.startswith("Page 1") for text in texts)
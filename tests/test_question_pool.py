@@ -0,0 +1,60 @@
+import random
+from collections import Counter
+
+import utils.question_pool as question_pool_module
+from utils.question_pool import QuestionPoolCache, compact_question, sample_questions
+
+
+def test_compact_question_keeps_quiz_fields():
+    data = {"question": "Q?", "correct_answer": "True", "success": 3, "created_at": "x", "embedding": [1, 2]}
+    assert compact_question("q1", "t1", data) == {
+        "id": "q1",
+        "topic_id": "t1",
+        "question": "Q?",
+        "question_type": "True/False",
+        "alternatives": {},
+        "success": 3,
+        "failures": 0,
+        "correct_answer": "True",
+    }
+
+
+def test_cache_expires_after_ttl(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(question_pool_module.time, "monotonic", lambda: now[0])
+    cache = QuestionPoolCache(ttl=10)
+
+    cache.set(1, "t", ["q"], cache.generation(1, "t"))
+    assert cache.get("1", "t") == ["q"]
+    now[0] += 11
+    assert cache.get(1, "t") is None
+
+
+def test_cache_ignores_pool_loaded_before_an_invalidation():
+    cache = QuestionPoolCache(ttl=60)
+    generation = cache.generation(1, "t")
+    cache.invalidate(1, "t")  # a question changed while the pool was loading
+    cache.set(1, "t", ["stale"], generation)
+    assert cache.get(1, "t") is None
+
+    cache.set(1, "t", ["fresh"], cache.generation(1, "t"))
+    assert cache.get(1, "t") == ["fresh"]
+    cache.invalidate(1, "t")
+    assert cache.get(1, "t") is None
+
+
+def test_sample_questions_returns_distinct_records():
+    records = [{"id": str(i)} for i in range(20)]
+    for weighted in (False, True):
+        picked = sample_questions(records, 5, weighted=weighted)
+        assert len(picked) == 5
+        assert len({record["id"] for record in picked}) == 5
+    assert len(sample_questions(records[:3], 5)) == 3
+
+
+def test_weighted_sampling_favours_missed_questions():
+    random.seed(1234)
+    easy = {"id": "easy", "success": 50, "failures": 0}
+    hard = {"id": "hard", "success": 0, "failures": 50}
+    counts = Counter(sample_questions([easy, hard], 1, weighted=True)[0]["id"] for _ in range(2000))
+    assert counts["hard"] > 10 * counts["easy"]
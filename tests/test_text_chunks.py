@@ -0,0 +1,53 @@
+import random
+
+import pytest
+
+from utils.text_chunks import pick_chunks, split_quota, split_text_into_chunks
+
+
+def test_chunks_break_on_paragraphs_and_respect_the_limit():
+    paragraphs = [f"Paragraph {i}. " + "word " * 40 for i in range(30)]
+    chunks = split_text_into_chunks("\n\n".join(paragraphs), max_chars=500)
+
+    assert all(len(chunk) <= 500 for chunk in chunks)
+    assert "\n\n".join(chunks).split("\n\n") == [p.strip() for p in paragraphs]
+
+
+def test_long_paragraphs_and_sentences_are_cut():
+    text = "Short one.\n\n" + "A sentence that goes on. " * 50 + "\n\n" + "x" * 1200
+    chunks = split_text_into_chunks(text, max_chars=300)
+
+    assert all(len(chunk) <= 300 for chunk in chunks)
+    assert "".join(chunks).count("x") == 1200
+
+
+def test_blank_text_has_no_chunks():
+    assert split_text_into_chunks(" \n\n \n", max_chars=100) == []
+
+
+def test_pick_chunks_spreads_over_the_document():
+    chunks = [str(i) for i in range(10)]
+    assert pick_chunks(chunks, 3) == ["0", "3", "6"]
+    assert pick_chunks(chunks, 20) == chunks
+
+
+@pytest.mark.parametrize("seed", range(200))
+def test_quota_always_adds_up_to_qty(seed):
+    rng = random.Random(seed)
+    qty = rng.randint(1, 60)
+    chunks = ["x" * rng.randint(1, 5000) for _ in range(rng.randint(1, qty))]
+
+    shares = split_quota(qty, chunks)
+
+    assert sum(shares) == qty
+    assert min(shares) >= 1
+
+
+def test_quota_follows_chunk_length():
+    assert split_quota(10, ["x" * 900, "x" * 100]) == [9, 1]
+    assert split_quota(3, ["x" * 900, "x" * 100, "x" * 10]) == [1, 1, 1]
+
+
+def test_quota_refuses_more_chunks_than_questions():
+    with pytest.raises(ValueError):
+        split_quota(2, ["a", "b", "c"])
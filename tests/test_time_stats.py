@@ -0,0 +1,77 @@
+import random
+import time
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+
+USERS = 5000
+DAYS = 365
+FIRST_DAY = date(2026, 1, 1)
+
+
+class FakeCollection:
+    """In-memory collection with the Firestore calls /time_stats makes; counts document reads."""
+
+    def __init__(self, documents):
+        self.documents = documents
+        self.reads = 0
+
+    def stream(self, start=None, end=None):
+        for key in sorted(self.documents):
+            if (start and key < start) or (end and key > end):
+                continue
+            self.reads += 1
+            yield dict(self.documents[key])
+
+
+def synthetic_guild(seed=5000):
+    """5,000 users with a year of quiz history, plus the rollups that history produces."""
+    rng = random.Random(seed)
+    users = {}
+    rollups = defaultdict(int)
+    for user in range(USERS):
+        history = []
+        for _ in range(rng.randint(0, 40)):
+            day = FIRST_DAY + timedelta(days=rng.randrange(DAYS))
+            history.append({"date": datetime(day.year, day.month, day.day, 12), "correct": 3})
+            rollups[day.isoformat()] += 1
+        users[f"user{user}"] = {"xp": 10, "history": history}
+    daily_stats = {day: {"date": day, "quizzes": count} for day, count in rollups.items()}
+    return FakeCollection(users), FakeCollection(daily_stats)
+
+
+def quizzes_by_period_full_scan(users, start_date, end_date):
+    """The pre-rollup /time_stats: walk every user's history."""
+    quizzes_per_day = defaultdict(int)
+    for data in users.stream():
+        for entry in data.get("history", []):
+            quiz_date = entry.get("date")
+            if isinstance(quiz_date, datetime) and start_date <= quiz_date.date() <= end_date:
+                quizzes_per_day[quiz_date.date().isoformat()] += 1
+    return dict(sorted(quizzes_per_day.items()))
+
+
+def quizzes_by_period_rollups(daily_stats, start_date, end_date):
+    """Same read as quiz_repository.get_quizzes_by_period: only the rollups in the range."""
+    return {
+        data["date"]: data.get("quizzes", 0)
+        for data in daily_stats.stream(start_date.isoformat(), end_date.isoformat())
+    }
+
+
+def timed(function, *args):
+    started = time.perf_counter()
+    result = function(*args)
+    return time.perf_counter() - started, result
+
+
+def test_time_stats_rollups_vs_full_scan_on_5000_users():
+    users, daily_stats = synthetic_guild()
+    start_date, end_date = FIRST_DAY + timedelta(days=60), FIRST_DAY + timedelta(days=89)
+
+    scan_time, scanned = timed(quizzes_by_period_full_scan, users, start_date, end_date)
+    rollup_time, rolled_up = timed(quizzes_by_period_rollups, daily_stats, start_date, end_date)
+
+    assert rolled_up == scanned
+    assert users.reads == USERS
+    assert daily_stats.reads == len(rolled_up) <= 30
+    assert rollup_time * 50 < scan_time
@@ -0,0 +1,111 @@
+import statistics
+import time
+
+import utils.topic_cache as topic_cache_module
+from utils.topic_cache import TopicCatalogCache, TopicTitleIndex, match_topic_titles
+
+
+def test_catalog_counts_hits_and_misses_and_expires(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr(topic_cache_module.time, "monotonic", lambda: now[0])
+    cache = TopicCatalogCache(ttl=30)
+
+    assert cache.get(1) is None
+    cache.set(1, [("Math", "t1", 3)], cache.generation(1))
+    assert cache.get("1") == [("Math", "t1", 3)]
+    now[0] = 31
+    assert cache.get(1) is None
+    assert (cache.hits, cache.misses) == (1, 2)
+
+
+def test_catalog_ignores_load_that_raced_an_invalidation():
+    cache = TopicCatalogCache(ttl=30)
+    generation = cache.generation(1)
+    cache.invalidate(1)
+    cache.set(1, ["stale"], generation)
+    assert cache.get(1) is None
+
+
+def test_match_topic_titles_puts_prefix_matches_first():
+    titles = ["Algebra", "Linear algebra", "Biology", "algorithms"]
+    assert match_topic_titles(titles, "alg") == ["Algebra", "algorithms", "Linear algebra"]
+    assert match_topic_titles(titles, "") == titles
+    assert match_topic_titles(titles, "a", limit=2) == ["Algebra", "algorithms"]
+
+
+def test_title_index_add_requires_a_loaded_guild():
+    index = TopicTitleIndex()
+    assert not index.add(1, "Math", "t1")
+    assert not index.is_loaded(1)
+
+    index.load(1, {"Math": "t1"})
+    assert index.is_loaded("1")
+    assert not index.add(1, "Math", "t2")
+    assert index.add(1, "Physics", "t3")
+    assert index.lookup(1, "Physics") == "t3"
+    assert index.lookup(2, "Physics") is None
+
+
+def test_title_index_load_keeps_titles_added_meanwhile():
+    index = TopicTitleIndex()
+    index.load(1, {})
+    index.add(1, "New", "t9")
+    index.load(1, {"Math": "t1", "New": "old"})
+    assert index.snapshot(1) == {"Math": "t1", "New": "t9"}
+
+
+def test_title_index_discard_and_snapshot_copy():
+    index = TopicTitleIndex()
+    index.load(1, {"Math": "t1"})
+    snapshot = index.snapshot(1)
+    index.discard(1, "Math")
+    index.discard(2, "Math")
+    assert index.lookup(1, "Math") is None
+    assert snapshot == {"Math": "t1"}
+
+
+TOPICS_SCAN_SECONDS = 0.02  # one Firestore read of a guild's topics collection
+
+
+def load_catalog(cache, guild_id, topic_count=500):
+    """Stand-in for get_topic_catalog: a blocking scan of the topics collection."""
+    generation = cache.generation(guild_id)
+    time.sleep(TOPICS_SCAN_SECONDS)
+    catalog = [{"title": f"Topic {i} chapter {i % 37}", "topic_id": f"t{i}", "num_questions": i % 5}
+               for i in range(topic_count)]
+    cache.set(guild_id, catalog, generation)
+    return catalog
+
+
+def autocomplete(cache, guild_id, current):
+    """Same steps as utils.get_topics_for_autocomplete followed by the title matching."""
+    catalog = cache.get(guild_id)
+    if catalog is None:
+        catalog = load_catalog(cache, guild_id)
+    titles = [entry["title"] for entry in catalog if entry["num_questions"] > 0]
+    return match_topic_titles(titles, current)
+
+
+def timed_autocomplete(cache, guild_id, current):
+    started = time.perf_counter()
+    choices = autocomplete(cache, guild_id, current)
+    return time.perf_counter() - started, choices
+
+
+def test_autocomplete_latency_cold_and_warm():
+    cache = TopicCatalogCache(ttl=300)
+    keystrokes = ["t", "to", "top", "topi", "topic", "topic 1", "topic 12"]
+
+    cold = [timed_autocomplete(cache, guild_id, "t")[0] for guild_id in range(10)]
+    warm = []
+    for guild_id in range(10):
+        for current in keystrokes:
+            elapsed, choices = timed_autocomplete(cache, guild_id, current)
+            warm.append(elapsed)
+            assert len(choices) <= 25
+
+    assert min(cold) >= TOPICS_SCAN_SECONDS
+    # A cached keystroke costs a fraction of the scan even when the machine is busy
+    assert statistics.quantiles(warm, n=10)[8] < TOPICS_SCAN_SECONDS / 4
+    assert max(warm) < min(cold)
+    assert (cache.hits, cache.misses) == (len(warm), len(cold))
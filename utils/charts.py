@@ -0,0 +1,164 @@
+import asyncio
+import io
+import os
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from utils.worker_pool import worker_context
+
+CHART_WORKERS = int(os.getenv("CHART_WORKERS", "2"))
+CHART_CACHE_MAX_ENTRIES = int(os.getenv("CHART_CACHE_MAX_ENTRIES", "64"))
+
+
+def _warm_up():
+    # Import matplotlib once per worker so the first real chart does not pay for it
+    import matplotlib.figure  # noqa: F401
+    return os.getpid()
+
+
+def _upper_limit(max_value: int) -> int:
+    return ((max_value + 4) // 5 + 1) * 5
+
+
+def render_user_stats_chart(names: list, passed: list, failed: list) -> bytes:
+    """Stacked passed/failed bars per user, drawn with one bar call per series."""
+    from matplotlib.figure import Figure
+
+    fig = Figure(figsize=(12, 6))
+    ax = fig.subplots()
+
+    ax.bar(names, passed, color='green', label='≥ 50% correct')
+    ax.bar(names, failed, bottom=passed, color='red', label='< 50% correct')
+
+    max_attempts = max((p + f for p, f in zip(passed, failed)), default=0)
+    ax.set_title('Quiz attempts per user')
+    ax.set_ylabel('Number of attempts')
+    ax.set_yticks(range(0, _upper_limit(max_attempts) + 1, 5))
+    ax.set_xlabel('Users')
+    ax.tick_params(axis='x', labelrotation=45)
+    for label in ax.get_xticklabels():
+        label.set_horizontalalignment('right')
+    ax.legend()
+
+    buf = io.BytesIO()
+    fig.tight_layout()
+    fig.savefig(buf, format='png')
+    return buf.getvalue()
+
+
+def render_time_stats_chart(dates: list, values: list) -> bytes:
+    from matplotlib.figure import Figure
+
+    fig = Figure()
+    ax = fig.subplots()
+
+    ax.plot(dates, values, marker='o')
+    ax.set_title('Quizzes over time')
+    ax.set_xlabel('Date')
+    ax.set_ylabel('Count')
+    ax.set_yticks(range(0, _upper_limit(max(values, default=0)) + 1, 5))
+    ax.tick_params(axis='x', labelrotation=45)
+
+    buf = io.BytesIO()
+    fig.tight_layout()
+    fig.savefig(buf, format='png')
+    return buf.getvalue()
+
+
+class ChartRenderer:
+    """Renders charts in a small pool of worker processes, off the event loop.
+
+    Each render builds its own Figure, so no pyplot global state is shared.
+    Workers come from utils.worker_pool's fork server; start() launches them
+    from setup_hook and imports matplotlib in each one.
+    """
+
+    def __init__(self, max_workers: int = CHART_WORKERS):
+        self.max_workers = max_workers
+        self._pool = None
+
+    def _create_pool(self):
+        return ProcessPoolExecutor(
+            max_workers=self.max_workers,
+            mp_context=worker_context()
+        )
+
+    async def start(self):
+        if self._pool is None:
+            self._pool = self._create_pool()
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*(
+            loop.run_in_executor(self._pool, _warm_up) for _ in range(self.max_workers)))
+
+    async def render(self, render_fn, *args) -> bytes:
+        if self._pool is None:
+            self._pool = self._create_pool()
+
+        loop = asyncio.get_running_loop()
+        pool = self._pool
+        try:
+            return await loop.run_in_executor(pool, render_fn, *args)
+        except BrokenProcessPool:
+            # A worker died (e.g. OOM); replace the pool, unless a concurrent render already did, and retry once
+            if self._pool is pool:
+                self._pool = self._create_pool()
+                pool.shutdown(wait=False, cancel_futures=True)
+            return await loop.run_in_executor(self._pool, render_fn, *args)
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+
+class ChartCache:
+    """LRU cache of rendered chart PNGs keyed by guild, chart type and stats version.
+
+    The stats version of a guild is bumped whenever a quiz completes, which
+    makes every chart rendered before it unreachable; those entries are
+    dropped right away rather than waiting for LRU eviction.
+    """
+
+    def __init__(self, max_entries: int = CHART_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._versions = {}
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, guild_id, chart_type: str, *params):
+        guild_key = str(guild_id)
+        return guild_key, chart_type, params, self._versions.get(guild_key, 0)
+
+    def get(self, key):
+        png = self._entries.get(key)
+        if png is None:
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return png
+
+    def put(self, key, png: bytes):
+        if key[3] != self._versions.get(key[0], 0):
+            return  # stats changed while this chart was being rendered
+
+        self._entries[key] = png
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def bump_stats_version(self, guild_id):
+        guild_key = str(guild_id)
+        self._versions[guild_key] = self._versions.get(guild_key, 0) + 1
+        for key in [key for key in self._entries if key[0] == guild_key]:
+            del self._entries[key]
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries)}
+
+
+chart_renderer = ChartRenderer()
+chart_cache = ChartCache()
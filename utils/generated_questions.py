@@ -0,0 +1,104 @@
+import json
+import re
+
+from utils.json_stream import extract_json_objects
+
+
+def normalize_text(text):
+    return " ".join(re.sub(r"[^\w\s]", " ", str(text).lower()).split())
+
+
+def normalize_question_text(question):
+    return normalize_text(question.get("question", ""))
+
+
+def is_valid_question(question):
+    if not isinstance(question, dict):
+        return False
+    text = question.get("question")
+    answer = question.get("answer")
+    if answer in (None, ""):
+        answer = question.get("correct_answer")
+    return isinstance(text, str) and bool(text.strip()) and answer not in (None, "")
+
+
+def questions_from_output(raw_text):
+    """Return the valid questions in a model response, or None if it holds none."""
+    if not raw_text:
+        return None
+
+    # Well-formed output needs no repair
+    try:
+        parsed = json.loads(raw_text)
+    except json.JSONDecodeError:
+        parsed = None
+
+    if isinstance(parsed, dict):
+        for key in ("questions", "items", "data"):
+            if isinstance(parsed.get(key), list):
+                parsed = parsed[key]
+                break
+
+    questions = parsed if isinstance(parsed, list) else extract_json_objects(raw_text)
+    questions = [question for question in questions if is_valid_question(question)]
+    return questions or None
+
+
+def merge_questions(question_lists, qty):
+    """Concatenate per-chunk results, dropping questions whose normalized text repeats."""
+    seen = set()
+    merged = []
+    for questions in question_lists:
+        for question in questions:
+            key = normalize_question_text(question)
+            if not key or key in seen:
+                continue
+            seen.add(key)
+            merged.append(question)
+    return merged[:qty]
+
+
+class StreamedQuestionSink:
+    """Saves streamed questions one by one, skipping invalid ones and duplicates, up to qty.
+
+    save is awaited with each accepted question. Chunks stream concurrently,
+    so a question reserves its slot before the write is awaited and gives it
+    back if the write fails; qty is never exceeded.
+
+    existing_texts are the questions the topic already holds; they count as
+    duplicates, so a resumed job does not store its first questions again.
+    """
+
+    def __init__(self, save, qty, existing_texts=()):
+        self._save = save
+        self.qty = qty
+        self.saved = []
+        self.rejected = 0
+        self._reserved = 0
+        self._seen = {normalize_text(text) for text in existing_texts}
+
+    async def add(self, question):
+        if len(self.saved) + self._reserved >= self.qty:
+            return
+        if not is_valid_question(question):
+            self.rejected += 1
+            return
+
+        key = normalize_question_text(question)
+        if key in self._seen:
+            return
+        self._seen.add(key)
+
+        self._reserved += 1
+        try:
+            await self._save(question)
+        except Exception as e:
+            self._seen.discard(key)
+            print(f"⚠️ Could not save generated question: {type(e).__name__}: {e}")
+            return
+        finally:
+            self._reserved -= 1
+
+        self.saved.append(question)
+        if len(self.saved) == 1:
+            print("✅ First generated question saved")
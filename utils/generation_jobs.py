@@ -0,0 +1,247 @@
+import asyncio
+import contextlib
+import itertools
+import os
+import socket
+import uuid
+
+import discord
+
+from repositories.async_db import run_db
+from repositories.generation_job_repository import (
+    JOB_STATUS_DONE, JOB_STATUS_FAILED, JOB_STATUS_QUEUED, JOB_STATUS_RUNNING,
+    claim_generation_job, create_generation_job, get_active_generation_jobs,
+    renew_generation_job_lease, update_generation_job)
+from repositories.topic_repository import delete_topic_if_empty
+from utils.enum import QuestionType
+from utils.llm_scheduler import RequestPriority
+from utils.llm_utils import generate_questions_from_pdf
+from utils.structured_logging import structured_logger as logger
+
+GENERATION_WORKERS = int(os.getenv("GENERATION_WORKERS", "2"))
+# A job that was interrupted this many times (e.g. it keeps crashing the bot) is given up on
+GENERATION_JOB_MAX_ATTEMPTS = int(os.getenv("GENERATION_JOB_MAX_ATTEMPTS", "3"))
+# How long a claimed job stays reserved for its instance; it is renewed while the job runs
+GENERATION_JOB_LEASE_SECONDS = int(os.getenv("GENERATION_JOB_LEASE_SECONDS", "120"))
+
+
+class GenerationJobQueue:
+    """Runs question generation in background workers instead of the slash command.
+
+    Jobs are persisted in Firestore (generation_jobs) before they are queued,
+    so a command only has to create the job and reply with its id. Workers
+    record each stage on the job document for /generation_status, post the
+    result in the channel the command came from, and jobs still queued or
+    running when the bot stops are picked up again by start().
+
+    Several instances may share the collection (e.g. during a rolling deploy),
+    so a worker first claims the job with a lease in Firestore and keeps
+    renewing it; a job leased by another instance is retried once that lease
+    runs out, which only happens if the other instance went away.
+    """
+
+    def __init__(self, workers: int = GENERATION_WORKERS):
+        self.workers = workers
+        self._queue = None
+        self._tasks = []
+        self._sequence = itertools.count()
+        self._pdf_bytes = {}
+        self._bot = None
+        self.owner_id = f"{socket.gethostname()}-{uuid.uuid4().hex[:8]}"
+
+    async def start(self, bot):
+        self._bot = bot
+        if self._queue is None:
+            self._queue = asyncio.PriorityQueue()
+
+        pending = await run_db(get_active_generation_jobs)
+        for job in pending:
+            # Nobody is waiting on a resumed job's command any more; don't let it hold up new ones
+            job["priority"] = max(job.get("priority", 0), int(RequestPriority.BULK))
+            self._queue.put_nowait((job["priority"], next(self._sequence), job))
+        if pending:
+            logger.info(f"🔁 Resuming {len(pending)} generation job(s)",
+                        operation="generation_jobs_resume",
+                        job_count=len(pending))
+
+        self._tasks = [
+            asyncio.create_task(self._worker(), name=f"generation_worker_{i}")
+            for i in range(self.workers)
+        ]
+
+    async def stop(self):
+        # Interrupted jobs stay queued/running in Firestore and are resumed on next start
+        for task in self._tasks:
+            task.cancel()
+        for task in self._tasks:
+            with contextlib.suppress(asyncio.CancelledError):
+                await task
+        self._tasks = []
+
+    async def submit(self, guild_id, channel_id, user_id, topic_name, topic_id, document_url,
+                     qty, qtype, priority=RequestPriority.INTERACTIVE, pdf_bytes=None) -> str:
+        """Persist and queue a generation job; returns the job id."""
+        if self._queue is None:
+            self._queue = asyncio.PriorityQueue()
+
+        job_id = await run_db(create_generation_job, guild_id, channel_id, user_id, topic_name,
+                              topic_id, document_url, qty, qtype, priority)
+        if pdf_bytes is not None:
+            self._pdf_bytes[job_id] = pdf_bytes  # spares the worker a download of the PDF
+
+        job = {
+            "job_id": job_id,
+            "guild_id": str(guild_id),
+            "channel_id": str(channel_id) if channel_id else None,
+            "user_id": str(user_id),
+            "topic_name": topic_name,
+            "topic_id": topic_id,
+            "document_url": document_url,
+            "qty": qty,
+            "question_type": qtype.value,
+            "priority": int(priority),
+            "attempts": 0,
+        }
+        self._queue.put_nowait((int(priority), next(self._sequence), job))
+        return job_id
+
+    def queued_count(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def _worker(self):
+        while True:
+            _, _, job = await self._queue.get()
+            try:
+                await self._run_job(job)
+            except Exception as e:
+                logger.error(f"❌ Generation job {job['job_id']} crashed: {e}",
+                             operation="generation_job_error",
+                             job_id=job["job_id"],
+                             error_type=type(e).__name__)
+                if job.get("owner") != self.owner_id:
+                    continue  # never claimed here; the job is still queued for whoever claims it
+                try:
+                    await self._finish(job, generated=False, error=str(e))
+                except Exception as finish_error:
+                    logger.error(f"❌ Could not mark generation job {job['job_id']} as failed: {finish_error}",
+                                 operation="generation_job_error",
+                                 job_id=job["job_id"],
+                                 error_type=type(finish_error).__name__)
+            finally:
+                self._queue.task_done()
+
+    async def _run_job(self, job):
+        job_id = job["job_id"]
+        attempts, retry_in = await run_db(claim_generation_job, job_id, self.owner_id,
+                                          GENERATION_JOB_LEASE_SECONDS)
+        if attempts is None:
+            if retry_in is not None:
+                # Another instance holds it; check again once its lease would have run out
+                asyncio.get_running_loop().call_later(
+                    retry_in + 1, self._queue.put_nowait, (job["priority"], next(self._sequence), job))
+            else:
+                self._pdf_bytes.pop(job_id, None)
+            return
+
+        job.update(owner=self.owner_id, attempts=attempts)
+        pdf_bytes = self._pdf_bytes.pop(job_id, None)
+
+        if attempts > GENERATION_JOB_MAX_ATTEMPTS:
+            await self._finish(job, generated=False, error=f"Interrupted {GENERATION_JOB_MAX_ATTEMPTS} times")
+            return
+
+        async def on_progress(stage, **details):
+            if stage == "topic_ready":
+                # Remember the topic and its starting size, so a resumed job adds only
+                # the missing questions to it instead of creating another topic
+                fields = {"topic_id": details["topic_id"], "questions_before": details["questions_before"]}
+                if details["created"]:
+                    fields["created_topic"] = True
+                job.update(fields)
+                await run_db(update_generation_job, job_id, **fields)
+                return
+            await run_db(update_generation_job, job_id, stage=stage, progress=details)
+
+        generation = asyncio.create_task(generate_questions_from_pdf(
+            job["topic_name"], job.get("topic_id"), job["guild_id"], job["document_url"],
+            job["qty"], QuestionType(job["question_type"]), pdf_bytes=pdf_bytes,
+            priority=RequestPriority(job.get("priority", RequestPriority.INTERACTIVE)),
+            on_progress=on_progress, questions_before=job.get("questions_before"), job_id=job_id))
+        lease = asyncio.create_task(self._keep_lease(job_id))
+        try:
+            done, _ = await asyncio.wait({generation, lease}, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            lease.cancel()
+            generation.cancel()
+
+        if generation not in done:
+            logger.warning(f"⚠️ Lost the lease on generation job {job_id}; leaving it to its new owner",
+                           guild_id=job["guild_id"],
+                           operation="generation_job_lease",
+                           job_id=job_id)
+            return
+
+        try:
+            generated = generation.result()
+        except asyncio.CancelledError:
+            # Cancelled from inside (e.g. an awaited future was cancelled), not by stop(): a failed job
+            await self._finish(job, generated=False, error="Generation was cancelled")
+            return
+        await self._finish(job, generated=generated)
+
+    async def _keep_lease(self, job_id):
+        """Renew the job's lease until cancelled; returns if another instance took the job over."""
+        while True:
+            await asyncio.sleep(GENERATION_JOB_LEASE_SECONDS / 3)
+            if not await run_db(renew_generation_job_lease, job_id, self.owner_id, GENERATION_JOB_LEASE_SECONDS):
+                return
+
+    async def _finish(self, job, generated: bool, error=None):
+        job_id = job["job_id"]
+        if not generated and job.get("created_topic"):
+            # Don't leave an empty topic behind for a retry to duplicate
+            await run_db(delete_topic_if_empty, job["guild_id"], job["topic_id"])
+
+        status = JOB_STATUS_DONE if generated else JOB_STATUS_FAILED
+        fields = {"error": error} if error else {}
+        await run_db(update_generation_job, job_id, status=status, stage=status, **fields)
+        logger.info(f"🗂️ Generation job {job_id} finished with status '{status}'",
+                    guild_id=job["guild_id"],
+                    operation="generation_job_finished",
+                    job_id=job_id,
+                    status=status)
+        await self._notify(job, success=generated)
+
+    async def _notify(self, job, success: bool):
+        channel_id = job.get("channel_id")
+        if self._bot is None or not channel_id:
+            return
+
+        if success:
+            message = (f"<@{job['user_id']}> 🧠 Questions for **{job['topic_name']}** are ready "
+                       f"(job `{job['job_id']}`).")
+        else:
+            message = (f"<@{job['user_id']}> ⚠️ Could not generate questions for **{job['topic_name']}** "
+                       f"(job `{job['job_id']}`). OpenRouter failed or requires credits.")
+
+        try:
+            channel = self._bot.get_channel(int(channel_id)) or await self._bot.fetch_channel(int(channel_id))
+            await channel.send(message, allowed_mentions=discord.AllowedMentions(users=True))
+        except Exception as e:
+            logger.warning(f"⚠️ Could not notify channel {channel_id} about job {job['job_id']}: {e}",
+                           operation="generation_job_notify",
+                           job_id=job["job_id"],
+                           error_type=type(e).__name__)
+
+
+generation_job_queue = GenerationJobQueue()
+
+JOB_STATUS_LABELS = {
+    JOB_STATUS_QUEUED: "⏳ Queued",
+    JOB_STATUS_RUNNING: "⚙️ Running",
+    "extracting": "📄 Extracting PDF text",
+    "generating": "🧠 Generating questions",
+    "saving": "💾 Saving questions",
+    JOB_STATUS_DONE: "✅ Done",
+    JOB_STATUS_FAILED: "❌ Failed",
+}
@@ -0,0 +1,276 @@
+import json
+import re
+
+
+class JsonScanState:
+    """Character-level JSON lexer state: tells string contents apart from structure."""
+
+    __slots__ = ("in_string", "escape")
+
+    def __init__(self):
+        self.in_string = False
+        self.escape = False
+
+    def step(self, char: str) -> bool:
+        """Advance over one character; returns True if it is structural (outside any string)."""
+        if self.in_string:
+            if self.escape:
+                self.escape = False
+            elif char == "\\":
+                self.escape = True
+            elif char == '"':
+                self.in_string = False
+            return False
+
+        if char == '"':
+            self.in_string = True
+            return False
+        return True
+
+
+class JsonArrayStreamParser:
+    """Incrementally pull the objects out of the first JSON array in a text stream.
+
+    Text before the array (prose, a ``` fence, or a {"questions": wrapper) is
+    skipped. feed() returns each element object as soon as its closing brace
+    arrives; only the text of the object being read is kept in memory.
+    """
+
+    def __init__(self):
+        self._scan = JsonScanState()
+        self._buffer = ""
+        self._pos = 0
+        self._depth = 0          # nesting depth, counted from the array itself
+        self._in_array = False
+        self._object_start = None
+        self.closed = False
+        self.skipped = 0         # elements that were not valid JSON objects
+
+    def feed(self, text: str) -> list:
+        if self.closed:
+            return []
+
+        self._buffer += text
+        objects = []
+        buffer = self._buffer
+
+        for i in range(self._pos, len(buffer)):
+            char = buffer[i]
+            if not self._scan.step(char):
+                continue
+            if not self._in_array:
+                self._enter_array(char)
+            elif char in "{[":
+                self._open(char, i)
+            elif char in "}]" and self._close(char, buffer, i, objects):
+                break
+
+        self._keep_unfinished(buffer)
+        return objects
+
+    def _enter_array(self, char: str):
+        if char == "[":
+            self._in_array = True
+            self._depth = 1
+
+    def _open(self, char: str, i: int):
+        self._depth += 1
+        if self._depth == 2 and char == "{":
+            self._object_start = i
+
+    def _close(self, char: str, buffer: str, i: int, objects: list) -> bool:
+        """Handle a closing bracket; returns True once the array itself is closed."""
+        self._depth -= 1
+        if self._depth == 1 and char == "}" and self._object_start is not None:
+            self._emit(buffer[self._object_start:i + 1], objects)
+            self._object_start = None
+        elif self._depth == 0:
+            self.closed = True
+        return self.closed
+
+    def _emit(self, element: str, objects: list):
+        try:
+            objects.append(json.loads(element))
+        except json.JSONDecodeError:
+            # e.g. a trailing comma or a '# or "False"' comment copied from the prompt
+            repaired = extract_json_objects(element)
+            objects.extend(repaired[:1])
+            self.skipped += not repaired
+
+    def _keep_unfinished(self, buffer: str):
+        """Keep only the unfinished object (if any) for the next feed."""
+        keep_from = self._object_start if self._object_start is not None else len(buffer)
+        self._buffer = buffer[keep_from:]
+        self._pos = len(buffer) - keep_from
+        if self._object_start is not None:
+            self._object_start = 0
+
+
+_TOKEN = re.compile(r'["\[\]{}#`/,]')
+_STRING_TAIL = re.compile(r'[^"\\]*(?:\\.[^"\\]*)*"', re.S)
+_OBJECT_LIST_START = re.compile(r'\s*(?:(?:#|//)[^\n]*\n\s*)*\{')
+_CLOSERS = {"{": "}", "[": "]"}
+
+
+def _strip_trailing_comma(segments):
+    while segments and not segments[-1].strip():
+        segments.pop()
+    if segments:
+        last = segments[-1].rstrip()
+        segments[-1] = last[:-1] if last.endswith(",") else last
+
+
+def _close_truncated(segments, stack, in_string):
+    """Return the text of a cut-off object with its open string and brackets closed."""
+    repaired = list(segments)
+    if in_string:
+        # A cut right after a backslash would escape the closing quote
+        last = repaired[-1]
+        if (len(last) - len(last.rstrip("\\"))) % 2:
+            repaired[-1] = last[:-1]
+        repaired.append('"')
+    _strip_trailing_comma(repaired)
+    if repaired and repaired[-1].rstrip().endswith(":"):
+        repaired.append(" null")
+    repaired.extend(_CLOSERS[opener] for opener in reversed(stack))
+    return "".join(repaired)
+
+
+def _load_object(candidates):
+    for candidate in candidates:
+        try:
+            value = json.loads(candidate)
+        except json.JSONDecodeError:
+            continue
+        if isinstance(value, dict):
+            return value
+    return None
+
+
+class _ObjectExtractor:
+    """State of one extract_json_objects pass; each structural token has its own handler."""
+
+    def __init__(self, text: str):
+        self.text = text
+        self.pos = 0
+        self.candidates = [[]]    # candidates[0] collects loose top-level objects
+        self.current = self.candidates[0]
+        self.list_depth = 0       # depth at which the current list's elements live
+        self.in_list = False
+        self.depth = 0
+        self.segments = None      # repaired text of the object being read
+        self.stack = []           # brackets open inside that object
+        self.safe_point = None    # (segment count, stack) at its last top-level comma
+        self.truncated_string = False
+        self._handlers = {
+            '"': self._string, "#": self._skip_line, "`": self._skip_line, "/": self._slash,
+            ",": self._comma, "{": self._opener, "[": self._opener, "}": self._closer, "]": self._closer,
+        }
+
+    def run(self) -> list:
+        text = self.text
+        length = len(text)
+        while self.pos < length:
+            match = _TOKEN.search(text, self.pos)
+            end = match.start() if match else length
+            self._keep(text[self.pos:end])
+            if match is None:
+                break
+            self.pos = end + 1
+            self._handlers[match.group()](match.group(), end)
+
+        if self.segments is not None:
+            self._salvage_truncated()
+        return max(self.candidates, key=len)
+
+    def _keep(self, piece: str):
+        if self.segments is not None and piece:
+            self.segments.append(piece)
+
+    def _string(self, char, start):
+        tail = _STRING_TAIL.match(self.text, self.pos)
+        string_end = tail.end() if tail else len(self.text)
+        self.truncated_string = tail is None
+        self._keep(self.text[start:string_end])
+        self.pos = string_end
+
+    def _skip_line(self, char, start):
+        # Comment line or markdown fence: skip to the end of the line
+        newline = self.text.find("\n", self.pos)
+        self.pos = len(self.text) if newline == -1 else newline
+
+    def _slash(self, char, start):
+        if self.text.startswith("/", self.pos):
+            self._skip_line(char, start)
+        else:
+            self._keep(char)
+
+    def _comma(self, char, start):
+        if self.segments is not None and len(self.stack) == 1:
+            self.safe_point = (len(self.segments), list(self.stack))
+        self._keep(char)
+
+    def _opener(self, char, start):
+        self.depth += 1
+        if char == "[" and not self.in_list and _OBJECT_LIST_START.match(self.text, self.pos):
+            self._start_list()
+            return
+        if self.segments is None and char == "{" and self.depth == self.list_depth + 1:
+            self.segments, self.stack, self.safe_point = [], [], None
+        if self.segments is not None:
+            self.segments.append(char)
+            self.stack.append(char)
+
+    def _start_list(self):
+        # Start of a list of objects (possibly inside a wrapper object being read)
+        self.in_list = True
+        self.list_depth = self.depth
+        self.current = []
+        self.candidates.append(self.current)
+        self.segments, self.stack, self.safe_point = None, [], None
+
+    def _closer(self, char, start):
+        # Stray closers in prose must not push the depth below zero
+        self.depth = max(self.depth - 1, 0)
+        if self.segments is not None:
+            self._close_bracket(char)
+        if self.in_list and self.depth < self.list_depth:
+            # The list closed; look for another one (or loose objects) after it
+            self.in_list = False
+            self.list_depth = 0
+            self.current = self.candidates[0]
+
+    def _close_bracket(self, char):
+        _strip_trailing_comma(self.segments)
+        self.segments.append(char)
+        if self.stack:
+            self.stack.pop()
+        if not self.stack:
+            value = _load_object(["".join(self.segments)])
+            if value is not None:
+                self.current.append(value)
+            self.segments = None
+
+    def _salvage_truncated(self):
+        # Prefer dropping the cut-off member over keeping a truncated value
+        attempts = []
+        if self.safe_point is not None:
+            count, open_stack = self.safe_point
+            attempts.append(_close_truncated(self.segments[:count], open_stack, False))
+        attempts.append(_close_truncated(self.segments, self.stack, self.truncated_string))
+        value = _load_object(attempts)
+        if value is not None:
+            self.current.append(value)
+
+
+def extract_json_objects(text: str) -> list:
+    """Pull the question objects out of LLM output in one pass, repairing common defects.
+
+    Handles ``` fences, prose around the JSON, a {"questions": [...]} wrapper,
+    '#' and '//' comment lines, trailing commas and a truncated last object
+    (cut back to its last complete member, or closed where it was cut). Each
+    object is decoded on its own, so one broken element does not lose the
+    others. If the text holds several lists of objects (or loose top-level
+    objects), the largest one is returned.
+    """
+    return _ObjectExtractor(text).run()
@@ -0,0 +1,134 @@
+import threading
+from bisect import bisect_left, insort
+
+
+class GuildLeaderboard:
+    """XP ranking of one guild: a list sorted by (-xp, user_id) plus a user -> xp index.
+
+    Rank lookups and top-K are binary searches/slices; an update is two
+    binary searches and a list shift, which stays cheap at guild sizes.
+    """
+
+    def __init__(self, entries: dict):
+        self._xp = dict(entries)
+        self._order = sorted((-xp, user_id) for user_id, xp in self._xp.items())
+
+    def __len__(self):
+        return len(self._order)
+
+    def update(self, user_id: str, xp: int):
+        old_xp = self._xp.get(user_id)
+        if old_xp == xp:
+            return
+        if old_xp is not None:
+            del self._order[bisect_left(self._order, (-old_xp, user_id))]
+
+        insort(self._order, (-xp, user_id))
+        self._xp[user_id] = xp
+
+    def xp(self, user_id: str):
+        return self._xp.get(user_id)
+
+    def top(self, k: int) -> list:
+        return [(user_id, -neg_xp) for neg_xp, user_id in self._order[:k]]
+
+    def rank(self, user_id: str):
+        """Return (rank, total) with ties sharing a rank, or None if the user has no XP yet."""
+        xp = self._xp.get(user_id)
+        if xp is None:
+            return None
+        return bisect_left(self._order, (-xp, "")) + 1, len(self._order)
+
+    def entries(self) -> dict:
+        return dict(self._xp)
+
+
+class LeaderboardStore:
+    """In-memory leaderboards for every guild, shared by the executor threads.
+
+    Each board remembers when it was last synced with Firestore, so callers
+    can pull in XP written elsewhere since then. XP changes for a guild that
+    is still loading are kept aside and applied on top of the loaded data, so
+    an update racing the initial load is not lost; changes for guilds that
+    are not loaded at all are dropped, as the load will read them anyway.
+    """
+
+    def __init__(self):
+        self._boards = {}
+        self._synced_at = {}
+        self._pending = {}
+        self._dirty = set()
+        self._lock = threading.Lock()
+
+    def synced_at(self, guild_id):
+        """Return when the guild's board was last synced with Firestore, or None if it is not loaded."""
+        with self._lock:
+            return self._synced_at.get(str(guild_id))
+
+    def begin_load(self, guild_id):
+        with self._lock:
+            self._pending.setdefault(str(guild_id), {})
+
+    def cancel_load(self, guild_id):
+        with self._lock:
+            self._pending.pop(str(guild_id), None)
+
+    def install(self, guild_id, entries: dict, synced_at):
+        key = str(guild_id)
+        with self._lock:
+            pending = self._pending.pop(key, {})
+            if key in self._boards:
+                return
+            board = GuildLeaderboard(entries)
+            for user_id, xp in pending.items():
+                board.update(user_id, xp)
+            self._boards[key] = board
+            self._synced_at[key] = synced_at
+            if pending:
+                self._dirty.add(key)
+
+    def reconcile(self, guild_id, entries: dict, synced_at):
+        """Apply XP read from Firestore since the last sync."""
+        key = str(guild_id)
+        with self._lock:
+            board = self._boards[key]
+            changed = False
+            for user_id, xp in entries.items():
+                if board.xp(user_id) != xp:
+                    board.update(user_id, xp)
+                    changed = True
+            self._synced_at[key] = max(self._synced_at[key], synced_at)
+            if changed:
+                self._dirty.add(key)
+
+    def record_xp(self, guild_id, user_id, xp: int):
+        key = str(guild_id)
+        with self._lock:
+            board = self._boards.get(key)
+            if board is None:
+                if key in self._pending:
+                    self._pending[key][str(user_id)] = xp
+                return
+            board.update(str(user_id), xp)
+            self._dirty.add(key)
+
+    def top(self, guild_id, k: int) -> list:
+        with self._lock:
+            return self._boards[str(guild_id)].top(k)
+
+    def rank(self, guild_id, user_id):
+        with self._lock:
+            return self._boards[str(guild_id)].rank(str(user_id))
+
+    def drain_dirty(self) -> dict:
+        """Return {guild_id: (entries, synced_at)} for boards changed since the last call."""
+        with self._lock:
+            dirty, self._dirty = self._dirty, set()
+            return {key: (self._boards[key].entries(), self._synced_at[key]) for key in dirty}
+
+    def mark_dirty(self, guild_ids):
+        with self._lock:
+            self._dirty.update(guild_ids)
+
+
+leaderboard_store = LeaderboardStore()
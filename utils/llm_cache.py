@@ -0,0 +1,133 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from utils.structured_logging import structured_logger as logger
+
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", os.path.join(".cache", "llm_responses.sqlite3"))
+LLM_CACHE_TTL_SECONDS = float(os.getenv("LLM_CACHE_TTL_SECONDS", str(30 * 24 * 3600)))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "5000"))
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+
+
+def prompt_hash(messages) -> str:
+    """Hash a chat prompt, ignoring whitespace differences inside message text."""
+    def normalize(value):
+        if isinstance(value, str):
+            return " ".join(value.split())
+        if isinstance(value, list):
+            return [normalize(item) for item in value]
+        if isinstance(value, dict):
+            return {key: normalize(item) for key, item in value.items()}
+        return value
+
+    canonical = json.dumps(normalize(messages), sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class LlmResponseCache:
+    """OpenRouter responses in a local SQLite file, keyed by (model, prompt hash).
+
+    Only responses that parsed into questions are stored, so a retry after a
+    429 or a parse failure, or a second generation over the same text, costs
+    no request. Entries expire after `ttl` seconds; above `max_entries` the
+    least recently used are dropped. Calls block, so run them off the event loop.
+    """
+
+    def __init__(self, path: str = LLM_CACHE_PATH, ttl: float = LLM_CACHE_TTL_SECONDS,
+                 max_entries: int = LLM_CACHE_MAX_ENTRIES):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._conn = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _connection(self):
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS responses (
+                    model TEXT NOT NULL,
+                    prompt_hash TEXT NOT NULL,
+                    response TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_used REAL NOT NULL,
+                    PRIMARY KEY (model, prompt_hash)
+                )
+            """)
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used)")
+            self._conn.commit()
+        return self._conn
+
+    def get(self, models, digest: str):
+        """Return (response, model) for the first of `models` with a fresh entry, or (None, None)."""
+        now = time.time()
+        try:
+            with self._lock:
+                conn = self._connection()
+                for model in models:
+                    row = conn.execute(
+                        "SELECT response FROM responses WHERE model = ? AND prompt_hash = ? AND created_at > ?",
+                        (model, digest, now - self.ttl)).fetchone()
+                    if row is None:
+                        continue
+                    conn.execute(
+                        "UPDATE responses SET last_used = ? WHERE model = ? AND prompt_hash = ?",
+                        (now, model, digest))
+                    conn.commit()
+                    self.hits += 1
+                    logger.info("💾 LLM response cache hit",
+                                operation="llm_cache_hit",
+                                model=model,
+                                prompt_hash=digest)
+                    return row[0], model
+        except sqlite3.Error as e:
+            logger.warning(f"⚠️ LLM response cache read failed: {e}",
+                           operation="llm_cache_read",
+                           error_type=type(e).__name__)
+            return None, None
+
+        self.misses += 1
+        return None, None
+
+    def put(self, model: str, digest: str, response: str):
+        now = time.time()
+        try:
+            with self._lock:
+                conn = self._connection()
+                conn.execute(
+                    "INSERT OR REPLACE INTO responses (model, prompt_hash, response, created_at, last_used) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (model, digest, response, now, now))
+                conn.execute("DELETE FROM responses WHERE created_at <= ?", (now - self.ttl,))
+                conn.execute(
+                    "DELETE FROM responses WHERE rowid IN ("
+                    "SELECT rowid FROM responses ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                    (self.max_entries,))
+                conn.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"⚠️ LLM response cache write failed: {e}",
+                           operation="llm_cache_write",
+                           error_type=type(e).__name__)
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses}
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+llm_response_cache = LlmResponseCache()
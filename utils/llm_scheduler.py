@@ -0,0 +1,172 @@
+import asyncio
+import contextlib
+import heapq
+import itertools
+import os
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from enum import IntEnum
+
+# OpenRouter's free models allow 20 requests per minute
+LLM_RPM_PER_MODEL = float(os.getenv("LLM_RPM_PER_MODEL", "20"))
+LLM_MAX_CONCURRENCY_PER_MODEL = int(os.getenv("LLM_MAX_CONCURRENCY_PER_MODEL", "4"))
+# Per-model overrides, e.g. OPENROUTER_MODEL_LIMITS=google/gemma-3-27b-it:free=10/2,other/model=60/8
+OPENROUTER_MODEL_LIMITS = os.getenv("OPENROUTER_MODEL_LIMITS", "")
+
+
+class RequestPriority(IntEnum):
+    INTERACTIVE = 0
+    BULK = 10
+
+
+def _parse_model_limits(spec: str) -> dict:
+    limits = {}
+    for item in spec.split(","):
+        model, sep, value = item.strip().rpartition("=")
+        if not sep or not model:
+            continue
+        rpm, _, concurrency = value.partition("/")
+        try:
+            limits[model] = (float(rpm), int(concurrency) if concurrency else LLM_MAX_CONCURRENCY_PER_MODEL)
+        except ValueError:
+            print(f"⚠️ Ignoring invalid OPENROUTER_MODEL_LIMITS entry: {item}")
+    return limits
+
+
+def parse_retry_after(value):
+    """Return the delay in seconds of a Retry-After header (seconds or HTTP date), or None."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+class _ModelBudget:
+    def __init__(self, rpm: float, concurrency: int):
+        self.rate = rpm / 60.0
+        self.capacity = max(1.0, rpm)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.concurrency = concurrency
+        self.in_flight = 0
+        self.blocked_until = 0.0
+        self.waiters = []
+        self.wakeup = None
+
+    def refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+
+class LlmScheduler:
+    """Process-wide gate in front of OpenRouter, one budget per model.
+
+    Every request takes a slot for its model: a token from a bucket refilled
+    at the model's requests-per-minute, within its concurrency limit, and not
+    before a Retry-After the model has sent. Waiting requests are served by
+    priority, then in arrival order, so interactive commands overtake bulk
+    regeneration, and a 429 pauses every request to that model together
+    instead of each caller backing off on its own.
+    """
+
+    def __init__(self, rpm: float = LLM_RPM_PER_MODEL,
+                 concurrency: int = LLM_MAX_CONCURRENCY_PER_MODEL,
+                 model_limits: dict = None):
+        self.rpm = rpm
+        self.concurrency = concurrency
+        self.model_limits = _parse_model_limits(OPENROUTER_MODEL_LIMITS) if model_limits is None else model_limits
+        self._budgets = {}
+        self._sequence = itertools.count()
+        self.throttled = 0
+
+    def _budget(self, model: str) -> _ModelBudget:
+        budget = self._budgets.get(model)
+        if budget is None:
+            rpm, concurrency = self.model_limits.get(model, (self.rpm, self.concurrency))
+            budget = self._budgets[model] = _ModelBudget(rpm, concurrency)
+        return budget
+
+    def _dispatch(self, model: str):
+        budget = self._budget(model)
+        budget.wakeup = None
+        now = time.monotonic()
+        budget.refill(now)
+
+        while budget.waiters and budget.in_flight < budget.concurrency:
+            if now < budget.blocked_until:
+                delay = budget.blocked_until - now
+            elif budget.tokens < 1:
+                delay = (1 - budget.tokens) / budget.rate
+            else:
+                _, _, waiter = heapq.heappop(budget.waiters)
+                if waiter.done():
+                    continue  # the caller gave up while queued
+                budget.tokens -= 1
+                budget.in_flight += 1
+                waiter.set_result(None)
+                continue
+
+            budget.wakeup = asyncio.get_running_loop().call_later(delay, self._dispatch, model)
+            return
+
+    def _schedule(self, model: str):
+        budget = self._budget(model)
+        if budget.wakeup is not None:
+            budget.wakeup.cancel()
+        self._dispatch(model)
+
+    async def acquire(self, model: str, priority: RequestPriority = RequestPriority.INTERACTIVE):
+        budget = self._budget(model)
+        waiter = asyncio.get_running_loop().create_future()
+        heapq.heappush(budget.waiters, (int(priority), next(self._sequence), waiter))
+        self._schedule(model)
+
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                self.release(model)  # granted just as the caller was cancelled
+            raise
+
+    def release(self, model: str):
+        budget = self._budget(model)
+        budget.in_flight -= 1
+        self._schedule(model)
+
+    @contextlib.asynccontextmanager
+    async def slot(self, model: str, priority: RequestPriority = RequestPriority.INTERACTIVE):
+        await self.acquire(model, priority)
+        try:
+            yield
+        finally:
+            self.release(model)
+
+    def throttle(self, model: str, delay: float):
+        """Hold every request to `model` for `delay` seconds (after a 429 / Retry-After)."""
+        budget = self._budget(model)
+        budget.blocked_until = max(budget.blocked_until, time.monotonic() + delay)
+        self.throttled += 1
+
+    def stats(self) -> dict:
+        return {
+            model: {
+                "queued": sum(1 for _, _, waiter in budget.waiters if not waiter.done()),
+                "in_flight": budget.in_flight,
+                "tokens": round(budget.tokens, 2),
+                "blocked_for": round(max(0.0, budget.blocked_until - time.monotonic()), 1),
+            }
+            for model, budget in self._budgets.items()
+        }
+
+
+llm_scheduler = LlmScheduler()
@@ -3,11 +3,23 @@ import os
 from dotenv import load_dotenv
 import json
 import asyncio
+import time
 import aiohttp
-import fitz
 from google.cloud import storage
-from repositories.topic_repository import create_topic_with_questions
+from repositories.async_db import run_db
+from repositories.topic_repository import (add_generated_question, create_topic_with_questions, create_topic_without_questions,
+                                          get_topic_question_texts, load_topic_pdf_text, save_topic_pdf_text)
+from utils.http_client import http_client
+from utils.generated_questions import (StreamedQuestionSink, merge_questions, normalize_question_text, normalize_text,
+                                       questions_from_output)
+from utils.llm_scheduler import RequestPriority, llm_scheduler, parse_retry_after
+from utils.model_health import model_health
+from utils.llm_cache import LLM_CACHE_ENABLED, llm_response_cache, prompt_hash
+from utils.openrouter_stream import read_streamed_content
+from utils.pdf_extractor import pdf_extractor
+from utils.pdf_text_cache import PDF_TEXT_CACHE_BUCKET, content_hash, pdf_text_cache
 from utils.enum import QuestionType
+from utils.text_chunks import pick_chunks, split_quota, split_text_into_chunks
 from utils.prompts import prompt_default, prompt_multiple_choice, prompt_short_answer, prompt_true_false
 
 load_dotenv()
@@ -23,75 +35,209 @@ FALLBACK_MODELS = [
 OPENROUTER_MODELS = list(dict.fromkeys([LLM_MODEL, *FALLBACK_MODELS]))
 
 QUESTIONS_JSON_FILE = "questions.json"
-MAX_PDF_TEXT_CHARS = 24000
+MAX_PDF_TEXT_CHARS = int(os.getenv("MAX_PDF_TEXT_CHARS", "200000"))
+
+# Long documents are split into chunks of about LLM_CHUNK_CHARS characters; each chunk is
+# sent as its own request (at most LLM_CONCURRENCY at a time) for its share of the questions
+LLM_CHUNK_CHARS = int(os.getenv("LLM_CHUNK_CHARS", "4000"))
+LLM_MAX_CHUNKS = int(os.getenv("LLM_MAX_CHUNKS", "10"))
+LLM_CONCURRENCY = int(os.getenv("LLM_CONCURRENCY", "3"))
+
+# Optionally race the second-best model when the best one is slow to answer
+LLM_HEDGE_ENABLED = os.getenv("LLM_HEDGE_ENABLED", "false").lower() == "true"
+LLM_HEDGE_DELAY_SECONDS = float(os.getenv("LLM_HEDGE_DELAY_SECONDS", "20"))
+
+# Stream completions and save each question as soon as its JSON object closes
+LLM_STREAMING = os.getenv("LLM_STREAMING", "true").lower() == "true"
+# A streamed completion may take minutes; only a silent connection is treated as a timeout
+LLM_STREAM_IDLE_TIMEOUT_SECONDS = float(os.getenv("LLM_STREAM_IDLE_TIMEOUT_SECONDS", "30"))
+
+
+async def _post_once(session, url, headers, payload, request_options, on_question):
+    """POST one completion request; returns (status, body, Retry-After seconds or None)."""
+    async with session.post(url, headers=headers, json=payload, **request_options) as response:
+        if on_question is not None and response.status == 200:
+            # Questions saved before a mid-stream failure are kept; the retry's are deduplicated
+            body_text = await read_streamed_content(response, on_question)
+        else:
+            body_text = await response.text()
+        return response.status, body_text, parse_retry_after(response.headers.get("Retry-After"))
+
+
+def _retry_wait(status, body_text, retry_after, attempt, max_retries, base_wait):
+    """Seconds to hold the model before retrying a response, or None to return it as is."""
+    if status == 402:
+        print("⛔ OpenRouter returned 402 Payment Required.")
+        print("   Your current model/plugin request requires credits or paid access.")
+        print(f"   Response: {body_text}")
+        return None
+
+    if status != 429 and status < 500:
+        return None
+    if attempt >= max_retries:
+        if status == 429:
+            print("⛔ OpenRouter rate limit exceeded after max retries")
+        return None
+
+    if status == 429:
+        wait_time = retry_after if retry_after is not None else base_wait * (2 ** attempt)
+        print(f"⚠️ Rate limited. Waiting {wait_time}s before retry {attempt + 1}/{max_retries}...")
+    else:
+        wait_time = base_wait * (2 ** attempt)
+        print(f"⚠️ OpenRouter server error ({status}). Retrying in {wait_time}s...")
+    return wait_time
 
 
-async def _make_api_request_with_retry(url, headers, payload, max_retries=3, base_wait=2):
+async def _make_api_request_with_retry(url, headers, payload, max_retries=3, base_wait=2,
+                                       priority=RequestPriority.INTERACTIVE, on_question=None):
     """Make API request to OpenRouter with exponential backoff on 429 errors.
-    
+
+    Every attempt waits for a slot from llm_scheduler. A 429 throttles the
+    whole model (for Retry-After when the server sends it), so concurrent
+    generations back off together instead of retrying in lockstep.
+
     Args:
         url: API endpoint URL
         headers: Request headers
         payload: Request payload
         max_retries: Maximum number of retry attempts
         base_wait: Base wait time in seconds (will be exponentially increased)
+        priority: Scheduling priority of the request
+        on_question: If given, the completion is streamed and this coroutine is
+                     awaited with each question object as soon as it is complete;
+                     the returned body is then the streamed content itself
     
     Returns:
-        Response object or None on failure
+        (status, body, latency): status is None on a network failure or timeout.
+        latency covers the last attempt from the moment it got its scheduler
+        slot, so time spent queueing behind other requests is not counted.
     """
-    timeout = aiohttp.ClientTimeout(total=60)
-    async with aiohttp.ClientSession(timeout=timeout) as session:
-        for attempt in range(max_retries + 1):
-            try:
-                async with session.post(url, headers=headers, json=payload) as response:
-                    status = response.status
-                    body_text = await response.text()
-
-                    if status == 402:
-                        print("⛔ OpenRouter returned 402 Payment Required.")
-                        print("   Your current model/plugin request requires credits or paid access.")
-                        print(f"   Response: {body_text}")
-                        return status, body_text
-
-                    # Handle 429 (Too Many Requests) with retry
-                    if status == 429:
-                        if attempt < max_retries:
-                            wait_time = base_wait * (2 ** attempt)
-                            print(f"⚠️ Rate limited. Waiting {wait_time}s before retry {attempt + 1}/{max_retries}...")
-                            await asyncio.sleep(wait_time)
-                            continue
-                        print("⛔ OpenRouter rate limit exceeded after max retries")
-                        return status, body_text
-
-                    if status >= 500:
-                        if attempt < max_retries:
-                            wait_time = base_wait * (2 ** attempt)
-                            print(f"⚠️ OpenRouter server error ({status}). Retrying in {wait_time}s...")
-                            await asyncio.sleep(wait_time)
-                            continue
-                        return status, body_text
-
-                    return status, body_text
-
-            except asyncio.TimeoutError:
-                if attempt < max_retries:
-                    wait_time = base_wait * (2 ** attempt)
-                    print(f"⚠️ Request timeout. Retrying in {wait_time}s...")
-                    await asyncio.sleep(wait_time)
-                    continue
-                return None, "timeout"
-            except aiohttp.ClientError as e:
-                if attempt < max_retries:
-                    wait_time = base_wait * (2 ** attempt)
-                    print(f"⚠️ Network error ({type(e).__name__}). Retrying in {wait_time}s...")
-                    await asyncio.sleep(wait_time)
-                    continue
-                return None, str(e)
-    
-    return None
+    model = payload["model"]
+    request_options = {}
+    if on_question is not None:
+        payload = {**payload, "stream": True}
+        request_options["timeout"] = aiohttp.ClientTimeout(
+            total=None, connect=http_client.timeout.connect, sock_read=LLM_STREAM_IDLE_TIMEOUT_SECONDS)
+
+    session = await http_client.session()
+    for attempt in range(max_retries + 1):
+        started = time.monotonic()
+        try:
+            async with llm_scheduler.slot(model, priority):
+                started = time.monotonic()
+                status, body_text, retry_after = await _post_once(
+                    session, url, headers, payload, request_options, on_question)
+        except (asyncio.TimeoutError, aiohttp.ClientError) as e:
+            timed_out = isinstance(e, asyncio.TimeoutError)
+            if attempt < max_retries:
+                wait_time = base_wait * (2 ** attempt)
+                problem = "Request timeout" if timed_out else f"Network error ({type(e).__name__})"
+                print(f"⚠️ {problem}. Retrying in {wait_time}s...")
+                await asyncio.sleep(wait_time)
+                continue
+            return None, "timeout" if timed_out else str(e), time.monotonic() - started
+
+        latency = time.monotonic() - started
+        # The scheduler holds the model for the wait, so other requests back off too
+        wait_time = _retry_wait(status, body_text, retry_after, attempt, max_retries, base_wait)
+        if wait_time is None:
+            return status, body_text, latency
+        llm_scheduler.throttle(model, wait_time)
+
+
+def _failure_reason(model, status, body_text):
+    """Why a finished request produced no answer, or None when it succeeded."""
+    if status is None:
+        print(f"⚠️ Model '{model}' failed due to network/timeout; trying next fallback if available.")
+        return f"network: {body_text}"
+    if status == 402:
+        print(f"⚠️ Model '{model}' denied due to billing restrictions (HTTP 402).")
+    elif status == 404:
+        print(f"⚠️ Model '{model}' not found (HTTP 404). Trying next fallback.")
+    elif status >= 400:
+        print(f"⚠️ Model '{model}' returned HTTP {status}. Trying next fallback.")
+        print(f"   - Response: {body_text}")
+    else:
+        return None
+    return f"HTTP {status}"
+
+
+def _response_content(model, body_text, streamed):
+    """The completion text of a successful response, or None if it is empty or malformed."""
+    if streamed:
+        if not body_text.strip():
+            print(f"⚠️ Empty streamed response from model '{model}'")
+            return None
+        return body_text
+
+    try:
+        data = json.loads(body_text)
+    except json.JSONDecodeError:
+        data = {}
+    if "choices" not in data or len(data["choices"]) == 0:
+        print(f"⚠️ Invalid response from model '{model}': {data or body_text}")
+        return None
+    return data["choices"][0]["message"]["content"]
+
+
+async def _request_model(url, headers, messages, model, priority, on_question=None):
+    """Ask one model; returns the response content or None, recording the outcome in model_health."""
+    payload = {
+        "model": model,
+        "messages": messages,
+        "temperature": 0.7
+    }
+
+    status, body_text, latency = await _make_api_request_with_retry(
+        url, headers, payload, priority=priority, on_question=on_question)
+
+    reason = _failure_reason(model, status, body_text)
+    if reason is not None:
+        model_health.record_failure(model, latency, reason, status)
+        return None
+
+    streamed = on_question is not None
+    content = _response_content(model, body_text, streamed)
+    if content is None:
+        model_health.record_failure(model, latency, "empty response" if streamed else "invalid response")
+        return None
+
+    model_health.record_success(model, latency)
+    return content
+
+
+async def _hedged_request(url, headers, messages, primary, secondary, priority, on_question=None):
+    """Ask primary; if it has not answered after LLM_HEDGE_DELAY_SECONDS, race secondary against it."""
+    tasks = {asyncio.create_task(_request_model(url, headers, messages, primary, priority, on_question)): primary}
+    try:
+        done, _ = await asyncio.wait(tasks, timeout=LLM_HEDGE_DELAY_SECONDS)
+        for task in done:
+            if task.result() is not None:
+                return task.result(), primary
+            tasks.pop(task)
+
+        print(f"🪁 Hedging request to '{primary}' with '{secondary}'")
+        tasks[asyncio.create_task(
+            _request_model(url, headers, messages, secondary, priority, on_question))] = secondary
+        while tasks:
+            done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                model = tasks.pop(task)
+                if task.result() is not None:
+                    return task.result(), model
+        return None, None
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+def _candidate_models():
+    """Best healthy model first; if every model is cooling down, only the one due back first."""
+    ranked = model_health.ranked(OPENROUTER_MODELS)
+    return [model for model in ranked if model_health.is_available(model)] or ranked[:1]
 
 
-async def send_to_openrouter(messages):
+async def send_to_openrouter(messages, priority=RequestPriority.INTERACTIVE, on_question=None):
     """Send messages to OpenRouter API with support for PDFs and text.
     
     Args:
@@ -99,11 +245,16 @@ async def send_to_openrouter(messages):
                   with new format supporting files and content arrays.
     
     Includes retry logic with exponential backoff to handle rate limiting (429 errors).
+    With on_question, the completion is streamed and each question object is
+    passed to it as soon as it is complete.
+
+    Returns:
+        (content, model) from the first model that answered, or (None, None)
     """
     try:
         if not OPENROUTER_API_KEY:
             print("⚠️ ERROR: OPENROUTER_API_KEY is not set in .env")
-            return None
+            return None, None
 
         url = "https://openrouter.ai/api/v1/chat/completions"
         headers = {
@@ -120,142 +271,56 @@ async def send_to_openrouter(messages):
                 "content": messages
             }]
 
-        for model in OPENROUTER_MODELS:
-            payload = {
-                "model": model,
-                "messages": messages,
-                "temperature": 0.7
-            }
-
-            status, body_text = await _make_api_request_with_retry(url, headers, payload)
-
-            if status is None:
-                print(f"⚠️ Model '{model}' failed due to network/timeout; trying next fallback if available.")
-                continue
-
-            if status == 402:
-                print(f"⚠️ Model '{model}' denied due to billing restrictions (HTTP 402).")
-                continue
-
-            if status == 404:
-                print(f"⚠️ Model '{model}' not found (HTTP 404). Trying next fallback.")
-                continue
-
-            if status >= 400:
-                print(f"⚠️ Model '{model}' returned HTTP {status}. Trying next fallback.")
-                print(f"   - Response: {body_text}")
-                continue
-
-            data = json.loads(body_text)
-            if "choices" not in data or len(data["choices"]) == 0:
-                print(f"⚠️ Invalid response from model '{model}': {data}")
-                continue
+        models = _candidate_models()
+        if LLM_HEDGE_ENABLED and len(models) > 1:
+            content, model = await _hedged_request(
+                url, headers, messages, models[0], models[1], priority, on_question)
+            if content is not None:
+                return content, model
+            models = models[2:]
 
-            return data["choices"][0]["message"]["content"]
+        for model in models:
+            content = await _request_model(url, headers, messages, model, priority, on_question)
+            if content is not None:
+                return content, model
 
         print(f"⛔ All configured models failed: {OPENROUTER_MODELS}")
-        return None
+        return None, None
         
     except aiohttp.ClientError as e:
         print(f"⚠️ ERROR IN OPENROUTER REQUEST: {type(e).__name__}")
         print(f"   Details: {e}")
-        return None
+        return None, None
     except Exception as e:
         print(f"⚠️ ERROR IN OPENROUTER REQUEST: {type(e).__name__}")
         print(f"   Details: {e}")
-        return None
-
-
-def _extract_balanced_json_block(text, opener, closer):
-    start = text.find(opener)
-    if start == -1:
-        return None
+        return None, None
 
-    depth = 0
-    in_string = False
-    escape = False
 
-    for i in range(start, len(text)):
-        char = text[i]
+async def _load_cached_pdf_text(pdf_url):
+    """Look the URL up in the local cache, then (if enabled) next to the PDF in the bucket."""
+    digest, text = await asyncio.to_thread(pdf_text_cache.lookup_url, pdf_url)
+    if text is not None or not PDF_TEXT_CACHE_BUCKET:
+        return text
 
-        if in_string:
-            if escape:
-                escape = False
-            elif char == "\\":
-                escape = True
-            elif char == '"':
-                in_string = False
-            continue
-
-        if char == '"':
-            in_string = True
-            continue
-
-        if char == opener:
-            depth += 1
-        elif char == closer:
-            depth -= 1
-            if depth == 0:
-                return text[start:i + 1]
-
-    return None
-
-
-def _parse_questions_json(raw_text):
-    """Parse model output robustly (pure JSON, fenced JSON, or JSON wrapped in text)."""
-    if not raw_text:
+    digest, text = await run_db(load_topic_pdf_text, pdf_url)
+    if text is None or not digest:
         return None
 
-    stripped = raw_text.strip()
+    print(f"📄 PDF text loaded from bucket cache ({digest[:12]})")
+    await asyncio.to_thread(pdf_text_cache.put, digest, text, pdf_url)
+    return text
 
-    # Try exact JSON first
-    try:
-        return json.loads(stripped)
-    except json.JSONDecodeError:
-        pass
-
-    # Strip markdown fences (```json ... ```)
-    if stripped.startswith("```"):
-        lines = stripped.splitlines()
-        if len(lines) >= 2 and lines[-1].strip().startswith("```"):
-            fenced_body = "\n".join(lines[1:-1]).strip()
-            try:
-                return json.loads(fenced_body)
-            except json.JSONDecodeError:
-                pass
-
-    # Extract first balanced array/object from text
-    candidates = [
-        _extract_balanced_json_block(stripped, "[", "]"),
-        _extract_balanced_json_block(stripped, "{", "}"),
-    ]
 
-    for candidate in candidates:
-        if not candidate:
-            continue
-        try:
-            return json.loads(candidate)
-        except json.JSONDecodeError:
-            continue
-
-    return None
-
-
-def _extract_text_from_pdf_bytes(pdf_bytes):
-    doc = fitz.open(stream=pdf_bytes, filetype="pdf")
+async def extract_text_from_pdf_url(pdf_url, pdf_bytes=None):
+    """Return the text of the PDF at pdf_url; pass pdf_bytes when they are already in memory."""
     try:
-        pages_text = []
-        for page in doc:
-            pages_text.append(page.get_text("text"))
-        return "\n".join(pages_text).strip()
-    finally:
-        doc.close()
-
+        if pdf_bytes is None:
+            text = await _load_cached_pdf_text(pdf_url)
+            if text:
+                return text[:MAX_PDF_TEXT_CHARS]
 
-async def extract_text_from_pdf_url(pdf_url):
-    timeout = aiohttp.ClientTimeout(total=60)
-    try:
-        async with aiohttp.ClientSession(timeout=timeout) as session:
+            session = await http_client.session()
             async with session.get(pdf_url) as response:
                 if response.status != 200:
                     print(f"⚠️ Could not download PDF (HTTP {response.status})")
@@ -263,10 +328,19 @@ async def extract_text_from_pdf_url(pdf_url):
 
                 pdf_bytes = await response.read()
 
-        text = await asyncio.to_thread(_extract_text_from_pdf_bytes, pdf_bytes)
-        if not text:
-            print("⚠️ PDF text extraction returned empty content")
-            return None
+        digest = content_hash(pdf_bytes)
+        text = await asyncio.to_thread(pdf_text_cache.get, digest)
+        if text is not None:
+            await asyncio.to_thread(pdf_text_cache.remember_url, pdf_url, digest)
+        else:
+            text = await pdf_extractor.extract(pdf_bytes, MAX_PDF_TEXT_CHARS)
+            if not text:
+                print("⚠️ PDF text extraction returned empty content")
+                return None
+
+            await asyncio.to_thread(pdf_text_cache.put, digest, text, pdf_url)
+            if PDF_TEXT_CACHE_BUCKET:
+                await run_db(save_topic_pdf_text, pdf_url, digest, text)
 
         return text[:MAX_PDF_TEXT_CHARS]
     except Exception as e:
@@ -274,30 +348,7 @@ async def extract_text_from_pdf_url(pdf_url):
         return None
 
 
-def save_questions_json(topic_name, topic_id, questions_str, guild_id, document_url, qty, qtype):
-    """Save generated questions in Firestore and also locally in a JSON file"""
-    parsed = _parse_questions_json(questions_str)
-    if parsed is None:
-        print("⚠️ Error parsing generated JSON. Model output was not valid JSON.")
-        return False
-
-    if isinstance(parsed, dict):
-        for key in ("questions", "items", "data"):
-            if isinstance(parsed.get(key), list):
-                parsed = parsed[key]
-                break
-
-    if not isinstance(parsed, list):
-        print("⚠️ Parsed JSON does not contain a list of questions.")
-        return False
-
-    new_questions = parsed[:qty]
-
-    create_topic_with_questions(
-        guild_id, topic_name, topic_id, new_questions, document_url, qty, qtype)
-
-    print(f"✅ {len(new_questions)} questions saved in Firestore for guild {guild_id} and topic '{topic_name}'")
-
+def _append_questions_to_json_file(topic_name, questions):
     if os.path.exists(QUESTIONS_JSON_FILE):
         with open(QUESTIONS_JSON_FILE, "r", encoding="utf-8") as f:
             data = json.load(f)
@@ -307,48 +358,202 @@ def save_questions_json(topic_name, topic_id, questions_str, guild_id, document_
     if topic_name not in data:
         data[topic_name] = []
 
-    for i, question in enumerate(new_questions, start=1):
+    for i, question in enumerate(questions, start=1):
         question["id"] = str(len(data[topic_name]) + i)
         data[topic_name].append(question)
 
     with open(QUESTIONS_JSON_FILE, "w", encoding="utf-8") as f:
         json.dump(data, f, indent=2, ensure_ascii=False)
 
+
+def save_questions_json(topic_name, topic_id, questions, guild_id, document_url, qty, qtype):
+    """Save generated questions in Firestore and also locally in a JSON file"""
+    new_questions = questions[:qty]
+    if not new_questions:
+        print("⚠️ No questions to save.")
+        return False
+
+    create_topic_with_questions(
+        guild_id, topic_name, topic_id, new_questions, document_url, qty, qtype)
+
+    print(f"✅ {len(new_questions)} questions saved in Firestore for guild {guild_id} and topic '{topic_name}'")
+
+    _append_questions_to_json_file(topic_name, new_questions)
     return True
 
 
-async def generate_questions_from_pdf(topic_name, topic_id, guild_id, pdf_url, qty, qtype):
-    """Full pipeline: extract PDF text locally and generate questions with free model."""
-    try:
-        extracted_text = await extract_text_from_pdf_url(pdf_url)
-        if not extracted_text:
-            print(f"⚠️ FAILED: Could not extract text from PDF for topic '{topic_name}'")
+async def _generate_questions_for_chunk(semaphore, prompt_fn, topic_name, chunk, qty, priority,
+                                        on_question=None, cache_scope=None):
+    messages = [
+        {
+            "role": "user",
+            "content": prompt_fn(topic_name, chunk, qty)
+        }
+    ]
+
+    digest = prompt_hash(messages if cache_scope is None else {"scope": cache_scope, "messages": messages})
+    if LLM_CACHE_ENABLED:
+        cached, _ = await asyncio.to_thread(llm_response_cache.get, OPENROUTER_MODELS, digest)
+        questions = questions_from_output(cached) if cached else None
+        if questions:
+            return questions[:qty]
+
+    async with semaphore:
+        result, model = await send_to_openrouter(messages, priority, on_question)
+
+    if result is None:
+        return []
+
+    questions = questions_from_output(result)
+    if questions is None:
+        print("⚠️ Error parsing generated JSON. Model output was not valid JSON.")
+        return []
+
+    # Only responses that parsed are cached, so a failed parse is retried for real
+    if LLM_CACHE_ENABLED and questions:
+        await asyncio.to_thread(llm_response_cache.put, model, digest, result)
+    return questions[:qty]
+
+
+async def generate_questions(topic_name, text, qty, qtype, priority=RequestPriority.INTERACTIVE,
+                             on_progress=None, on_question=None, cache_scope=None):
+    """Generate qty questions from text, one concurrent request per chunk.
+
+    The text is split on paragraph boundaries; each chunk asks for its share of
+    qty, and the results are merged with duplicate questions removed.
+    on_progress, if given, is awaited as on_progress(stage, **details) as chunks finish,
+    and on_question (which turns on streaming) with each question as it arrives.
+    Responses are cached by prompt; with a cache_scope they are only shared
+    between calls with the same scope, e.g. the attempts of one job. The
+    same prompt would otherwise return the questions a topic already holds.
+    """
+    switch = {
+        QuestionType.MULTIPLE_CHOICE: prompt_multiple_choice,
+        QuestionType.TRUE_FALSE: prompt_true_false,
+    }
+    prompt_fn = switch.get(qtype, prompt_default)
+
+    chunks = pick_chunks(split_text_into_chunks(text, LLM_CHUNK_CHARS), min(qty, LLM_MAX_CHUNKS))
+    if not chunks:
+        return []
+    shares = split_quota(qty, chunks)
+
+    semaphore = asyncio.Semaphore(LLM_CONCURRENCY)
+    chunks_done = 0
+
+    async def run_chunk(chunk, share):
+        nonlocal chunks_done
+        questions = await _generate_questions_for_chunk(
+            semaphore, prompt_fn, topic_name, chunk, share, priority, on_question, cache_scope)
+        chunks_done += 1
+        if on_progress is not None:
+            await on_progress("generating", chunks_done=chunks_done, chunks_total=len(chunks))
+        return questions
+
+    if on_progress is not None:
+        await on_progress("generating", chunks_done=0, chunks_total=len(chunks))
+    results = await asyncio.gather(*(run_chunk(chunk, share) for chunk, share in zip(chunks, shares)))
+
+    questions = merge_questions(results, qty)
+    print(f"🧩 {len(questions)} questions generated from {len(chunks)} chunk(s) "
+          f"({sum(1 for r in results if r)} succeeded)")
+    return questions
+
+
+async def _generate_and_stream_questions(topic_name, topic_id, guild_id, pdf_url, text, qty, qtype,
+                                         priority, on_progress, questions_before, job_id):
+    """Streaming variant of the pipeline: every question is stored as soon as it is complete,
+    so what was generated before a timeout or failure is kept.
+
+    questions_before is how many questions the topic held when the job first
+    started (None on a first run); a resumed job only stores what is missing.
+    It sends the same prompts as the first run, so the chunks that run
+    already answered come from the response cache and only the rest go to
+    the model; the sink drops the questions that are already stored.
+    """
+    created = topic_id is None
+    if created:
+        topic_id = await run_db(create_topic_without_questions, guild_id, topic_name, pdf_url)
+        if topic_id is None:
             return False
+        existing_texts = []
+    else:
+        existing_texts = await run_db(get_topic_question_texts, guild_id, topic_id)
+
+    if questions_before is None:
+        questions_before = len(existing_texts)
+        if on_progress is not None:
+            await on_progress("topic_ready", topic_id=topic_id, questions_before=questions_before,
+                              created=created)
+
+    remaining = qty - (len(existing_texts) - questions_before)
+    if remaining <= 0:
+        print(f"✅ Topic '{topic_name}' already has the {qty} questions requested")
+        return True
+
+    async def save(question):
+        await run_db(add_generated_question, guild_id, topic_id, question, qtype)
+
+    sink = StreamedQuestionSink(save, remaining, existing_texts)
+    # A topic that had questions only reuses responses cached by this job, which it has not stored yet
+    cache_scope = job_id if questions_before else None
+    questions = await generate_questions(topic_name, text, qty, qtype, priority, on_progress, sink.add,
+                                         cache_scope=cache_scope)
+    # Questions served from the response cache (or missed by the stream parser) are saved here
+    for question in questions:
+        await sink.add(question)
+
+    if not sink.saved:
+        print(f"⚠️ FAILED: Could not generate questions for topic '{topic_name}' in guild {guild_id}")
+        return False
 
-        # Get the appropriate prompt template
-        switch = {
-            QuestionType.MULTIPLE_CHOICE: prompt_multiple_choice,
-            QuestionType.TRUE_FALSE: prompt_true_false,
-        }
-        prompt_fn = switch.get(qtype, prompt_default)
-        prompt_text = prompt_fn(topic_name, extracted_text, qty)
+    await asyncio.to_thread(_append_questions_to_json_file, topic_name, sink.saved)
+    print(f"✅ {len(sink.saved)} questions saved in Firestore for guild {guild_id} and topic '{topic_name}'"
+          + (f" ({sink.rejected} invalid skipped)" if sink.rejected else ""))
+    return True
 
-        # Free-only path: send plain text, no file-parser plugin
-        messages = [
-            {
-                "role": "user",
-                "content": prompt_text
-            }
-        ]
-        
-        result = await send_to_openrouter(messages)
 
-        if result is None:
-            print(f"⚠️ FAILED: Could not generate questions for topic '{topic_name}' in guild {guild_id}")
+async def _generate_and_save_questions(topic_name, topic_id, guild_id, pdf_url, text, qty, qtype,
+                                      priority, on_progress, job_id):
+    """Batch variant of the pipeline: generate every question, then store them together."""
+    questions = await generate_questions(topic_name, text, qty, qtype, priority, on_progress,
+                                         cache_scope=None if topic_id is None else job_id)
+    if topic_id is not None:
+        # Regenerating for an existing topic: keep only questions it does not hold yet
+        stored = {normalize_text(text) for text in await run_db(get_topic_question_texts, guild_id, topic_id)}
+        questions = [question for question in questions if normalize_question_text(question) not in stored]
+
+    if not questions:
+        print(f"⚠️ FAILED: Could not generate questions for topic '{topic_name}' in guild {guild_id}")
+        return False
+
+    if on_progress is not None:
+        await on_progress("saving", questions=len(questions))
+    return await run_db(save_questions_json, topic_name, topic_id, questions,
+                        guild_id, pdf_url, qty, qtype)
+
+
+async def generate_questions_from_pdf(topic_name, topic_id, guild_id, pdf_url, qty, qtype, pdf_bytes=None,
+                                      priority=RequestPriority.INTERACTIVE, on_progress=None,
+                                      questions_before=None, job_id=None):
+    """Full pipeline: extract PDF text locally and generate questions with free model.
+
+    job_id identifies the generation job, so its retries reuse its cached model responses.
+    """
+    try:
+        if on_progress is not None:
+            await on_progress("extracting")
+        extracted_text = await extract_text_from_pdf_url(pdf_url, pdf_bytes)
+        if not extracted_text:
+            print(f"⚠️ FAILED: Could not extract text from PDF for topic '{topic_name}'")
             return False
 
-        return save_questions_json(topic_name, topic_id, result,
-                                   guild_id, pdf_url, qty, qtype)
+        if LLM_STREAMING:
+            return await _generate_and_stream_questions(
+                topic_name, topic_id, guild_id, pdf_url, extracted_text, qty, qtype, priority, on_progress,
+                questions_before, job_id)
+        return await _generate_and_save_questions(
+            topic_name, topic_id, guild_id, pdf_url, extracted_text, qty, qtype, priority, on_progress, job_id)
     except Exception as e:
         print(f"⚠️ ERROR in generate_questions_from_pdf: {type(e).__name__}: {e}")
         return False
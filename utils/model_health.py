@@ -0,0 +1,121 @@
+import os
+import time
+from collections import deque
+
+MODEL_HEALTH_WINDOW = int(os.getenv("MODEL_HEALTH_WINDOW", "20"))
+MODEL_FAILURE_THRESHOLD = int(os.getenv("MODEL_FAILURE_THRESHOLD", "3"))
+MODEL_COOLDOWN_SECONDS = float(os.getenv("MODEL_COOLDOWN_SECONDS", "120"))
+# 402 (billing) and 404 (model gone) will not fix themselves within minutes
+MODEL_HARD_COOLDOWN_SECONDS = float(os.getenv("MODEL_HARD_COOLDOWN_SECONDS", "3600"))
+HARD_FAILURE_STATUSES = (402, 404)
+
+
+class _ModelStats:
+    def __init__(self, window: int):
+        self.outcomes = deque(maxlen=window)  # (succeeded, latency_seconds)
+        self.consecutive_failures = 0
+        self.cooldown = 0.0
+        self.cooldown_until = 0.0
+        self.last_error = None
+
+    def success_rate(self) -> float:
+        # Laplace-smoothed, so a model with no history starts at 0.5 rather than 0 or 1
+        successes = sum(1 for succeeded, _ in self.outcomes if succeeded)
+        return (successes + 1) / (len(self.outcomes) + 2)
+
+    def mean_latency(self):
+        latencies = [latency for succeeded, latency in self.outcomes if succeeded]
+        return sum(latencies) / len(latencies) if latencies else None
+
+
+class ModelHealthTracker:
+    """Rolling success rate and latency per OpenRouter model, with a circuit breaker.
+
+    After MODEL_FAILURE_THRESHOLD consecutive failures (or a single 402/404)
+    a model is skipped until its cooldown ends; each time the breaker opens
+    again the cooldown doubles, up to MODEL_HARD_COOLDOWN_SECONDS. ranked()
+    orders models by expected cost, mean latency divided by success rate,
+    keeping the configured order for models without history.
+    """
+
+    def __init__(self, window: int = MODEL_HEALTH_WINDOW,
+                 failure_threshold: int = MODEL_FAILURE_THRESHOLD,
+                 cooldown: float = MODEL_COOLDOWN_SECONDS,
+                 hard_cooldown: float = MODEL_HARD_COOLDOWN_SECONDS):
+        self.window = window
+        self.failure_threshold = failure_threshold
+        self.base_cooldown = cooldown
+        self.hard_cooldown = hard_cooldown
+        self._models = {}
+
+    def _stats(self, model: str) -> _ModelStats:
+        stats = self._models.get(model)
+        if stats is None:
+            stats = self._models[model] = _ModelStats(self.window)
+        return stats
+
+    def is_available(self, model: str) -> bool:
+        return time.monotonic() >= self._stats(model).cooldown_until
+
+    def record_success(self, model: str, latency: float):
+        stats = self._stats(model)
+        stats.outcomes.append((True, latency))
+        stats.consecutive_failures = 0
+        stats.cooldown = 0.0
+
+    def record_failure(self, model: str, latency: float, reason: str, status=None):
+        stats = self._stats(model)
+        stats.outcomes.append((False, latency))
+        stats.consecutive_failures += 1
+        stats.last_error = reason
+
+        if status in HARD_FAILURE_STATUSES:
+            stats.cooldown = self.hard_cooldown
+        elif stats.consecutive_failures >= self.failure_threshold:
+            stats.cooldown = min(self.hard_cooldown, max(self.base_cooldown, stats.cooldown * 2))
+        else:
+            return
+
+        stats.cooldown_until = time.monotonic() + stats.cooldown
+        print(f"🔌 Model '{model}' paused for {int(stats.cooldown)}s after: {reason}")
+
+    def ranked(self, models: list) -> list:
+        """Healthy models best-first, then models in cooldown by how soon they come back."""
+        now = time.monotonic()
+        known_latencies = [
+            latency for latency in (self._stats(model).mean_latency() for model in models)
+            if latency is not None
+        ]
+        default_latency = sum(known_latencies) / len(known_latencies) if known_latencies else 1.0
+
+        def expected_cost(model):
+            stats = self._stats(model)
+            latency = stats.mean_latency()
+            return (latency if latency is not None else default_latency) / stats.success_rate()
+
+        order = {model: index for index, model in enumerate(models)}
+        healthy = [model for model in models if self._stats(model).cooldown_until <= now]
+        cooling = [model for model in models if self._stats(model).cooldown_until > now]
+
+        healthy.sort(key=lambda model: (round(expected_cost(model), 1), order[model]))
+        cooling.sort(key=lambda model: self._stats(model).cooldown_until)
+        return healthy + cooling
+
+    def snapshot(self, models: list = None) -> dict:
+        now = time.monotonic()
+        snapshot = {}
+        for model in models if models is not None else list(self._models):
+            stats = self._stats(model)
+            latency = stats.mean_latency()
+            snapshot[model] = {
+                "requests": len(stats.outcomes),
+                "success_rate": round(stats.success_rate(), 2),
+                "mean_latency": round(latency, 2) if latency is not None else None,
+                "consecutive_failures": stats.consecutive_failures,
+                "cooldown_remaining": round(max(0.0, stats.cooldown_until - now)),
+                "last_error": stats.last_error,
+            }
+        return snapshot
+
+
+model_health = ModelHealthTracker()
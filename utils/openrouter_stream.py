@@ -0,0 +1,53 @@
+import json
+
+import aiohttp
+
+from utils.json_stream import JsonArrayStreamParser
+
+_STREAM_DONE = object()
+
+
+def _event_delta(raw_line):
+    """The content delta carried by one SSE line: None if it has none, _STREAM_DONE at the end."""
+    line = raw_line.decode("utf-8", errors="replace").strip()
+    if not line.startswith("data:"):
+        return None  # blank separators and ": OPENROUTER PROCESSING" keep-alives
+
+    data = line[len("data:"):].strip()
+    if data == "[DONE]":
+        return _STREAM_DONE
+
+    try:
+        event = json.loads(data)
+    except json.JSONDecodeError as e:
+        # Losing a delta would corrupt the content; let the retry and fallback path handle it
+        raise aiohttp.ClientPayloadError(f"malformed stream event: {data[:200]!r}") from e
+    if not isinstance(event, dict):
+        return None
+    if "error" in event:
+        raise aiohttp.ClientPayloadError(f"stream error: {event['error']}")
+
+    choices = event.get("choices") or [{}]
+    return (choices[0].get("delta") or {}).get("content")
+
+
+async def read_streamed_content(response, on_question):
+    """Read an SSE chat completion, awaiting on_question(obj) for each question object as it closes.
+
+    Returns the full streamed content.
+    """
+    parser = JsonArrayStreamParser()
+    parts = []
+
+    async for raw_line in response.content:
+        delta = _event_delta(raw_line)
+        if delta is _STREAM_DONE:
+            break
+        if not delta:
+            continue
+
+        parts.append(delta)
+        for question in parser.feed(delta):
+            await on_question(question)
+
+    return "".join(parts)
@@ -0,0 +1,143 @@
+import asyncio
+import os
+import signal
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from utils.worker_pool import worker_context
+
+PDF_EXTRACT_WORKERS = int(os.getenv("PDF_EXTRACT_WORKERS", "2"))
+PDF_EXTRACT_TIMEOUT_SECONDS = float(os.getenv("PDF_EXTRACT_TIMEOUT_SECONDS", "30"))
+# Memory a worker may use on top of what it already has mapped once PyMuPDF is loaded
+PDF_EXTRACT_MAX_MEMORY_MB = int(os.getenv("PDF_EXTRACT_MAX_MEMORY_MB", "1024"))
+# Seconds past the time limit after which a worker stuck inside PyMuPDF is killed by SIGALRM
+PDF_EXTRACT_KILL_GRACE_SECONDS = 10
+
+
+class PdfExtractionTimeout(Exception):
+    pass
+
+
+def _address_space_bytes() -> int:
+    with open("/proc/self/statm") as statm:
+        return int(statm.read().split()[0]) * os.sysconf("SC_PAGE_SIZE")
+
+
+def _init_worker(max_memory_mb: int):
+    import fitz  # noqa: F401 - load PyMuPDF before measuring the baseline
+
+    # SIGALRM's default action terminates the worker, even inside C code
+    signal.signal(signal.SIGALRM, signal.SIG_DFL)
+
+    if max_memory_mb <= 0:
+        return
+    try:
+        import resource
+        limit = _address_space_bytes() + max_memory_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    except (ImportError, ValueError, OSError):
+        pass  # not supported on this platform; the time limit still applies
+
+
+def _iter_page_text(doc, deadline: float):
+    for page in doc:
+        if time.monotonic() > deadline:
+            raise PdfExtractionTimeout("PDF extraction exceeded its time limit")
+        yield page.get_text("text")
+
+
+def extract_pdf_text(pdf_bytes: bytes, max_chars: int, time_limit: float) -> str:
+    """Extract text page by page, stopping as soon as max_chars characters are collected."""
+    import fitz
+
+    deadline = time.monotonic() + time_limit
+    signal.alarm(int(time_limit) + PDF_EXTRACT_KILL_GRACE_SECONDS)
+    doc = fitz.open(stream=pdf_bytes, filetype="pdf")
+    try:
+        pages_text = []
+        collected = 0
+        for page_text in _iter_page_text(doc, deadline):
+            pages_text.append(page_text)
+            collected += len(page_text) + 1
+            if collected >= max_chars:
+                break
+        return "\n".join(pages_text).strip()[:max_chars]
+    finally:
+        doc.close()
+        signal.alarm(0)
+
+
+class PdfExtractor:
+    """Runs PDF text extraction in worker processes, off the event loop and the GIL.
+
+    Each document gets a hard time limit: the worker checks a deadline between
+    pages, the caller stops waiting shortly after it, and a page that hangs
+    inside PyMuPDF is ended by an alarm that kills the worker. A dead worker
+    breaks the pool; it is then replaced and the extractions it failed are
+    submitted again to the new one, so other callers' documents are never
+    cancelled. Each worker may map PDF_EXTRACT_MAX_MEMORY_MB more than it did at
+    startup (RLIMIT_AS), so a hostile PDF fails with MemoryError instead of
+    exhausting the container. Workers come from utils.worker_pool's fork server.
+    """
+
+    def __init__(self, max_workers: int = PDF_EXTRACT_WORKERS,
+                 time_limit: float = PDF_EXTRACT_TIMEOUT_SECONDS,
+                 max_memory_mb: int = PDF_EXTRACT_MAX_MEMORY_MB):
+        self.max_workers = max_workers
+        self.time_limit = time_limit
+        self.max_memory_mb = max_memory_mb
+        self._pool = None
+
+    def _create_pool(self):
+        return ProcessPoolExecutor(
+            max_workers=self.max_workers,
+            mp_context=worker_context(),
+            initializer=_init_worker,
+            initargs=(self.max_memory_mb,)
+        )
+
+    def _recycle_pool(self, broken_pool):
+        """Replace broken_pool, unless a concurrent call has already done so."""
+        if self._pool is not broken_pool:
+            return
+        self._pool = self._create_pool()
+        # Its pending work has already failed with BrokenProcessPool and is resubmitted by the callers
+        broken_pool.shutdown(wait=False)
+
+    async def start(self):
+        # Start the workers now so the first upload does not wait for them
+        if self._pool is None:
+            self._pool = self._create_pool()
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*(
+            loop.run_in_executor(self._pool, os.getpid) for _ in range(self.max_workers)))
+
+    async def extract(self, pdf_bytes: bytes, max_chars: int) -> str:
+        if self._pool is None:
+            self._pool = self._create_pool()
+
+        loop = asyncio.get_running_loop()
+        for attempt in range(2):
+            pool = self._pool
+            future = loop.run_in_executor(
+                pool, extract_pdf_text, pdf_bytes, max_chars, self.time_limit)
+            try:
+                # A little slack so the worker's own deadline normally fires first
+                return await asyncio.wait_for(future, timeout=self.time_limit + 5)
+            except asyncio.TimeoutError:
+                # The pool still works: a worker stuck in PyMuPDF is killed by its alarm, which breaks it
+                raise PdfExtractionTimeout("PDF extraction exceeded its time limit")
+            except BrokenProcessPool:
+                # A worker died (OOM, or killed by its alarm); replace the pool and submit again once
+                if attempt:
+                    raise
+                self._recycle_pool(pool)
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+
+pdf_extractor = PdfExtractor()
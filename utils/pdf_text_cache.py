@@ -0,0 +1,124 @@
+import hashlib
+import os
+import threading
+
+from utils.structured_logging import structured_logger as logger
+
+PDF_TEXT_CACHE_DIR = os.getenv("PDF_TEXT_CACHE_DIR", os.path.join(".cache", "pdf_text"))
+PDF_TEXT_CACHE_MAX_BYTES = int(os.getenv("PDF_TEXT_CACHE_MAX_BYTES", str(200 * 1024 * 1024)))
+# Also keep a .txt copy of the extracted text next to each PDF in the bucket
+PDF_TEXT_CACHE_BUCKET = os.getenv("PDF_TEXT_CACHE_BUCKET", "false").lower() == "true"
+
+
+def content_hash(pdf_bytes: bytes) -> str:
+    return hashlib.sha256(pdf_bytes).hexdigest()
+
+
+class PdfTextCache:
+    """Extracted PDF text on local disk, keyed by the SHA-256 of the PDF bytes.
+
+    Texts live in `<dir>/<sha256>.txt`. Topic PDFs are never overwritten in
+    the bucket, so a URL always points at the same bytes; `<dir>/urls/` maps
+    a URL to its content hash, which lets a repeat generation skip the
+    download as well as the extraction. The total size of the cached texts is
+    kept under `max_bytes` by dropping the least recently used ones.
+    """
+
+    def __init__(self, directory: str = PDF_TEXT_CACHE_DIR, max_bytes: int = PDF_TEXT_CACHE_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _text_path(self, digest: str) -> str:
+        return os.path.join(self.directory, f"{digest}.txt")
+
+    def _url_path(self, url: str) -> str:
+        return os.path.join(self.directory, "urls", hashlib.sha256(url.encode("utf-8")).hexdigest())
+
+    @staticmethod
+    def _write_atomic(path: str, content: str):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+
+    def get(self, digest: str, source: str = "content"):
+        path = self._text_path(digest)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                text = f.read()
+            os.utime(path)  # mark as recently used
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        logger.info(f"📄 PDF text cache hit ({source})",
+                    operation="pdf_text_cache_hit",
+                    content_hash=digest,
+                    source=source,
+                    text_length=len(text))
+        return text
+
+    def lookup_url(self, url: str):
+        """Return (digest, text) for a URL processed before, or (None, None)."""
+        try:
+            with open(self._url_path(url), "r", encoding="utf-8") as f:
+                digest = f.read().strip()
+        except FileNotFoundError:
+            return None, None
+
+        text = self.get(digest, source="url")
+        return (digest, text) if text is not None else (None, None)
+
+    def put(self, digest: str, text: str, url: str = None):
+        try:
+            self._write_atomic(self._text_path(digest), text)
+            if url:
+                self._write_atomic(self._url_path(url), digest)
+            self._evict()
+        except OSError as e:
+            logger.warning(f"⚠️ Could not write PDF text cache: {e}",
+                           operation="pdf_text_cache_write",
+                           error_type=type(e).__name__)
+
+    def remember_url(self, url: str, digest: str):
+        try:
+            self._write_atomic(self._url_path(url), digest)
+        except OSError as e:
+            logger.warning(f"⚠️ Could not write PDF text cache: {e}",
+                           operation="pdf_text_cache_write",
+                           error_type=type(e).__name__)
+
+    def _evict(self):
+        with self._lock:
+            entries = []
+            total = 0
+            with os.scandir(self.directory) as it:
+                for entry in it:
+                    if entry.is_file() and entry.name.endswith(".txt"):
+                        stat = entry.stat()
+                        entries.append((stat.st_mtime, stat.st_size, entry.path))
+                        total += stat.st_size
+
+            if total <= self.max_bytes:
+                return
+
+            # Stale URL aliases are harmless: lookup_url treats a missing text as a miss
+            for _, size, path in sorted(entries):
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                total -= size
+                if total <= self.max_bytes:
+                    break
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses}
+
+
+pdf_text_cache = PdfTextCache()
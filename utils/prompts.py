@@ -22,7 +22,7 @@ Output format in JSON:
 Topic: {topic}
 
 Content:
-{text[:4000]}
+{text}
 """
 
 
@@ -42,7 +42,7 @@ Output format in JSON:
 Topic: {topic}
 
 Content:
-{text[:4000]}
+{text}
 """
 
 
@@ -61,7 +61,7 @@ Return in JSON format like this:
 Topic: {topic}
 
 Content:
-{text[:4000]}
+{text}
 """
 
 
@@ -80,5 +80,5 @@ Return in JSON format like this:
 Topic: {topic}
 
 Content:
-{text[:4000]}
+{text}
 """
@@ -0,0 +1,84 @@
+import heapq
+import os
+import random
+import threading
+import time
+
+QUESTION_POOL_TTL_SECONDS = float(os.getenv("QUESTION_POOL_TTL_SECONDS", "600"))
+QUIZ_WEIGHTED_SAMPLING = os.getenv("QUIZ_WEIGHTED_SAMPLING", "false").lower() == "true"
+
+# Answer fields are kept verbatim; quiz_commands normalizes them when the question is shown
+ANSWER_FIELDS = ("correct_answer", "answer", "correctAnswer")
+
+
+def compact_question(question_id: str, topic_id: str, data: dict) -> dict:
+    """Reduce a question document to the fields a quiz needs."""
+    record = {
+        "id": question_id,
+        "topic_id": topic_id,
+        "question": data.get("question", ""),
+        "question_type": data.get("question_type", "True/False"),
+        "alternatives": data.get("alternatives", {}),
+        "success": data.get("success", 0),
+        "failures": data.get("failures", 0),
+    }
+    for field in ANSWER_FIELDS:
+        if field in data:
+            record[field] = data[field]
+    return record
+
+
+class QuestionPoolCache:
+    """Compact question records per (guild, topic), so a quiz does not re-read every question."""
+
+    def __init__(self, ttl: float = QUESTION_POOL_TTL_SECONDS):
+        self.ttl = ttl
+        self._pools = {}
+        self._generations = {}
+        self._lock = threading.Lock()
+
+    def get(self, guild_id, topic_id):
+        key = (str(guild_id), str(topic_id))
+        with self._lock:
+            cached = self._pools.get(key)
+            if cached is None or cached[0] < time.monotonic():
+                return None
+            return cached[1]
+
+    def generation(self, guild_id, topic_id) -> int:
+        with self._lock:
+            return self._generations.get((str(guild_id), str(topic_id)), 0)
+
+    def set(self, guild_id, topic_id, records: list, generation: int):
+        key = (str(guild_id), str(topic_id))
+        with self._lock:
+            if self._generations.get(key, 0) != generation:
+                return
+            self._pools[key] = (time.monotonic() + self.ttl, records)
+
+    def invalidate(self, guild_id, topic_id):
+        key = (str(guild_id), str(topic_id))
+        with self._lock:
+            self._pools.pop(key, None)
+            self._generations[key] = self._generations.get(key, 0) + 1
+
+
+def _difficulty_weight(record: dict) -> float:
+    # Laplace-smoothed failure rate: unseen questions weigh 0.5, often-missed ones approach 1
+    success = record.get("success", 0) or 0
+    failures = record.get("failures", 0) or 0
+    return (failures + 1) / (success + failures + 2)
+
+
+def sample_questions(records: list, k: int, weighted: bool = QUIZ_WEIGHTED_SAMPLING) -> list:
+    """Pick k distinct questions; weighted sampling favours questions students miss more often."""
+    k = min(k, len(records))
+    if not weighted:
+        return random.sample(records, k)
+
+    # Efraimidis-Spirakis weighted sampling without replacement
+    return heapq.nlargest(
+        k, records, key=lambda record: random.random() ** (1.0 / _difficulty_weight(record)))
+
+
+question_pool_cache = QuestionPoolCache()
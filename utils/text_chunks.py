@@ -0,0 +1,56 @@
+import re
+
+
+def _split_pieces(text, max_chars):
+    """Yield the paragraphs of text, splitting the ones longer than max_chars on sentences."""
+    for paragraph in re.split(r"\n\s*\n", text):
+        paragraph = paragraph.strip()
+        if len(paragraph) <= max_chars:
+            if paragraph:
+                yield paragraph
+            continue
+        for sentence in re.split(r"(?<=[.!?])\s+", paragraph):
+            # A single sentence longer than a chunk is cut hard
+            yield from (sentence[i:i + max_chars] for i in range(0, len(sentence), max_chars))
+
+
+def split_text_into_chunks(text, max_chars):
+    """Split text into chunks of at most max_chars, breaking on paragraphs, then sentences."""
+    chunks = []
+    current = ""
+    for piece in _split_pieces(text, max_chars):
+        if current and len(current) + len(piece) + 2 > max_chars:
+            chunks.append(current)
+            current = ""
+        current = f"{current}\n\n{piece}" if current else piece
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def pick_chunks(chunks, count):
+    """Pick `count` chunks spread evenly over the document."""
+    if count >= len(chunks):
+        return chunks
+    step = len(chunks) / count
+    return [chunks[int(i * step)] for i in range(count)]
+
+
+def split_quota(qty, chunks):
+    """Share qty between chunks in proportion to their length, at least one each.
+
+    The shares always add up to qty, so callers must pass at most qty chunks
+    (see pick_chunks).
+    """
+    if len(chunks) > qty:
+        raise ValueError(f"cannot share {qty} question(s) between {len(chunks)} chunks")
+
+    total_chars = sum(len(chunk) for chunk in chunks) or 1
+    spare = qty - len(chunks)
+    shares = [1 + spare * len(chunk) // total_chars for chunk in chunks]
+
+    # Hand out what rounding left over to the largest chunks first
+    by_size = sorted(range(len(chunks)), key=lambda i: len(chunks[i]), reverse=True)
+    for i in range(qty - sum(shares)):
+        shares[by_size[i % len(chunks)]] += 1
+    return shares
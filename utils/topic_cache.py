@@ -0,0 +1,118 @@
+import os
+import threading
+import time
+
+TOPIC_CATALOG_TTL_SECONDS = float(os.getenv("TOPIC_CATALOG_TTL_SECONDS", "300"))
+
+
+class TopicCatalogCache:
+    """Per-guild list of topics (title, topic_id, num_questions) kept in memory.
+
+    Entries expire after `ttl` seconds and are dropped explicitly by the
+    repositories whenever a topic or its questions change. Repository writes run
+    on executor threads, so access is guarded by a lock.
+    """
+
+    def __init__(self, ttl: float = TOPIC_CATALOG_TTL_SECONDS):
+        self.ttl = ttl
+        self._catalogs = {}
+        self._generations = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, guild_id):
+        key = str(guild_id)
+        with self._lock:
+            cached = self._catalogs.get(key)
+            if cached is None or cached[0] < time.monotonic():
+                self.misses += 1
+                return None
+            self.hits += 1
+            return cached[1]
+
+    def generation(self, guild_id) -> int:
+        with self._lock:
+            return self._generations.get(str(guild_id), 0)
+
+    def set(self, guild_id, entries: list, generation: int):
+        """Store a freshly loaded catalog unless it was invalidated while loading."""
+        key = str(guild_id)
+        with self._lock:
+            if self._generations.get(key, 0) != generation:
+                return
+            self._catalogs[key] = (time.monotonic() + self.ttl, entries)
+
+    def invalidate(self, guild_id):
+        key = str(guild_id)
+        with self._lock:
+            self._catalogs.pop(key, None)
+            self._generations[key] = self._generations.get(key, 0) + 1
+
+
+def match_topic_titles(titles, current: str, limit: int = 25) -> list:
+    """Return titles starting with `current` first, then titles containing it."""
+    needle = current.lower()
+    prefix_matches = []
+    substring_matches = []
+
+    for title in titles:
+        lowered = title.lower()
+        if lowered.startswith(needle):
+            prefix_matches.append(title)
+        elif needle in lowered:
+            substring_matches.append(title)
+
+    return (prefix_matches + substring_matches)[:limit]
+
+
+topic_catalog_cache = TopicCatalogCache()
+
+
+class TopicTitleIndex:
+    """Per-guild title -> topic_id map used to resolve topic references without a query.
+
+    Titles almost never change, so entries do not expire. A guild's map is
+    loaded once (see topic_repository) and extended as topics are created.
+    """
+
+    def __init__(self):
+        self._indexes = {}
+        self._lock = threading.Lock()
+
+    def is_loaded(self, guild_id) -> bool:
+        with self._lock:
+            return str(guild_id) in self._indexes
+
+    def lookup(self, guild_id, title: str):
+        with self._lock:
+            return self._indexes.get(str(guild_id), {}).get(title)
+
+    def snapshot(self, guild_id) -> dict:
+        with self._lock:
+            return dict(self._indexes.get(str(guild_id), {}))
+
+    def load(self, guild_id, index: dict):
+        """Install a loaded index, keeping any titles registered while it was loading."""
+        key = str(guild_id)
+        with self._lock:
+            current = self._indexes.get(key, {})
+            self._indexes[key] = {**index, **current}
+
+    def add(self, guild_id, title: str, topic_id: str) -> bool:
+        """Register a title; returns False if the title was already mapped."""
+        with self._lock:
+            index = self._indexes.get(str(guild_id))
+            if index is None or title in index:
+                return False
+            index[title] = topic_id
+            return True
+
+    def discard(self, guild_id, title: str):
+        with self._lock:
+            index = self._indexes.get(str(guild_id))
+            if index is not None:
+                index.pop(title, None)
+
+
+topic_title_index = TopicTitleIndex()
@@ -1,15 +1,26 @@
 # utils/utils.py
+import asyncio
+import os
+import time
+from collections import OrderedDict
 import discord
 from discord import Interaction, app_commands
-from typing import List, Union
+from typing import List
 
 from utils.structured_logging import structured_logger as logger
-from repositories.topic_repository import get_topics_by_server
-from repositories.user_repository import register_user_history
-from repositories.server_repository import update_server_last_interaction
+from repositories.async_db import run_db
+from repositories.topic_repository import get_topic_catalog
 from utils.enum import QuestionType
+from utils.topic_cache import match_topic_titles, topic_catalog_cache
+from utils.write_behind import last_interaction_tracker
 
 ROLE_PROFESSOR = "faculty"
+MEMBER_NAME_CACHE_TTL_SECONDS = float(os.getenv("MEMBER_NAME_CACHE_TTL_SECONDS", "900"))
+MEMBER_FETCH_CONCURRENCY = int(os.getenv("MEMBER_FETCH_CONCURRENCY", "10"))
+MEMBER_NAME_CACHE_MAX_ENTRIES = int(os.getenv("MEMBER_NAME_CACHE_MAX_ENTRIES", "1000"))
+
+# LRU of (guild_id, user_id) -> (expires_at, display_name) for members missing from the gateway cache
+_member_name_cache = OrderedDict()
 
 
 def get_interaction_role_names(interaction: discord.Interaction) -> list[str]:
@@ -58,21 +69,70 @@ def is_professor(interaction: discord.Interaction) -> bool:
 
 
 def update_last_interaction(guild_id: int):
-    update_server_last_interaction(guild_id)
+    last_interaction_tracker.touch(guild_id)
+
 
+async def resolve_member_names(guild: discord.Guild, user_ids: List[str]) -> dict:
+    """Map user ids to display names with as few REST calls as possible.
 
-def get_topics_for_autocomplete(guild_id: int, *, include_empty: bool = True):
-    documents = get_topics_by_server(guild_id, include_empty=include_empty)
-    return [doc.to_dict().get("title", "Untitled") for doc in documents]
+    Members come from the gateway cache first, then from a short-lived name
+    cache; only the remaining ids are fetched, concurrently and bounded.
+    """
+    names = {}
+    misses = []
+    now = time.monotonic()
+
+    for user_id in user_ids:
+        member = guild.get_member(int(user_id))
+        if member:
+            names[user_id] = member.display_name
+            continue
+
+        cached = _member_name_cache.get((guild.id, user_id))
+        if cached and cached[0] > now:
+            _member_name_cache.move_to_end((guild.id, user_id))
+            names[user_id] = cached[1]
+            continue
+
+        misses.append(user_id)
+
+    semaphore = asyncio.Semaphore(MEMBER_FETCH_CONCURRENCY)
+
+    async def fetch(user_id):
+        async with semaphore:
+            return await guild.fetch_member(int(user_id))
+
+    results = await asyncio.gather(*(fetch(user_id) for user_id in misses), return_exceptions=True)
+    for user_id, result in zip(misses, results):
+        if isinstance(result, discord.Member):
+            names[user_id] = result.display_name
+            _member_name_cache[(guild.id, user_id)] = (now + MEMBER_NAME_CACHE_TTL_SECONDS, result.display_name)
+            _member_name_cache.move_to_end((guild.id, user_id))
+            while len(_member_name_cache) > MEMBER_NAME_CACHE_MAX_ENTRIES:
+                _member_name_cache.popitem(last=False)
+        else:
+            names[user_id] = f"Unknown user ({user_id})"
+
+    return names
+
+
+async def get_topics_for_autocomplete(guild_id: int, *, include_empty: bool = True):
+    catalog = topic_catalog_cache.get(guild_id)
+    if catalog is None:
+        catalog = await run_db(get_topic_catalog, guild_id)
+    return [
+        entry["title"] for entry in catalog
+        if include_empty or entry["num_questions"] > 0
+    ]
 
 
 async def autocomplete_topics(interaction: discord.Interaction, current: str):
     try:
-        topics = get_topics_for_autocomplete(interaction.guild.id, include_empty=False) or []
+        topics = await get_topics_for_autocomplete(interaction.guild.id, include_empty=False) or []
         return [
             app_commands.Choice(name=topic, value=topic)
-            for topic in topics if current.lower() in topic.lower()
-        ][:25]
+            for topic in match_topic_titles(topics, current)
+        ]
     except Exception as e:
         logger.error(f"❌ Error in autocomplete_topics: {e}", exc_info=True)
         print(f"❌ Error in autocomplete_topics: {e}")
@@ -81,11 +141,11 @@ async def autocomplete_topics(interaction: discord.Interaction, current: str):
 
 async def autocomplete_quiz_topics(interaction: discord.Interaction, current: str):
     try:
-        topics = get_topics_for_autocomplete(interaction.guild.id, include_empty=False) or []
+        topics = await get_topics_for_autocomplete(interaction.guild.id, include_empty=False) or []
         return [
             app_commands.Choice(name=topic, value=topic)
-            for topic in topics if current.lower() in topic.lower()
-        ][:25]
+            for topic in match_topic_titles(topics, current)
+        ]
     except Exception as e:
         logger.error(f"❌ Error in autocomplete_quiz_topics: {e}", exc_info=True)
         print(f"❌ Error in autocomplete_quiz_topics: {e}")
@@ -94,11 +154,11 @@ async def autocomplete_quiz_topics(interaction: discord.Interaction, current: st
 
 async def autocomplete_all_topics(interaction: discord.Interaction, current: str):
     try:
-        topics = get_topics_for_autocomplete(interaction.guild.id, include_empty=True) or []
+        topics = await get_topics_for_autocomplete(interaction.guild.id, include_empty=True) or []
         return [
             app_commands.Choice(name=topic, value=topic)
-            for topic in topics if current.lower() in topic.lower()
-        ][:25]
+            for topic in match_topic_titles(topics, current)
+        ]
     except Exception as e:
         logger.error(f"❌ Error in autocomplete_all_topics: {e}", exc_info=True)
         print(f"❌ Error in autocomplete_all_topics: {e}")
@@ -123,26 +183,6 @@ async def autocomplete_question_type(
     ]
 
 
-def register_user_statistics(
-    user: discord.User,
-    topic_id: str,
-    correct: int,
-    total: int,
-    types: Union[str, List[str]]
-):
-    if isinstance(types, str):
-        types = [types]
-    register_user_history(
-        user_id=user.id,
-        guild_id=user.guild.id,
-        user_name=user.name,
-        topic_id=topic_id,
-        correct=correct,
-        total=total,
-        types=types,
-    )
-    
-    
 def log_command_event(level: str, interaction, message: str, operation: str, **kwargs):
     """
     Centralizes structured logging for slash commands.
@@ -0,0 +1,20 @@
+import multiprocessing
+
+# Imported once by the fork server, so each worker starts with them already loaded
+WORKER_PRELOAD_MODULES = ["utils.charts", "utils.pdf_extractor"]
+
+
+def worker_context():
+    """Multiprocessing context for the chart and PDF worker pools.
+
+    Workers are forked from a fork server: a fresh, single-threaded Python
+    process started on first use. Forking the bot itself would copy its
+    Firestore, gRPC and executor threads' locks and its whole address space
+    into every worker, including the ones created to replace a broken pool.
+    The fork server re-runs the entry script as __mp_main__, which is why
+    main.py only starts the bot under a __main__ guard.
+    """
+    context = multiprocessing.get_context("forkserver")
+    context.set_forkserver_preload(WORKER_PRELOAD_MODULES)
+    return context
+
@@ -0,0 +1,184 @@
+import abc
+import asyncio
+import contextlib
+import os
+from datetime import datetime, timezone
+
+from repositories.async_db import run_db
+from repositories.level_repository import snapshot_leaderboards
+from repositories.question_repository import apply_question_stats_deltas
+from repositories.server_repository import update_servers_last_interaction
+from utils.structured_logging import structured_logger as logger
+
+LAST_INTERACTION_FLUSH_SECONDS = float(os.getenv("LAST_INTERACTION_FLUSH_SECONDS", "60"))
+QUESTION_STATS_FLUSH_SECONDS = float(os.getenv("QUESTION_STATS_FLUSH_SECONDS", "30"))
+QUESTION_STATS_MAX_PENDING = int(os.getenv("QUESTION_STATS_MAX_PENDING", "200"))
+LEADERBOARD_SNAPSHOT_SECONDS = float(os.getenv("LEADERBOARD_SNAPSHOT_SECONDS", "300"))
+
+
+class PeriodicFlusher(abc.ABC):
+    """Base class for in-memory buffers that are written to Firestore in the background.
+
+    Subclasses implement flush(). It runs every `interval` seconds once start()
+    is called, and one last time from stop() so nothing is lost on shutdown.
+    """
+
+    def __init__(self, name: str, interval: float):
+        self.name = name
+        self.interval = interval
+        self._task = None
+        self._stopping = None
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._stopping = asyncio.Event()
+            self._task = asyncio.create_task(self._run(), name=f"{self.name}_flusher")
+
+    async def stop(self):
+        # Let an in-flight flush finish instead of cancelling it halfway through a write
+        if self._task is not None:
+            self._stopping.set()
+            await self._task
+            self._task = None
+
+        await self._safe_flush()
+
+    @abc.abstractmethod
+    async def flush(self):
+        """Write the buffered state to Firestore."""
+
+    async def _run(self):
+        while not self._stopping.is_set():
+            with contextlib.suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(self._stopping.wait(), timeout=self.interval)
+                return
+            await self._safe_flush()
+
+    async def _safe_flush(self):
+        try:
+            await self.flush()
+        except Exception as e:
+            logger.error(f"❌ Error flushing {self.name}: {e}",
+                         operation=f"{self.name}_flush",
+                         error_type=type(e).__name__)
+
+
+class LastInteractionTracker(PeriodicFlusher):
+    """Coalesces servers/{id}.last_interaction updates into one write per guild per interval."""
+
+    def __init__(self, interval: float = LAST_INTERACTION_FLUSH_SECONDS):
+        super().__init__("last_interaction", interval)
+        self._pending = {}
+        self._pending_touches = 0
+        self.touches = 0
+        self.writes = 0
+        self.writes_saved = 0
+
+    def touch(self, guild_id):
+        if guild_id is None:
+            return
+
+        self._pending[str(guild_id)] = datetime.now(timezone.utc)
+        self._pending_touches += 1
+        self.touches += 1
+
+    def stats(self) -> dict:
+        return {
+            "touches": self.touches,
+            "writes": self.writes,
+            "writes_saved": self.writes_saved,
+            "pending_guilds": len(self._pending),
+        }
+
+    async def flush(self):
+        if not self._pending:
+            return
+
+        pending, self._pending = self._pending, {}
+        touches, self._pending_touches = self._pending_touches, 0
+
+        try:
+            await run_db(update_servers_last_interaction, pending)
+        except Exception:
+            # Put the batch back without overwriting newer touches recorded meanwhile
+            for guild_id, interaction_time in pending.items():
+                self._pending.setdefault(guild_id, interaction_time)
+            self._pending_touches += touches
+            raise
+
+        self.writes += len(pending)
+        self.writes_saved += touches - len(pending)
+
+        logger.info(f"🕒 Flushed last interaction for {len(pending)} server(s)",
+                    operation="last_interaction_flush",
+                    **self.stats())
+
+
+class QuestionStatsBuffer(PeriodicFlusher):
+    """Collects per-question success/failure clicks and writes them as batched Increments.
+
+    Stats are flushed every `interval` seconds, or as soon as `max_pending`
+    distinct questions are waiting, so Firestore lags clicks by at most one window.
+    """
+
+    def __init__(self, interval: float = QUESTION_STATS_FLUSH_SECONDS,
+                 max_pending: int = QUESTION_STATS_MAX_PENDING):
+        super().__init__("question_stats", interval)
+        self.max_pending = max_pending
+        self._pending = {}
+        self._flush_task = None
+
+    def record(self, guild_id, topic_id, question_id, correct: bool):
+        key = (str(guild_id), str(topic_id), str(question_id))
+        counts = self._pending.setdefault(key, [0, 0])
+        counts[0 if correct else 1] += 1
+
+        if len(self._pending) >= self.max_pending and (self._flush_task is None or self._flush_task.done()):
+            self._flush_task = asyncio.create_task(self._safe_flush())
+
+    async def stop(self):
+        if self._flush_task is not None:
+            await self._flush_task
+        await super().stop()
+
+    async def flush(self):
+        if not self._pending:
+            return
+
+        pending, self._pending = self._pending, {}
+        try:
+            failed = await run_db(apply_question_stats_deltas, pending)
+        except Exception:
+            self._requeue(pending)
+            raise
+        self._requeue(failed)
+
+        logger.info(f"📈 Flushed stats for {len(pending) - len(failed)} question(s)",
+                    operation="question_stats_flush",
+                    question_count=len(pending),
+                    failed_count=len(failed))
+
+    def _requeue(self, deltas: dict):
+        for key, (success, failures) in deltas.items():
+            counts = self._pending.setdefault(key, [0, 0])
+            counts[0] += success
+            counts[1] += failures
+
+
+class LeaderboardSnapshotter(PeriodicFlusher):
+    """Periodically writes changed in-memory leaderboards to servers/{id}/meta/leaderboard."""
+
+    def __init__(self, interval: float = LEADERBOARD_SNAPSHOT_SECONDS):
+        super().__init__("leaderboard_snapshot", interval)
+
+    async def flush(self):
+        saved = await run_db(snapshot_leaderboards)
+        if saved:
+            logger.info(f"🏆 Saved {saved} leaderboard snapshot(s)",
+                        operation="leaderboard_snapshot",
+                        guild_count=saved)
+
+
+last_interaction_tracker = LastInteractionTracker()
+question_stats_buffer = QuestionStatsBuffer()
+leaderboard_snapshotter = LeaderboardSnapshotter()